@@ -1,7 +1,62 @@
-from flask import Flask
+from flask import Flask, request, jsonify, Response
+import os, io
+import threading
+import pandas as pd
+
+from concrete_src.constant import *
+from concrete_src.entity.concrete_predictor import ConcretePredictor
+from concrete_src.config.configuartion import Configuration
+from concrete_src.pipeline.job_runner import TrainingJobRunner
+from concrete_src.entity.experiment import ExperimentStore
 
 app = Flask(__name__)
 
+# built by the first request of each worker, so that importing the app reads and writes nothing
+predictor = None
+job_runner = None
+experiment_store = None
+serving_lock = threading.Lock()
+
+def get_predictor()->ConcretePredictor:
+    """
+    Models are loaded once per worker and kept in memory for every request.
+    A newly promoted release is loaded in the background and swapped in, without a restart.
+    """
+    global predictor
+    if predictor is None:
+        with serving_lock:
+            if predictor is None:
+                config = Configuration()
+                model_dir = os.path.join(ROOT_DIR, config.config_info[MODEL_PUSH_CONFIG_INFO_KEY][MODEL_EXPORT_DIR])
+                reload_interval_seconds = config.config_info[MODEL_PUSH_CONFIG_INFO_KEY].get(
+                    MODEL_RELOAD_INTERVAL_SECONDS_KEY)
+                predictor = ConcretePredictor(model_dir=model_dir,
+                                              schema_file_path=config.get_data_validation_config().schema_file_path,
+                                              reload_interval_seconds=reload_interval_seconds)
+    return predictor
+
+def get_job_runner()->TrainingJobRunner:
+    """
+    Training runs in separate processes, requests only read and write the job state files.
+    """
+    global job_runner
+    if job_runner is None:
+        with serving_lock:
+            if job_runner is None:
+                job_runner = TrainingJobRunner(Configuration().get_training_job_config())
+    return job_runner
+
+def get_experiment_store()->ExperimentStore:
+    global experiment_store
+    if experiment_store is None:
+        with serving_lock:
+            if experiment_store is None:
+                artifact_dir = Configuration().training_pipeline_config.artifact_dir
+                experiment_store = ExperimentStore(os.path.join(artifact_dir, EXPERIMENT_DIR_NAME, EXPERIMENT_FILE_NAME),
+                                                   csv_file_path=os.path.join(artifact_dir, EXPERIMENT_DIR_NAME,
+                                                                              EXPERIMENT_CSV_FILE_NAME))
+    return experiment_store
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     try:
@@ -9,5 +64,99 @@ def index():
     except Exception as e:
         return str(e)
 
+@app.route('/predict', methods=['POST'])
+def predict():
+    """
+    Accepts a JSON list of mix designs, or {"instances": [...]}, and returns the predicted strengths.
+    """
+    try:
+        payload = request.get_json(force=True)
+        records = payload["instances"] if isinstance(payload, dict) else payload
+        predictions = get_predictor().predict(records)
+        return jsonify({"predictions": predictions.tolist()})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/predict/csv', methods=['POST'])
+def predict_csv():
+    """
+    Accepts a CSV upload (form field "file") or a raw CSV body and returns it with a prediction column.
+    """
+    try:
+        csv_file = request.files.get("file")
+        input_df = pd.read_csv(csv_file if csv_file is not None else io.BytesIO(request.get_data()))
+        predictor = get_predictor()
+        input_df[predictor.target_column] = predictor.predict(input_df)
+        return Response(input_df.to_csv(index=False), mimetype="text/csv")
+    except Exception as e:
+        return Response(str(e), status=400, mimetype="text/plain")
+
+@app.route('/train', methods=['POST'])
+def train():
+    """
+    Queues a training run and returns its job at once with status 202.
+    """
+    try:
+        return jsonify(get_job_runner().submit()), 202
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/train', methods=['GET'])
+def list_training_jobs():
+    try:
+        return jsonify({"jobs": get_job_runner().list_jobs()})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/train/<job_id>', methods=['GET'])
+def get_training_job(job_id):
+    """
+    Returns the job state: queued, running, succeeded, failed or cancelled.
+    """
+    try:
+        job = get_job_runner().get_job(job_id)
+        if job is None:
+            return jsonify({"error": f"Training job {job_id} not found"}), 404
+        return jsonify(job)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/train/<job_id>/cancel', methods=['POST'])
+def cancel_training_job(job_id):
+    try:
+        job = get_job_runner().cancel(job_id)
+        if job is None:
+            return jsonify({"error": f"Training job {job_id} not found"}), 404
+        return jsonify(job)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/experiments', methods=['GET'])
+def list_experiments():
+    """
+    Returns the latest experiments, ?limit=N (default 10), or only those whose model of a cluster
+    was accepted, ?accepted_cluster=C, or only those slower than ?min_seconds=S, slowest first.
+    """
+    try:
+        limit = request.args.get("limit", 10, type=int)
+        accepted_cluster = request.args.get("accepted_cluster", type=int)
+        min_seconds = request.args.get("min_seconds", type=float)
+        store = get_experiment_store()
+        if accepted_cluster is not None:
+            experiments = store.get_experiments_by_accepted_cluster(accepted_cluster, limit)
+        elif min_seconds is not None:
+            experiments = store.get_slow_experiments(min_seconds, limit)
+        else:
+            experiments = store.get_latest_experiments(limit)
+        return jsonify({"experiments": [{**experiment._asdict(),
+                                         "start_time": experiment.start_time.isoformat(),
+                                         "stop_time": None if experiment.stop_time is None
+                                                      else experiment.stop_time.isoformat(),
+                                         "execution_time": None if experiment.execution_time is None
+                                                           else experiment.execution_time.total_seconds()}
+                                        for experiment in experiments]})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 if __name__ == "__main__":
-    app.run()
\ No newline at end of file
+    app.run()
@@ -0,0 +1,72 @@
+from concrete_src.logger import get_logger
+from concrete_src.exception import ConcreteException
+from concrete_src.constant import *
+from concrete_src.config.configuartion import Configuration
+from concrete_src.pipeline.benchmark import Benchmark
+import argparse
+import json
+import sys
+
+logger = get_logger(__name__)
+
+
+def main():
+    """
+    Benchmarks preprocessing, clustering, model search and prediction on synthetic data.
+    Usage: python benchmark.py [--sizes N ...] [--repeats N] [--import-budget SECONDS] [--output FILE]
+    """
+    try:
+        parser = argparse.ArgumentParser(description="Benchmark the training and prediction steps at scale")
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000, 10000000],
+                            help="no. of synthetic rows of each run")
+        parser.add_argument("--repeats", type=int, default=3, help="timed calls per benchmark and size")
+        parser.add_argument("--max-cluster-rows", type=int, default=1000000,
+                            help="larger sizes are skipped for the clustering")
+        parser.add_argument("--max-search-rows", type=int, default=100000,
+                            help="larger sizes are skipped for the model searches")
+        parser.add_argument("--single-row-calls", type=int, default=1000, help="one row predictions timed")
+        parser.add_argument("--import-budget", type=float, default=SERVING_IMPORT_TIME_BUDGET_SECONDS,
+                            help="seconds allowed for a cold import of the serving path")
+        parser.add_argument("--base-data", default=os.path.join(ROOT_DIR, "notebook", "concrete_data.csv"),
+                            help="dataset the synthetic rows are sampled from")
+        parser.add_argument("--output", default="benchmark.json", help="json file to write the results to")
+        args = parser.parse_args()
+
+        config = Configuration()
+        data_transformation_config_info = config.config_info[DATA_TRANSFORMATION_CONFIG_KEY]
+        model_dir = os.path.join(ROOT_DIR, config.config_info[MODEL_PUSH_CONFIG_INFO_KEY][MODEL_EXPORT_DIR])
+
+        benchmark = Benchmark(base_data_file_path=args.base_data,
+                              schema_file_path=config.get_data_validation_config().schema_file_path,
+                              model_config_file_path=config.get_model_train_config().model_config_file_path,
+                              model_dir=model_dir, sizes=args.sizes, repeats=args.repeats,
+                              max_cluster_rows=args.max_cluster_rows, max_search_rows=args.max_search_rows,
+                              single_row_calls=args.single_row_calls,
+                              min_clusters=data_transformation_config_info[MIN_CLUSTERS],
+                              max_clusters=data_transformation_config_info[MAX_CLUSTERS],
+                              cluster_algorithm=data_transformation_config_info[CLUSTER_ALGORITHM],
+                              cluster_n_jobs=data_transformation_config_info[CLUSTER_N_JOBS],
+                              import_budget_seconds=args.import_budget)
+        benchmark_report = benchmark.run()
+        with open(args.output, "w") as output_file:
+            json.dump(benchmark_report, output_file, indent=2)
+        for result in benchmark_report["results"]:
+            details = result.get("model", "")
+            if "skipped" in result:
+                print(f"{result['benchmark']:<30} {details:<40} {result['rows']:>10} skipped")
+                continue
+            if "budget_seconds" in result:
+                print(f"{result['benchmark']:<30} {result['module']:<40} {'':>10} "
+                      f"p50 {result['latency_seconds']['p50']:.4f}s  budget {result['budget_seconds']}s  "
+                      f"{'within budget' if result['within_budget'] else 'OVER BUDGET'}")
+                continue
+            print(f"{result['benchmark']:<30} {details:<40} {result['rows']:>10} "
+                  f"p50 {result['latency_seconds']['p50']:.4f}s  p99 {result['latency_seconds']['p99']:.4f}s  "
+                  f"{result['rows_per_second']:.0f} rows/s")
+        print(f"Results: {args.output}")
+    except Exception as e:
+        logger.error(f"{e}")
+        raise ConcreteException(e, sys) from e
+
+if __name__=="__main__":
+    main()
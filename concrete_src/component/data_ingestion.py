@@ -1,62 +1,216 @@
-from cmath import inf
 import sys, os
-from kaggle.api.kaggle_api_extended import KaggleApi
+import csv, glob, hashlib, io, shutil
+import urllib.request, urllib.error
+from typing import List
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import StratifiedShuffleSplit
 
 from concrete_src.entity.config_entity import DataIngestionConfig 
 from concrete_src.entity.artifact_entity import DataIngestionArtifact
 from concrete_src.exception import ConcreteException
-from concrete_src.logger import logging
+from concrete_src.logger import get_logger
+from concrete_src.constant import *
+from concrete_src.util.util import read_yaml_file, write_yaml_file, get_file_hash, get_artifact_file_path, save_data_frame
+
+logger = get_logger(__name__)
 
 class DataIngestion:
 
     def __init__(self, data_ingestion_config:DataIngestionConfig) -> None:
         try:
-            logging.info(f"\n{'*'*20}Data Ingestion started{'*'*20}")
+            logger.info(f"\n{'*'*20}Data Ingestion started{'*'*20}")
             self.data_ingestion_config = data_ingestion_config
         except Exception as e:
             raise ConcreteException(e, sys) from e
 
-    def download_data(self)->DataIngestionArtifact:
+    def get_cache_entry_dir(self, source:str)->str:
+        """
+        Cache folder of a remote source, named by a hash of the source.
+        """
+        source_hash = hashlib.sha256(source.encode()).hexdigest()[:16]
+        return os.path.join(self.data_ingestion_config.download_cache_dir, source_hash)
+
+    def get_cached_file(self, cache_entry_dir:str):
+        """
+        Returns the cached file path and its manifest if the file matches its recorded checksum.
+        """
         try:
-            """
-            Downloads the data from kaggle into raw data dir
-            """
+            manifest_file_path = os.path.join(cache_entry_dir, DOWNLOAD_CACHE_MANIFEST_FILE_NAME)
+            if not os.path.exists(manifest_file_path):
+                return None, dict()
+            manifest = read_yaml_file(file_path=manifest_file_path) or dict()
+            cached_file_path = os.path.join(cache_entry_dir, self.data_ingestion_config.dataset_filename)
+            if os.path.exists(cached_file_path) and get_file_hash(cached_file_path) == manifest.get("sha256"):
+                return cached_file_path, manifest
+            logger.info(f"Cached file in [{cache_entry_dir}] failed checksum validation")
+            return None, dict()
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
 
+    def update_cache_manifest(self, cache_entry_dir:str, source:str, **details):
+        try:
+            cached_file_path = os.path.join(cache_entry_dir, self.data_ingestion_config.dataset_filename)
+            manifest = {"source": source, "sha256": get_file_hash(cached_file_path)}
+            manifest.update(details)
+            write_yaml_file(file_path=os.path.join(cache_entry_dir, DOWNLOAD_CACHE_MANIFEST_FILE_NAME), data=manifest)
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def download_kaggle_data(self)->List[str]:
+        """
+        Downloads the data from kaggle into the download cache.
+        Kaggle skips the download when the cached file is newer than the remote file.
+        """
+        try:
             # authenticate kaggle api with kaggle.json present in .kaggle
+            from kaggle.api.kaggle_api_extended import KaggleApi
             api = KaggleApi()
             api.authenticate()
-          
-            
-            # folder location to download file
-            raw_data_dir = self.data_ingestion_config.raw_data_dir
-            # create folder
-            os.makedirs(raw_data_dir, exist_ok=True)
-            
+
             dataset_name = self.data_ingestion_config.dataset_name
             dataset_filename = self.data_ingestion_config.dataset_filename
+            source = f"kaggle://{dataset_name}/{dataset_filename}"
+            cache_entry_dir = self.get_cache_entry_dir(source)
+            os.makedirs(cache_entry_dir, exist_ok=True)
+            cached_file_path, _ = self.get_cached_file(cache_entry_dir)
+
+            logger.debug("Downloading file [%s] from [%s] into [%s]", dataset_filename, dataset_name, cache_entry_dir)
+            api.dataset_download_file(dataset = dataset_name, file_name = dataset_filename, path = cache_entry_dir,
+                                      force = cached_file_path is None)
+            self.update_cache_manifest(cache_entry_dir, source)
+            return [os.path.join(cache_entry_dir, dataset_filename)]
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def download_http_data(self)->List[str]:
+        """
+        Downloads the data from an HTTP url into the download cache.
+        The request is conditional on the ETag/Last-Modified of the cached copy, unchanged data is not fetched again.
+        Without either header the body is compared with the cached copy by sha256, and the copy is not rewritten when equal.
+        A server that does not answer within download_timeout_seconds fails the download.
+        """
+        try:
+            source = self.data_ingestion_config.source_path
+            cache_entry_dir = self.get_cache_entry_dir(source)
+            cached_file_path, manifest = self.get_cached_file(cache_entry_dir)
+
+            headers = dict()
+            if cached_file_path is not None:
+                if manifest.get("etag"):
+                    headers["If-None-Match"] = manifest["etag"]
+                if manifest.get("last_modified"):
+                    headers["If-Modified-Since"] = manifest["last_modified"]
+            try:
+                response = urllib.request.urlopen(urllib.request.Request(source, headers=headers),
+                                                  timeout=self.data_ingestion_config.download_timeout_seconds)
+            except urllib.error.HTTPError as http_error:
+                if http_error.code == 304 and cached_file_path is not None:
+                    logger.info(f"[{source}] not modified, using cached file [{cached_file_path}]")
+                    return [cached_file_path]
+                raise
+
+            os.makedirs(cache_entry_dir, exist_ok=True)
+            download_file_path = os.path.join(cache_entry_dir, self.data_ingestion_config.dataset_filename)
+            logger.debug("Downloading [%s] into [%s]", source, download_file_path)
+            with response, open(f"{download_file_path}.part", "wb") as download_file:
+                shutil.copyfileobj(response, download_file)
+            if cached_file_path is not None and get_file_hash(f"{download_file_path}.part") == manifest.get("sha256"):
+                # servers without ETag or Last-Modified send the whole file every time. The cached
+                # copy is kept untouched when the body is the same, so its timestamp does not change
+                os.remove(f"{download_file_path}.part")
+                logger.info(f"[{source}] content unchanged, using cached file [{cached_file_path}]")
+                return [cached_file_path]
+            os.replace(f"{download_file_path}.part", download_file_path)
+            self.update_cache_manifest(cache_entry_dir, source,
+                                       etag=response.headers.get("ETag"),
+                                       last_modified=response.headers.get("Last-Modified"))
+            return [download_file_path]
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def get_local_data(self)->List[str]:
+        """
+        Local file is read in place.
+        """
+        source_path = os.path.join(ROOT_DIR, self.data_ingestion_config.source_path)
+        if not os.path.isfile(source_path):
+            raise ConcreteException(Exception(f"Source file [{source_path}] not found"), sys)
+        return [source_path]
+
+    def get_directory_data(self)->List[str]:
+        """
+        Directory of csv shards, read in place in name order.
+        """
+        source_dir = os.path.join(ROOT_DIR, self.data_ingestion_config.source_path)
+        shard_file_paths = sorted(glob.glob(os.path.join(source_dir, "*.csv")))
+        if len(shard_file_paths) == 0:
+            raise ConcreteException(Exception(f"No csv shard found in [{source_dir}]"), sys)
+        return shard_file_paths
+
+    def write_train_file(self, source_file_paths:List[str], train_file_path:str):
+        """
+        Writes the source files into a single training file with spaces removed from column names.
+        Only the header line is parsed, the rows are streamed as they are.
+        """
+        try:
+            header = None
+            with open(train_file_path, "wb") as train_file:
+                for source_file_path in source_file_paths:
+                    with open(source_file_path, "rb") as source_file:
+                        source_header = [column.strip() for column in next(csv.reader([source_file.readline().decode()]))]
+                        if header is None:
+                            header = source_header
+                            # quoted again where needed, column names may hold commas or quotes
+                            header_line = io.StringIO()
+                            csv.writer(header_line, lineterminator="\n").writerow(header)
+                            train_file.write(header_line.getvalue().encode())
+                        elif source_header != header:
+                            raise Exception(f"Columns of [{source_file_path}] do not match: {source_header}")
+                        shutil.copyfileobj(source_file, train_file, length=1024*1024)
+                        # keep shards on separate lines when a shard does not end with a new line
+                        if source_file.tell() > 0 and train_file.tell() > 0:
+                            source_file.seek(-1, os.SEEK_END)
+                            if source_file.read(1) != b"\n":
+                                train_file.write(b"\n")
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def download_data(self)->DataIngestionArtifact:
+        try:
+            """
+            Gets the data from the configured source and exports the training file
+            """
+            source_type = self.data_ingestion_config.source_type
+            sources = {
+                "kaggle": self.download_kaggle_data,
+                "http": self.download_http_data,
+                "local": self.get_local_data,
+                "directory": self.get_directory_data,
+            }
+            if source_type not in sources:
+                raise Exception(f"Unknown source type: {source_type}. Expected one of {list(sources.keys())}")
+            source_file_paths = sources[source_type]()
+            logger.info(f"Source [{source_type}] files: {source_file_paths}")
 
-            logging.debug(f"Downloading file [{dataset_filename}] from [{dataset_name}] into [{raw_data_dir}]")
-            api.dataset_download_file(dataset = dataset_name, file_name = dataset_filename, path = raw_data_dir)
-            raw_data_file_path = os.path.join(raw_data_dir,dataset_filename)
-            logging.info(f"Download completed. File {raw_data_file_path} downloaded successfully")
-            train_file_path = os.path.join(self.data_ingestion_config.ingested_train_dir,
-                                            dataset_filename)
+            artifact_format = self.data_ingestion_config.artifact_format
+            train_file_path = get_artifact_file_path(os.path.join(self.data_ingestion_config.ingested_train_dir,
+                                                                  self.data_ingestion_config.dataset_filename), artifact_format)
+            # the csv is written straight to the ingested folder, binary formats are converted from a raw copy
+            csv_file_path = train_file_path if artifact_format == "csv" else \
+                os.path.join(self.data_ingestion_config.raw_data_dir, self.data_ingestion_config.dataset_filename)
             # create folders and save data
-            logging.debug(f"Exporting training data to [{train_file_path}] after removing space in columns")
-            os.makedirs(self.data_ingestion_config.ingested_train_dir, exist_ok=True)
-            raw_data = pd.read_csv(raw_data_file_path)
-            for column in raw_data.columns:
-                raw_data.rename(columns={column: column.strip()}, inplace=True)
-            raw_data.to_csv(train_file_path, index=False)
+            logger.debug("Exporting training data to [%s] after removing space in columns", csv_file_path)
+            os.makedirs(os.path.dirname(csv_file_path), exist_ok=True)
+            self.write_train_file(source_file_paths, csv_file_path)
+            if csv_file_path != train_file_path:
+                logger.debug("Converting training data to %s: [%s]", artifact_format, train_file_path)
+                save_data_frame(file_path=train_file_path, dataframe=pd.read_csv(csv_file_path))
             
             data_ingestion_artifact = DataIngestionArtifact(
                 train_file_path  = train_file_path, 
                 is_ingested = True, 
                 message = "Data ingested successfully")
-            logging.info(f"DataIngestionArtifact: [{data_ingestion_artifact}]")
+            logger.info(f"DataIngestionArtifact: [{data_ingestion_artifact}]")
             
             return data_ingestion_artifact
             
@@ -77,6 +231,6 @@ class DataIngestion:
         """
         Acts as destructor. Called before all references to the class object are deleted.
         """
-        logging.info(f"\n{'*' *25} Data Ingestion completed {'*' *25}\n")
+        logger.info(f"\n{'*' *25} Data Ingestion completed {'*' *25}\n")
 
 
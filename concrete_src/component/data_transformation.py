@@ -1,44 +1,53 @@
-from concrete_src.entity.config_entity import DataTransformationConfig
+from concrete_src.entity.config_entity import DataTransformationConfig, IncrementalTrainingConfig
 from concrete_src.entity.artifact_entity import DataValidationArtifact, DataTransformationArtifact, DataIngestionArtifact
 from concrete_src.exception import ConcreteException
-from concrete_src.logger import logging
+from concrete_src.logger import get_logger
 from concrete_src.util.util import read_yaml_file
 from concrete_src.constant import *
-from concrete_src.util.util import save_numpy_array_data, save_object
+from concrete_src.util.util import save_object, load_object, load_data_frame, save_data_frame, get_artifact_file_path
+from concrete_src.util.util import save_numpy_array_data, load_numpy_array_data, get_file_hash, link_file
+from concrete_src.util.model_factory_util import class_for_name
+from concrete_src.entity.incremental_state import *
+from concrete_src.entity.stage_cache import StageCache
 
 from sklearn.preprocessing import StandardScaler, FunctionTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import KNNImputer
 from sklearn.base import BaseEstimator, TransformerMixin
-from sklearn.cluster import KMeans
-from kneed import KneeLocator
+from joblib import Parallel, delayed
 
 import os, sys
+import glob
+import hashlib
 import numpy as np
 import pandas as pd
 
+logger = get_logger(__name__)
+
 class OutlierImputer(BaseEstimator, TransformerMixin):
     '''
     This class extends the functionality of KNNImputer to handle outliers.
-    It makes the outlier null and then uses KNNImputer to fill those values
+    It makes the outlier null and then uses KNNImputer to fill those values.
+    The IQR fences are learned on the training data in fit.
     '''
-    def __init__(self):
-        self.a = []
-        self.b = []
-
     def fit(self, X, y=None):
-        return self
+        try:
+            logger.debug("OutlierImputer: Learning IQR fences")
+            q1, q3 = np.nanquantile(np.asarray(X, dtype=float), [0.25, 0.75], axis=0)
+            IQR = q3 - q1
+            self.lower_bound_ = q1 - 1.5*IQR
+            self.upper_bound_ = q3 + 1.5*IQR
+            return self
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
 
     def transform(self, X, y=None):
         try:
-            logging.debug("OutlierImputer: Converting outliers to NaN")
-            for i in X.columns:
-                q1, q2, q3 = X[i].quantile([0.25,0.5,0.75])
-                IQR = q3 - q1
-                self.a = X[i] > q3 + 1.5*IQR
-                self.b = X[i] < q1 - 1.5*IQR
-                X[i] = np.where(self.a | self.b, np.NaN, X[i])  
+            logger.debug("OutlierImputer: Converting outliers to NaN")
+            # copy so that the caller's data is never modified
+            X = np.array(X, dtype=float)
+            X[(X > self.upper_bound_) | (X < self.lower_bound_)] = np.nan
             return X
         except Exception as e:
             raise ConcreteException(e, sys) from e
@@ -47,15 +56,57 @@ class OutlierImputer(BaseEstimator, TransformerMixin):
         self.fit(X, y=None)
         return self.transform(X, y=None)
 
+    def __setstate__(self, state):
+        # imputers pickled by earlier releases kept no fences, they recomputed them on every batch
+        if "lower_bound_" not in state and ("a" in state or "b" in state):
+            raise Exception("OutlierImputer pickled without fitted IQR fences by an earlier release, "
+                            "it cannot transform. Retrain required: run the training pipeline to export new models")
+        super().__setstate__(state)
+
+def fit_cluster_model(algorithm:str, n_clusters:int, data:np.ndarray, init_centers:np.ndarray=None):
+    """
+    Fits one clustering model for the elbow search.
+    Returns the inertia and the centroids of the fit.
+    init_centers: centroids of a previous run to warm start from
+    """
+    if init_centers is not None and init_centers.shape == (n_clusters, data.shape[1]):
+        init, n_init = init_centers, 1
+    else:
+        init, n_init = 'k-means++', 10
+    cluster_model = class_for_name(module_name='sklearn.cluster', class_name=algorithm)(
+        n_clusters=n_clusters, init=init, n_init=n_init, random_state=42)
+    cluster_model.fit(data)
+    return cluster_model.inertia_, cluster_model.cluster_centers_
+
 class ClusterGenerator(BaseEstimator, TransformerMixin):
-    def __init__(self):
+    '''
+    Finds the optimal number of clusters with the elbow method and keeps the centroids
+    of the chosen fit, so that transform assigns every row to its nearest centroid
+    without refitting on the incoming batch.
+    min_clusters, max_clusters: range of k searched for the elbow
+    algorithm: KMeans or MiniBatchKMeans
+    n_jobs: number of k values fitted in parallel
+    cache_dir: folder where the inertia curve is memoized, keyed by a hash of the data
+    '''
+    def __init__(self, min_clusters:int=1, max_clusters:int=10, algorithm:str='KMeans', n_jobs:int=None, cache_dir:str=None):
+        self.min_clusters = min_clusters
+        self.max_clusters = max_clusters
+        self.algorithm = algorithm
+        self.n_jobs = n_jobs
+        self.cache_dir = cache_dir
         self.number_of_clusters = 0
-        logging.debug("ClusterGenerator: Begin clustering")
+        logger.debug("ClusterGenerator: Begin clustering")
 
     def fit(self, X, y=None):
         try:
+            X = np.asarray(X, dtype=float)
             self.number_of_clusters = self.get_no_of_clusters(X)
-            logging.info(f"ClusterGenerator: Optimal no. of clusters: {self.number_of_clusters}")
+            logger.info(f"ClusterGenerator: Optimal no. of clusters: {self.number_of_clusters}")
+            # the elbow search already fitted this k, reuse its centroids
+            self.cluster_centers_ = self.elbow_centers_[self.number_of_clusters]
+            self.cluster_centers_squared_norm_ = np.einsum('ij,ij->i', self.cluster_centers_, self.cluster_centers_)
+            del self.elbow_centers_
+            return self
         except Exception as e:
             raise ConcreteException(e, sys) from e
 
@@ -69,38 +120,133 @@ class ClusterGenerator(BaseEstimator, TransformerMixin):
         self.fit(X, y=None)
         return self.transform(X, y=None)
 
+    def __setstate__(self, state):
+        # generators pickled by earlier releases kept no centroids, they refit k-means on every batch
+        if "cluster_centers_" not in state and "min_clusters" not in state:
+            raise Exception("ClusterGenerator pickled without fitted centroids by an earlier release, "
+                            "it cannot route rows. Retrain required: run the training pipeline to export new models")
+        super().__setstate__(state)
+
+    def get_elbow_cache_key(self, data:np.ndarray)->str:
+        """
+        Hash of the scaled data and of the search settings.
+        """
+        data_hash = hashlib.sha256(np.ascontiguousarray(data).tobytes())
+        data_hash.update(f"{data.shape}{self.algorithm}{self.min_clusters}{self.max_clusters}".encode())
+        return data_hash.hexdigest()
+
+    def load_elbow_cache(self, file_path:str, k_values:list):
+        """
+        Returns the inertias and centroids stored for k_values, None if unavailable.
+        """
+        try:
+            with np.load(file_path) as elbow_cache:
+                inertias = list(elbow_cache['inertias'])
+                centers = {k: elbow_cache[f'centers_{k}'] for k in k_values}
+            return inertias, centers
+        except Exception as e:
+            logger.warning(f"ClusterGenerator: Elbow cache [{file_path}] stale or corrupt, searching again: {e}")
+            return None
+
+    def get_elbow_settings(self, n_features:int)->dict:
+        """
+        Settings of an elbow search, stored with its inertias and centroids.
+        Centroids are only reused to warm start a search with the same settings.
+        """
+        return {"algorithm": self.algorithm, "min_clusters": self.min_clusters, "max_clusters": self.max_clusters,
+                "n_features": n_features}
+
+    def get_previous_centers(self, n_features:int)->dict:
+        """
+        Centroids from the most recent elbow search with the same algorithm, range of k and no. of features.
+        Searches saved without their settings are skipped.
+        """
+        if self.cache_dir is None:
+            return dict()
+        settings = self.get_elbow_settings(n_features)
+        for file_path in sorted(glob.glob(os.path.join(self.cache_dir, "elbow_*.npz")), key=os.path.getmtime, reverse=True):
+            try:
+                with np.load(file_path) as elbow_cache:
+                    if any(key not in elbow_cache.files or elbow_cache[key].item() != value
+                           for key, value in settings.items()):
+                        logger.debug("ClusterGenerator: Elbow cache [%s] of other settings, skipped", file_path)
+                        continue
+                    centers = {int(key.split('_')[1]): elbow_cache[key] for key in elbow_cache.files if key.startswith('centers_')}
+            except Exception as e:
+                logger.warning(f"ClusterGenerator: Elbow cache [{file_path}] corrupt, not warm starting from it: {e}")
+                continue
+            logger.debug("ClusterGenerator: Warm starting from [%s]", file_path)
+            return centers
+        return dict()
+
     def get_no_of_clusters(self, data):
         try:
-            inertias=[] # initializing an empty list to store inertias for each cluster
-            for i in range (1,11):
-                kmeans=KMeans(n_clusters=i,init='k-means++',random_state=42) # initializing the KMeans object
-                kmeans.fit(data) # fitting the data to the KMeans Algorithm
-                inertias.append(kmeans.inertia_)
+            k_values = list(range(self.min_clusters, self.max_clusters + 1))
+            elbow = None
+            if self.cache_dir is not None:
+                cache_file_path = os.path.join(self.cache_dir, f"elbow_{self.get_elbow_cache_key(data)}.npz")
+                if os.path.exists(cache_file_path):
+                    elbow = self.load_elbow_cache(cache_file_path, k_values)
+                    if elbow is not None:
+                        logger.info(f"ClusterGenerator: Reusing elbow search from [{cache_file_path}]")
+            if elbow is None:
+                previous_centers = self.get_previous_centers(data.shape[1])
+                # fit every k in parallel, each one warm started where possible
+                results = Parallel(n_jobs=self.n_jobs)(
+                    delayed(fit_cluster_model)(self.algorithm, k, data, previous_centers.get(k)) for k in k_values)
+                inertias = [inertia for inertia, _ in results]
+                centers = {k: k_centers for k, (_, k_centers) in zip(k_values, results)}
+                if self.cache_dir is not None:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    np.savez(cache_file_path, inertias=np.array(inertias),
+                             **{f'centers_{k}': k_centers for k, k_centers in centers.items()},
+                             **{key: np.array(value) for key, value in self.get_elbow_settings(data.shape[1]).items()})
+                elbow = inertias, centers
+            inertias, self.elbow_centers_ = elbow
+            # only needed to fit. The locator is not kept on the object, so loading
+            # a fitted preprocessing object for serving does not import kneed
+            from kneed import KneeLocator
             # finding the value of the optimum cluster programmatically
-            self.kn = KneeLocator(range(1, 11), inertias, curve='convex', direction='decreasing')
-            return self.kn.knee
+            knee_locator = KneeLocator(k_values, inertias, curve='convex', direction='decreasing')
+            if knee_locator.knee is None:
+                raise Exception(f"No elbow found for clusters in range {self.min_clusters}-{self.max_clusters}")
+            return int(knee_locator.knee)
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def predict_clusters(self, data) -> np.ndarray:
+        """
+        Assigns each row to the nearest fitted centroid.
+        Squared distances are computed for the whole batch as |x|^2 - 2x.c + |c|^2,
+        the row norm is dropped as it does not change the argmin.
+        """
+        try:
+            data = np.asarray(data, dtype=float)
+            distances = self.cluster_centers_squared_norm_ - 2 * data @ self.cluster_centers_.T
+            return distances.argmin(axis=1)
         except Exception as e:
             raise ConcreteException(e, sys) from e
 
     def create_clusters(self, data):    
         try:
-            kmeans = KMeans(n_clusters=self.number_of_clusters, init='k-means++', random_state=42)
-            clusters = kmeans.fit_predict(data) #  divide data into clusters
-            data = pd.DataFrame(data)
-            data['cluster']=clusters.astype(int)  # create a new column in dataset for storing the cluster information
-            logging.debug(f"ClusterGenerator: Clusters created. Unique clusters: {data['cluster'].unique()}")
-            return data.to_numpy()
+            data = np.asarray(data, dtype=float)
+            clusters = self.predict_clusters(data) #  divide data into clusters
+            logger.debug("ClusterGenerator: Clusters created. Unique clusters: %s", np.unique(clusters))
+            # append the cluster information as the last column
+            return np.column_stack((data, clusters))
         except Exception as e:
             raise ConcreteException(e, sys) from e
 
 class DataTransformation:
 
     def __init__(self, data_transformation_config: DataTransformationConfig, 
-    data_validation_artifact: DataValidationArtifact, data_ingestion_artifact: DataIngestionArtifact):
-        logging.info(f"\n{'*'*20}Data Transformation{'*'*20}")
+    data_validation_artifact: DataValidationArtifact, data_ingestion_artifact: DataIngestionArtifact,
+    incremental_training_config: IncrementalTrainingConfig = None):
+        logger.info(f"\n{'*'*20}Data Transformation{'*'*20}")
         self.data_transformation_config = data_transformation_config
         self.data_validation_artifact = data_validation_artifact
         self.data_ingestion_artifact = data_ingestion_artifact
+        self.incremental_training_config = incremental_training_config
         schema_file_path = self.data_validation_artifact.schema_file_path
         self.dataset_schema = read_yaml_file(schema_file_path)
 
@@ -117,15 +263,20 @@ class DataTransformation:
                 if all_columns[column] !="category" and column != target_column:
                     numerical_columns.append(column)
 
-            logging.info(f"target_column = [{target_column}]")
-            logging.info(f"numerical_columns = [{numerical_columns}]")
+            logger.info(f"target_column = [{target_column}]")
+            logger.info(f"numerical_columns = [{numerical_columns}]")
 
             data_pipeline = Pipeline([
                 ('outlier_imputer', OutlierImputer()),
                 ('nan_imputer', KNNImputer(n_neighbors = 3)),
                 ('log_transformation', FunctionTransformer(np.log1p)),
                 ('std_scaler', StandardScaler()),
-                ('cluster_generator', ClusterGenerator())                
+                ('cluster_generator', ClusterGenerator(
+                    min_clusters=self.data_transformation_config.min_clusters,
+                    max_clusters=self.data_transformation_config.max_clusters,
+                    algorithm=self.data_transformation_config.cluster_algorithm,
+                    n_jobs=self.data_transformation_config.cluster_n_jobs,
+                    cache_dir=self.data_transformation_config.cluster_cache_dir))
             ])
 
             preprocessing = ColumnTransformer([
@@ -136,57 +287,159 @@ class DataTransformation:
         except Exception as e:
             raise ConcreteException(e, sys) from e
 
+    def get_transformation_key(self)->str:
+        """
+        Hash of what the fitted preprocessing depends on besides the data.
+        """
+        return StageCache.get_key(self.data_transformation_config.min_clusters, self.data_transformation_config.max_clusters,
+                                  self.data_transformation_config.cluster_algorithm,
+                                  self.data_transformation_config.artifact_format,
+                                  get_file_hash(self.data_validation_artifact.schema_file_path))
 
-    def initiate_data_transformation(self)->DataTransformationArtifact:
+    def get_incremental_base(self, row_hashes:np.ndarray)->dict:
+        """
+        Returns the state of the previous run when the training data only has rows appended to the rows
+        it transformed, and not more than max_new_rows_fraction of the rows the preprocessing was fitted on,
+        so that appends over several runs add up. None when the data has to be
+        transformed from scratch: incremental training disabled, no previous run, rows changed or removed,
+        too many new rows, or other preprocessing settings.
+        row_hashes: hash of every row of the training data
+        """
         try:
-            logging.info(f"Obtaining preprocessing object.")
-            preprocessing_obj = self.get_data_transformer_object()
-
+            if self.incremental_training_config is None or not self.incremental_training_config.enabled:
+                return None
+            state = IncrementalState(self.incremental_training_config.state_file_path).read()
+            state_files = [state.get(STATE_TRANSFORMED_TRAIN_FILE_PATH), state.get(STATE_ROW_HASHES_FILE_PATH),
+                           state.get(STATE_PREPROCESSED_OBJECT_FILE_PATH)]
+            if any(file_path is None or not os.path.exists(file_path) for file_path in state_files):
+                logger.info("Incremental transformation: no previous run found, transforming all rows")
+                return None
+            if state.get(STATE_TRANSFORMATION_KEY) != self.get_transformation_key():
+                logger.info("Incremental transformation: preprocessing settings changed, transforming all rows")
+                return None
+            previous_row_hashes = load_numpy_array_data(state[STATE_ROW_HASHES_FILE_PATH])
+            previous_rows = len(previous_row_hashes)
+            if len(row_hashes) < previous_rows or not np.array_equal(row_hashes[:previous_rows], previous_row_hashes):
+                logger.info("Incremental transformation: previous rows changed, transforming all rows")
+                return None
+            fitted_rows = state.get(STATE_PREPROCESSING_FITTED_ROWS, previous_rows)
+            new_rows = len(row_hashes) - fitted_rows
+            if new_rows > self.incremental_training_config.max_new_rows_fraction * fitted_rows:
+                logger.info(f"Incremental transformation: {new_rows} rows added since the preprocessing was fitted "
+                            f"on {fitted_rows} rows exceed max new rows fraction, transforming all rows")
+                return None
+            return state
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
 
-            logging.debug(f"Obtaining training file path.")
-            train_file_path = self.data_ingestion_artifact.train_file_path
-            
-            logging.debug(f"Loading training as pandas dataframe.")
-            train_df = pd.read_csv(train_file_path)
+    def fit_transform_rows(self, train_df:pd.DataFrame):
+        """
+        Fits the preprocessing on every row and transforms them.
+        Returns:
+        fitted preprocessing object and transformed training dataframe
+        """
+        try:
+            logger.info(f"Obtaining preprocessing object.")
+            preprocessing_obj = self.get_data_transformer_object()
 
             target_column_name = self.dataset_schema[SCHEMA_FILE_TARGET_COLUMNS]
 
-            logging.debug(f"Splitting input and target feature from training dataframe.")
+            logger.debug("Splitting input and target feature from training dataframe.")
             input_feature_train_df = train_df.drop(columns=[target_column_name],axis=1)
             target_feature_train_df = train_df[target_column_name]
             input_columns = list(input_feature_train_df.columns)
 
-            logging.info(f"Applying preprocessing object on input features dataframe")
+            logger.info(f"Applying preprocessing object on input features dataframe")
             input_feature_train_arr=preprocessing_obj.fit_transform(input_feature_train_df)
             
-            logging.debug(f"Stitching back training data frame.")
+            logger.debug("Stitching back training data frame.")
             input_columns.append('cluster')
             train_df = pd.DataFrame(input_feature_train_arr, columns= input_columns)
             train_df[target_column_name] = target_feature_train_df
+            return preprocessing_obj, train_df.astype({'cluster': int})
+        except Exception as e:
+            raise ConcreteException(e,sys) from e
+
+    def transform_new_rows(self, train_df:pd.DataFrame, state:dict):
+        """
+        Transforms only the rows appended since the previous run with its fitted preprocessing object,
+        so the new rows are routed to the existing clusters by the saved centroids,
+        and appends them to the rows transformed by the previous run.
+        Returns:
+        no. of new rows and transformed training dataframe
+        """
+        try:
+            previous_train_df = load_data_frame(state[STATE_TRANSFORMED_TRAIN_FILE_PATH])
+            new_df = train_df.iloc[len(previous_train_df):]
+            logger.info(f"Incremental transformation: {len(new_df)} new rows appended to "
+                        f"{len(previous_train_df)} previous rows")
+            if len(new_df) == 0:
+                return 0, previous_train_df
+            preprocessing_obj = load_object(state[STATE_PREPROCESSED_OBJECT_FILE_PATH])
+            target_column_name = self.dataset_schema[SCHEMA_FILE_TARGET_COLUMNS]
+            input_feature_new_df = new_df.drop(columns=[target_column_name], axis=1)
+            new_train_df = pd.DataFrame(preprocessing_obj.transform(input_feature_new_df),
+                                        columns=list(input_feature_new_df.columns) + ['cluster'])
+            new_train_df[target_column_name] = new_df[target_column_name].to_numpy()
+            new_train_df = new_train_df.astype(previous_train_df.dtypes.to_dict())
+            logger.debug("New rows per cluster: %s", new_train_df['cluster'].value_counts().to_dict())
+            return len(new_df), pd.concat([previous_train_df, new_train_df], ignore_index=True)
+        except Exception as e:
+            raise ConcreteException(e,sys) from e
+
+    def initiate_data_transformation(self)->DataTransformationArtifact:
+        try:
+            logger.debug("Obtaining training file path.")
+            train_file_path = self.data_ingestion_artifact.train_file_path
             
+            logger.debug("Loading training as pandas dataframe.")
+            train_df = load_data_frame(train_file_path)
+            row_hashes = pd.util.hash_pandas_object(train_df, index=False).to_numpy()
+            incremental_base = self.get_incremental_base(row_hashes)
 
             transformed_train_dir = self.data_transformation_config.transformed_train_dir
             os.makedirs(transformed_train_dir, exist_ok=True)
 
             train_file_name = os.path.basename(train_file_path)
 
-            transformed_train_file_path = os.path.join(transformed_train_dir, train_file_name)
-
-            logging.debug(f"Saving transformed training data at {transformed_train_file_path}")
-            
-            train_df= train_df.astype({'cluster': int})
-            train_df.to_csv(transformed_train_file_path, index=False, header=True)
+            transformed_train_file_path = get_artifact_file_path(os.path.join(transformed_train_dir, train_file_name),
+                                                                 self.data_transformation_config.artifact_format)
             preprocessing_obj_file_path = self.data_transformation_config.preprocessed_object_file_path
 
-            logging.debug(f"Saving preprocessing object at {preprocessing_obj_file_path}")
-            save_object(file_path=preprocessing_obj_file_path,obj=preprocessing_obj)
+            if incremental_base is None:
+                new_rows = len(train_df)
+                preprocessing_obj, train_df = self.fit_transform_rows(train_df)
+                logger.debug("Saving preprocessing object at %s", preprocessing_obj_file_path)
+                save_object(file_path=preprocessing_obj_file_path,obj=preprocessing_obj)
+            else:
+                new_rows, train_df = self.transform_new_rows(train_df, incremental_base)
+                # linked, the unchanged preprocessing object keeps its hash and the trained models stay valid
+                os.makedirs(os.path.dirname(preprocessing_obj_file_path), exist_ok=True)
+                link_file(incremental_base[STATE_PREPROCESSED_OBJECT_FILE_PATH], preprocessing_obj_file_path)
+
+            logger.debug("Saving transformed training data at %s", transformed_train_file_path)
+            save_data_frame(file_path=transformed_train_file_path, dataframe=train_df)
+            row_hashes_file_path = os.path.join(transformed_train_dir, ROW_HASHES_FILE_NAME)
+            save_numpy_array_data(file_path=row_hashes_file_path, array=row_hashes)
+
+            if self.incremental_training_config is not None and self.incremental_training_config.enabled:
+                IncrementalState(self.incremental_training_config.state_file_path).update(**{
+                    STATE_TRANSFORMATION_KEY: self.get_transformation_key(),
+                    STATE_TRANSFORMED_TRAIN_FILE_PATH: transformed_train_file_path,
+                    STATE_ROW_HASHES_FILE_PATH: row_hashes_file_path,
+                    STATE_PREPROCESSED_OBJECT_FILE_PATH: preprocessing_obj_file_path,
+                    STATE_PREPROCESSING_FITTED_ROWS: len(train_df) if incremental_base is None else
+                    incremental_base.get(STATE_PREPROCESSING_FITTED_ROWS, len(train_df) - new_rows)})
 
             data_transformation_artifact = DataTransformationArtifact(is_transformed=True,
             message="Data transformation successfull.",
             transformed_train_file_path=transformed_train_file_path,
-            preprocessed_object_file_path=preprocessing_obj_file_path
+            preprocessed_object_file_path=preprocessing_obj_file_path,
+            row_hashes_file_path=row_hashes_file_path,
+            is_incremental=incremental_base is not None,
+            new_rows=new_rows
             )
-            logging.info(f"Data transformation artifact: {data_transformation_artifact}")
+            logger.info(f"Data transformation artifact: {data_transformation_artifact}")
             return data_transformation_artifact
         except Exception as e:
             raise ConcreteException(e,sys) from e
@@ -195,4 +448,4 @@ class DataTransformation:
         """
         Acts as destructor. Called before all references to the class object are deleted.
         """
-        logging.info(f"\n{'*' *25} Data Transformation log completed {'*' *25}\n")
\ No newline at end of file
+        logger.info(f"\n{'*' *25} Data Transformation log completed {'*' *25}\n")
\ No newline at end of file
@@ -1,16 +1,18 @@
-from concrete_src.logger import logging
+from concrete_src.logger import get_logger
 from concrete_src.exception import ConcreteException
 from concrete_src.config.configuartion import Configuration
 from concrete_src.entity.config_entity import DataValidationConfig
 from concrete_src.entity.artifact_entity import DataValidationArtifact, DataIngestionArtifact
 from concrete_src.constant import *
-from concrete_src.util.util import read_yaml_file
+from concrete_src.util.util import read_yaml_file, write_yaml_file, iter_data_frame_chunks
 
 import sys, os
 import pandas as pd
 import numpy as np
 from collections import OrderedDict
 
+logger = get_logger(__name__)
+
 
 class DataValidation:
     def __init__( self, data_validation_config: DataValidationConfig, 
@@ -22,7 +24,7 @@ class DataValidation:
         data_ingestion_artifact:DataIngestionArtifact
         """
         try:
-            logging.info(f"\n{'*'*20}Data Validation{'*'*20}")
+            logger.info(f"\n{'*'*20}Data Validation{'*'*20}")
             self.data_validation_config = data_validation_config
             self.data_ingestion_artifact = data_ingestion_artifact
         except Exception as e:
@@ -33,18 +35,54 @@ class DataValidation:
             """
             Checks if input file exists
             """
-            logging.debug(f"Checking if input file exists")
+            logger.debug("Checking if input file exists")
             is_file_exists = False
 
             is_file_exists = os.path.exists(self.data_ingestion_artifact.train_file_path)
 
-            logging.info(f"Input File [{self.data_ingestion_artifact.train_file_path}] exists? {is_file_exists}")
+            logger.info(f"Input File [{self.data_ingestion_artifact.train_file_path}] exists? {is_file_exists}")
 
             if not (is_file_exists):
                 raise Exception(f"Input file not available")
         except Exception as e:
             raise ConcreteException(e, sys) from e
 
+    def validate_columns(self, data_columns, schema_columns:dict):
+        """
+        Checks the no. of columns and the column names against the schema.
+        """
+        try:
+            logger.debug("Data Columns: %s", sorted(data_columns))
+            if len(schema_columns) != len(data_columns):
+                raise Exception(f"No. of columns not matching")
+            for data_col, schema_col in zip(sorted(data_columns), sorted(schema_columns.keys())):
+                if str.strip(data_col) != str.strip(schema_col):
+                    raise Exception(f"Schema Column {schema_col} not same as DataColumn {data_col}")
+            logger.debug("Validated no. of columns and column names: %s", len(data_columns))
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def validate_chunk(self, chunk:pd.DataFrame, schema_types:dict, column_report:dict)->str:
+        """
+        Checks the data types of a chunk and adds its null count and value range to the column report.
+        Types are checked per chunk, so a chunk passes if its inferred type casts safely to the schema type.
+        Returns the type mismatch found, None if the chunk is valid.
+        """
+        try:
+            for data_col in chunk.columns:
+                schema_type = schema_types[str.strip(data_col)]
+                if not np.can_cast(chunk[data_col].dtype, schema_type, casting="safe"):
+                    return f"Schema Column {data_col}: {schema_type} not same as DataColumn {data_col}: {chunk[data_col].dtype}"
+                values = chunk[data_col].to_numpy(dtype=float)
+                report = column_report[str.strip(data_col)]
+                report["null_count"] += int(np.isnan(values).sum())
+                if not np.isnan(values).all():
+                    report["min"] = float(np.nanmin(values)) if report["min"] is None else min(report["min"], float(np.nanmin(values)))
+                    report["max"] = float(np.nanmax(values)) if report["max"] is None else max(report["max"], float(np.nanmax(values)))
+            return None
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
     def validate_dataset_schema(self):
         try:
             """
@@ -52,26 +90,40 @@ class DataValidation:
             1. Number of columns
             2. Column names
             3. Data types
+            The file is read in chunks of chunk_size rows, so memory does not grow with the file.
+            Validation stops at the first bad chunk. Row, null and range counts are written to the validation report.
             """      
             schema_file_path = os.path.join(self.data_validation_config.schema_file_path)   
-            logging.info(f"Reading schema file: {schema_file_path}")    
+            logger.info(f"Reading schema file: {schema_file_path}")    
             schema_info = read_yaml_file(file_path = schema_file_path)
             schema_columns = OrderedDict(sorted(schema_info["columns"].items()))
-            logging.debug(f"Schema Info: {schema_columns}")
-            input_data = pd.read_csv(self.data_ingestion_artifact.train_file_path)  
-            logging.debug(f"Data Columns: {input_data.columns.sort_values()}")         
-            if len(schema_columns) == input_data.shape[1]:
-                logging.debug(f"Validated no. of columns: {input_data.shape[1]}")
-                logging.debug("Validating columns and types")
-                for data_col, schema_col in zip(input_data.columns.sort_values(), schema_columns.keys()):
-                    if str.strip(data_col)==str.strip(schema_col):
-                        if not(np.issubdtype(input_data[data_col].dtype, np.dtype(schema_columns[schema_col]))):
-                            raise Exception(f"Schema Column {schema_col}: {np.dtype(schema_columns[schema_col])} not same as DataColumn {data_col}: {input_data[data_col].dtype}")
-                    else:
-                        raise Exception(f"Schema Column {schema_col} not same as DataColumn {data_col}")                 
-            else:
-                raise Exception(f"No. of columns not matching") 
-            logging.info("Validated columns and types")
+            logger.debug("Schema Info: %s", schema_columns)
+            schema_types = {str.strip(column): np.dtype(column_type) for column, column_type in schema_columns.items()}
+            column_report = {column: {"dtype": str(column_type), "null_count": 0, "min": None, "max": None}
+                             for column, column_type in schema_types.items()}
+            validation_report = {"file_path": self.data_ingestion_artifact.train_file_path, "rows": 0, "chunks": 0,
+                                 "columns": column_report, "is_validated": False, "message": ""}
+            try:
+                for chunk in iter_data_frame_chunks(self.data_ingestion_artifact.train_file_path,
+                                                    self.data_validation_config.chunk_size):
+                    if validation_report["chunks"] == 0:
+                        self.validate_columns(list(chunk.columns), schema_columns)
+                    chunk_error = self.validate_chunk(chunk, schema_types, column_report)
+                    if chunk_error is not None:
+                        raise Exception(f"Chunk {validation_report['chunks']} starting at row {validation_report['rows']}: {chunk_error}")
+                    validation_report["rows"] += len(chunk)
+                    validation_report["chunks"] += 1
+                if validation_report["rows"] == 0:
+                    raise Exception(f"Input file has no rows")
+                validation_report["is_validated"] = True
+                validation_report["message"] = "Validated columns and types"
+            except Exception as e:
+                validation_report["message"] = str(e)
+                raise
+            finally:
+                write_yaml_file(file_path=self.data_validation_config.report_file_path, data=validation_report)
+                logger.info(f"Validation report: [{self.data_validation_config.report_file_path}]")
+            logger.info(f"Validated columns and types of {validation_report['rows']} rows in {validation_report['chunks']} chunks")
         except Exception as e:
             raise ConcreteException(e, sys) from e
 
@@ -86,10 +138,11 @@ class DataValidation:
 
             data_validation_artifact = DataValidationArtifact(
                 schema_file_path = self.data_validation_config.schema_file_path, 
+                report_file_path = self.data_validation_config.report_file_path,
                 is_validated = True,
                 message = "Data Validation Performed Successfully"
             )
-            logging.info(f"data_validation_artifact: {data_validation_artifact}")
+            logger.info(f"data_validation_artifact: {data_validation_artifact}")
             return data_validation_artifact
         except Exception as e:
             raise ConcreteException(e, sys) from e
@@ -98,4 +151,4 @@ class DataValidation:
         """
         Acts as destructor. Called before all references to the class object are deleted.
         """
-        logging.info(f"\n{'*' *25} Data Validation log completed {'*' *25}\n")
+        logger.info(f"\n{'*' *25} Data Validation log completed {'*' *25}\n")
@@ -1,16 +1,23 @@
 import os
 import sys
 import numpy as np
+import pandas as pd
 from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from sklearn.base import clone
+from sklearn.metrics import r2_score
+from sklearn.model_selection import cross_val_predict
 
 from concrete_src.constant import *
 from concrete_src.entity.model_entity import BestModel
-from concrete_src.logger import logging
+from concrete_src.logger import get_logger
 from concrete_src.exception import ConcreteException
 from concrete_src.entity.config_entity import ModelEvaluationConfig
 from concrete_src.entity.artifact_entity import DataIngestionArtifact,DataValidationArtifact,ModelTrainerArtifact,ModelEvaluationArtifact
-from concrete_src.util.util import create_list, get_cluster, write_yaml_file, read_yaml_file, load_object, load_data
-from concrete_src.util.model_factory import evaluate_regression_model
+from concrete_src.util.util import create_list, write_yaml_file, read_yaml_file, load_data, load_numpy_array_data
+from concrete_src.entity.model_bundle import ModelBundle, get_model_bundle, load_cluster_model, get_preprocessing_hash
+
+logger = get_logger(__name__)
 
 class ModelEvaluation:
 
@@ -19,12 +26,13 @@ class ModelEvaluation:
                  data_validation_artifact: DataValidationArtifact,
                  model_trainer_artifact: ModelTrainerArtifact):
         try:
-            logging.info(f"\n{'*' * 30}Model Evaluation log started.{'*' * 30} ")
+            logger.info(f"\n{'*' * 30}Model Evaluation log started.{'*' * 30} ")
             self.model_evaluation_config = model_evaluation_config
             self.model_trainer_artifact = model_trainer_artifact
             self.data_ingestion_artifact = data_ingestion_artifact
             self.data_validation_artifact = data_validation_artifact
             self.model_evaluation_files_path = create_list(len(self.model_trainer_artifact.clusters))
+            self.previous_model_paths = create_list(len(self.model_trainer_artifact.clusters))
         except Exception as e:
             raise ConcreteException(e, sys) from e
 
@@ -35,7 +43,7 @@ class ModelEvaluation:
         Dictionary with key as cluster number and value as previous best model path
         """
         try:
-            logging.info("Get previous best models")
+            logger.info("Get previous best models")
             previous_models = create_list(len(self.model_trainer_artifact.clusters))
             
             for cluster in self.model_trainer_artifact.clusters:
@@ -44,11 +52,11 @@ class ModelEvaluation:
                     self.model_evaluation_config.model_evaluation_file_prefix+str(cluster)+".yaml"
                 )
                 self.model_evaluation_files_path[cluster] = model_evaluation_file_path
-                logging.debug("Get previous best model:cluster {cluster} from {model_evaluation_file_path}")
+                logger.debug("Get previous best model:cluster %s from %s", cluster, model_evaluation_file_path)
                 if not os.path.exists(model_evaluation_file_path):
                     write_yaml_file(file_path=model_evaluation_file_path)
                     previous_models[cluster]=None
-                    logging.info("No previous model found")
+                    logger.info("No previous model found")
                     continue
                 model_eval_file_content = read_yaml_file(file_path=model_evaluation_file_path)
 
@@ -56,12 +64,13 @@ class ModelEvaluation:
 
                 if BEST_MODEL_KEY not in model_eval_file_content:
                     previous_models[cluster]=None
-                    logging.info("No previous model found")
+                    logger.info("No previous model found")
                     continue
 
-                model = load_object(file_path=model_eval_file_content[BEST_MODEL_KEY][MODEL_PATH_KEY])
+                self.previous_model_paths[cluster] = model_eval_file_content[BEST_MODEL_KEY][MODEL_PATH_KEY]
+                model = load_cluster_model(self.previous_model_paths[cluster], cluster)
                 previous_models[cluster]=model
-                logging.info(f"cluster {cluster} : {model}")
+                logger.info("cluster %s : %s", cluster, model)
             return previous_models
         except Exception as e:
             raise ConcreteException(e, sys) from e
@@ -78,7 +87,7 @@ class ModelEvaluation:
             if BEST_MODEL_KEY in model_eval_content:
                 previous_best_model = model_eval_content[BEST_MODEL_KEY]
 
-            logging.info(f"Previous eval result: {model_eval_content}")
+            logger.info("Previous eval result: %s", model_eval_content)
             current_eval_content = {
                 BEST_MODEL_KEY: {
                     MODEL_PATH_KEY: evaluated_model_path,
@@ -94,83 +103,251 @@ class ModelEvaluation:
                     model_eval_content[HISTORY_KEY].update(previous_model)
 
             model_eval_content.update(current_eval_content)
-            logging.info(f"Updated eval result:{model_eval_content}")
+            logger.info("Updated eval result:%s", model_eval_content)
             write_yaml_file(file_path=eval_file_path, data=model_eval_content)
 
         except Exception as e:
             raise ConcreteException(e, sys) from e
 
-    def initiate_model_evaluation(self) -> ModelEvaluationArtifact:
+    def get_held_out_predictions(self, model, features:np.ndarray, y:np.ndarray, columns:list)->np.ndarray:
+        """
+        Out of fold predictions of the model on its cluster rows, with the folds of the model search,
+        so that every model is scored on rows it was not fitted on. nan when the cluster has fewer rows than folds.
+        """
         try:
-            trained_models_file_path = self.model_trainer_artifact.trained_models_file_path
-            trained_model_objects = create_list(len(self.model_trainer_artifact.clusters))
-            logging.info("Get currently trained model objects")
-            for model_file in trained_models_file_path:                
-                cluster = get_cluster(model_file)
-                trained_model_objects[cluster] = load_object(file_path=model_file)
-                logging.info(f"Cluster {cluster}: {trained_model_objects[cluster]}")
+            if len(y) < self.model_evaluation_config.cv_folds:
+                return np.full(len(y), np.nan)
+            return cross_val_predict(clone(model.trained_model_object), pd.DataFrame(features, columns=columns), y,
+                                     cv=self.model_evaluation_config.cv_folds)
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
 
-            previous_models = self.get_previous_best_models()
+    def get_prediction_matrix(self, X:pd.DataFrame, y:np.ndarray, champion_models:list, challenger_models:list,
+                              preprocessing_hashes:dict, challenger_fold_predictions:np.ndarray=None):
+        """
+        Held out predictions of the previous (champion) and the current (challenger) model of every cluster.
+        Every model is scored on the rows its own preprocessing object routes to its cluster, the rows
+        it is sent when served. The rows are transformed and routed once per preprocessing,
+        models whose preprocessing has the same hash share the routing. Cluster models are scored concurrently.
+        champion_models, challenger_models: model of each cluster indexed by cluster, None if missing
+        preprocessing_hashes: hash of the preprocessing of each model keyed by id of the model
+        challenger_fold_predictions: label and out of fold prediction of every row kept by the model trainer,
+        used for the challengers instead of fitting them again when their labels are those of the cluster rows.
+        Rows of a cluster the challenger has no prediction of (the rows a warm start was fitted on) are not scored
+        Returns:
+        (cluster of each row, prediction matrix) keyed by preprocessing hash, the prediction matrix holds
+        the predictions of the champion (column 0) and challenger (column 1) routed by that preprocessing
+        """
+        try:
+            routings = dict()
+            for models in [challenger_models, champion_models]:
+                for model in models:
+                    if model is not None and preprocessing_hashes[id(model)] not in routings:
+                        transformed_feature = np.asarray(model.preprocessing_object.transform(X))
+                        routings[preprocessing_hashes[id(model)]] = (transformed_feature[:, -1].astype(int),
+                                                                     transformed_feature[:, :-1],
+                                                                     np.full((len(X), 2), np.nan))
 
-            train_file_path = self.data_ingestion_artifact.train_file_path
+            unscored_rows = []
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                futures = dict()
+                for column, models in enumerate([champion_models, challenger_models]):
+                    for cluster, model in enumerate(models):
+                        if model is None:
+                            continue
+                        clusters, features, prediction_matrix = routings[preprocessing_hashes[id(model)]]
+                        rows = np.flatnonzero(clusters == cluster)
+                        if column == 1 and challenger_fold_predictions is not None and \
+                                len(challenger_fold_predictions) == len(X) and \
+                                not np.isnan(challenger_fold_predictions[rows, 1]).all() and \
+                                np.allclose(challenger_fold_predictions[rows, 0], y[rows]):
+                            prediction_matrix[rows, column] = challenger_fold_predictions[rows, 1]
+                            # a warm started model has predictions of its held out rows only,
+                            # the previous model is scored on the same rows
+                            unscored_rows.append((prediction_matrix, rows[np.isnan(challenger_fold_predictions[rows, 1])]))
+                        elif len(rows) > 0:
+                            futures[executor.submit(self.get_held_out_predictions, model, features[rows], y[rows],
+                                                    list(X.columns))] = (prediction_matrix, rows, column)
+                for future, (prediction_matrix, rows, column) in futures.items():
+                    prediction_matrix[rows, column] = future.result()
+            for prediction_matrix, rows in unscored_rows:
+                prediction_matrix[rows, 0] = np.nan
+            return {preprocessing_hash: (clusters, prediction_matrix)
+                    for preprocessing_hash, (clusters, _, prediction_matrix) in routings.items()}
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
 
-            schema_file_path = self.data_validation_artifact.schema_file_path
+    @staticmethod
+    def get_r2(y:np.ndarray, prediction:np.ndarray)->float:
+        """
+        r2 over the rows with a prediction, nan when a row has none.
+        """
+        if np.isnan(prediction).any():
+            return np.nan
+        return float(r2_score(y, prediction))
 
-            train_dataframe = load_data(file_path=train_file_path,
-                                                           schema_file_path=schema_file_path
-                                                           )              
+    @staticmethod
+    def get_cluster_metrics(y:np.ndarray, clusters:np.ndarray, prediction_matrix:np.ndarray, n_clusters:int):
+        """
+        r2 and rmse of every column of the prediction matrix within every cluster, over the rows
+        the column has a prediction of, accumulated with bincount instead of a loop over clusters.
+        Rows routed to a cluster id of n_clusters or above are left out: a previous model fitted
+        with more clusters than this run routes rows to clusters this run has no model for.
+        Returns:
+        r2 and rmse arrays of shape (no. of clusters, no. of columns), nan where a column has no prediction
+        """
+        is_run_cluster = clusters < n_clusters
+        clusters, y, prediction_matrix = clusters[is_run_cluster], y[is_run_cluster], prediction_matrix[is_run_cluster]
+        r2 = np.full((n_clusters, prediction_matrix.shape[1]), np.nan)
+        rmse = np.full((n_clusters, prediction_matrix.shape[1]), np.nan)
+        for column in range(prediction_matrix.shape[1]):
+            is_predicted = ~np.isnan(prediction_matrix[:, column])
+            counts = np.bincount(clusters, weights=is_predicted, minlength=n_clusters)
+            y_sum = np.bincount(clusters, weights=np.where(is_predicted, y, 0.0), minlength=n_clusters)
+            y_squared_sum = np.bincount(clusters, weights=np.where(is_predicted, y * y, 0.0), minlength=n_clusters)
+            total_sum_of_squares = y_squared_sum - y_sum ** 2 / np.maximum(counts, 1)
+            squared_error = np.where(is_predicted, (prediction_matrix[:, column] - y) ** 2, 0.0)
+            residual_sum_of_squares = np.bincount(clusters, weights=squared_error, minlength=n_clusters)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                has_predictions = counts > 0
+                r2[:, column] = np.where(has_predictions, 1 - residual_sum_of_squares / total_sum_of_squares, np.nan)
+                rmse[:, column] = np.where(has_predictions, np.sqrt(residual_sum_of_squares / counts), np.nan)
+        return r2, rmse
 
-            evaluated_model_paths = create_list(len(self.model_trainer_artifact.clusters))
-            is_models_accepted = create_list(len(self.model_trainer_artifact.clusters))
+    def initiate_model_evaluation(self) -> ModelEvaluationArtifact:
+        """
+        Accepts models on held out scores: the out of fold predictions of the previous and the current model.
+        The clusters of the models being served and of this run can be compared one by one only when
+        both were routed by the same preprocessing. Otherwise their cluster ids do not name the same
+        clusters, and the run is accepted or rejected as a whole on the r2 over all the rows, so that
+        a release never mixes models of different preprocessing.
+        """
+        try:
+            trained_models_file_path = self.model_trainer_artifact.trained_models_file_path
+            clusters = self.model_trainer_artifact.clusters
+            n_clusters = len(clusters)
+            # clusters carried forward by an incremental training run were evaluated when they were trained
+            is_models_refit = self.model_trainer_artifact.is_models_refit or [True] * n_clusters
+            run_preprocessing_hash = get_preprocessing_hash(trained_models_file_path[clusters[0]], clusters[0])
 
-            for cluster in self.model_trainer_artifact.clusters:
-                logging.info(f"{'>'*10}Cluster:{cluster} model evaluation{'>'*10}")                
-                if previous_models[cluster] is None:
-                    logging.info("Not found any existing model.")
-                    evaluated_model_paths[cluster] = trained_models_file_path[cluster]
-                    is_models_accepted[cluster] = True
-                    self.update_evaluation_report(cluster= cluster, evaluated_model_path=trained_models_file_path[cluster],
-                                                                    is_model_accepted=True)
-                    logging.info(f"Currently trained model accepted. {trained_models_file_path[cluster]}")
-                    continue
+            previous_models = self.get_previous_best_models()
+            # hash of the preprocessing of every model keyed by id of the model
+            preprocessing_hashes = {id(previous_models[cluster]):
+                                    get_preprocessing_hash(self.previous_model_paths[cluster], cluster)
+                                    for cluster in clusters if previous_models[cluster] is not None}
+            champion_preprocessing_hashes = set(preprocessing_hashes.values())
+            is_run_evaluated = len(champion_preprocessing_hashes - {run_preprocessing_hash}) > 0
+            if is_run_evaluated:
+                logger.info("Previous models were routed by another preprocessing, evaluating the run as a whole")
+                # every cluster of the run is pushed or none, carried clusters included
+                is_models_evaluated = [True] * n_clusters
+                # previous models fitted with more clusters than this run route rows to clusters
+                # beyond those of this run, their models are loaded from the same bundles
+                for model_file_path in set(self.previous_model_paths) - {None}:
+                    if not ModelBundle.is_model_bundle(model_file_path):
+                        continue
+                    for cluster in get_model_bundle(model_file_path).clusters:
+                        if cluster >= len(previous_models):
+                            previous_models.extend([None] * (cluster + 1 - len(previous_models)))
+                        if previous_models[cluster] is None:
+                            previous_models[cluster] = load_cluster_model(model_file_path, cluster)
+                            preprocessing_hashes[id(previous_models[cluster])] = \
+                                get_preprocessing_hash(model_file_path, cluster)
+            else:
+                is_models_evaluated = is_models_refit
 
-                previous_model = previous_models[cluster]
-                trained_model = trained_model_objects[cluster]
+            trained_model_objects = create_list(n_clusters)
+            logger.info("Get currently trained model objects")
+            for cluster in clusters:
+                if not is_models_evaluated[cluster]:
+                    continue
+                trained_model_objects[cluster] = load_cluster_model(trained_models_file_path[cluster], cluster)
+                preprocessing_hashes[id(trained_model_objects[cluster])] = run_preprocessing_hash
+                logger.info("Cluster %s: %s", cluster, trained_model_objects[cluster])
 
-                both_models = [previous_model, trained_model]
+            evaluated_model_paths = list(trained_models_file_path)
+            is_models_accepted = [False] * n_clusters
+            for cluster in clusters:
+                if not is_models_evaluated[cluster]:
+                    previous_models[cluster] = None
+                    logger.info(f"Cluster {cluster}: model carried forward from an earlier run, not evaluated again")
+                elif self.previous_model_paths[cluster] == trained_models_file_path[cluster]:
+                    # trained models reused from the stage cache are already the best model
+                    logger.info(f"Trained model {trained_models_file_path[cluster]} is already the best model")
+                    previous_models[cluster] = trained_model_objects[cluster] = None
 
-                logging.info(f"Comparing previous model {previous_model} & current model {trained_model}")
-                metric_info_artifact = evaluate_regression_model(model_list=both_models,
-                                                                X_train=train_dataframe[train_dataframe.columns[:-1]],
-                                                                y_train=train_dataframe[train_dataframe.columns[-1]],
-                                                                flag = 1
-                                                                )
-                logging.info(f"Model evaluation completed. Model metric artifact: {metric_info_artifact}")
+            if not any(model is not None for model in trained_model_objects):
+                model_evaluation_artifact = ModelEvaluationArtifact(clusters=clusters,
+                                                                    is_models_accepted=is_models_accepted,
+                                                                    evaluated_model_paths=evaluated_model_paths,
+                                                                    is_models_refit=is_models_refit)
+                logger.info(f"No cluster to evaluate. Model EvaluationArtifact {model_evaluation_artifact}")
+                return model_evaluation_artifact
 
-                if metric_info_artifact is None:
-                    evaluated_model_paths[cluster] = trained_models_file_path[cluster]
-                    is_models_accepted[cluster] = False
-                    logging.info(f"Current model rejected. {trained_models_file_path[cluster]}")
-                    continue
+            train_dataframe = load_data(file_path=self.data_ingestion_artifact.train_file_path,
+                                        schema_file_path=self.data_validation_artifact.schema_file_path)
 
-                if metric_info_artifact.index_number == 1:
-                    evaluated_model_paths[cluster] = trained_models_file_path[cluster]
-                    is_models_accepted[cluster] = True
-                    self.update_evaluation_report(cluster= cluster, evaluated_model_path=trained_models_file_path[cluster],
-                                                                    is_model_accepted=True)
-                    logging.info(f"Current model accepted. {trained_models_file_path[cluster]} ")
+            logger.info("Scoring previous and current models of all the clusters")
+            X = train_dataframe[train_dataframe.columns[:-1]]
+            y = train_dataframe[train_dataframe.columns[-1]].to_numpy(dtype=float)
+            fold_predictions_file_path = self.model_trainer_artifact.fold_predictions_file_path
+            challenger_fold_predictions = None
+            if fold_predictions_file_path is not None and os.path.exists(fold_predictions_file_path):
+                challenger_fold_predictions = load_numpy_array_data(fold_predictions_file_path)
+            routings = self.get_prediction_matrix(X=X, y=y, champion_models=previous_models,
+                                                  challenger_models=trained_model_objects,
+                                                  preprocessing_hashes=preprocessing_hashes,
+                                                  challenger_fold_predictions=challenger_fold_predictions)
+            base_accuracy = self.model_evaluation_config.base_accuracy
 
+            if is_run_evaluated:
+                run_clusters, run_prediction_matrix = routings[run_preprocessing_hash]
+                current_accuracy = ModelEvaluation.get_r2(y, run_prediction_matrix[:, 1])
+                previous_accuracy = np.nan
+                if len(champion_preprocessing_hashes) == 1:
+                    _, previous_prediction_matrix = routings[next(iter(champion_preprocessing_hashes))]
+                    previous_accuracy = ModelEvaluation.get_r2(y, previous_prediction_matrix[:, 0])
                 else:
-                    logging.info("Trained model is no better than existing model hence not accepting trained model")
-                    evaluated_model_paths[cluster] = trained_models_file_path[cluster]
-                    is_models_accepted[cluster] = False
+                    logger.info("Previous models mix preprocessing, they cannot be served together and are not compared")
+                logger.info(f"Held out r2 over all rows. Previous models: {previous_accuracy}, current run: {current_accuracy}")
+                # at least base accuracy and no worse than the previous models, a previous model
+                # missing rows cannot serve them all and does not hold the run back
+                is_run_accepted = current_accuracy >= base_accuracy and \
+                    (np.isnan(previous_accuracy) or current_accuracy >= previous_accuracy)
+                for cluster in clusters:
+                    is_models_accepted[cluster] = is_run_accepted
+                    if is_run_accepted:
+                        self.update_evaluation_report(cluster=cluster, evaluated_model_path=trained_models_file_path[cluster],
+                                                      is_model_accepted=True)
+                logger.info(f"Current run {'accepted' if is_run_accepted else 'not accepted'}")
+            else:
+                run_clusters, prediction_matrix = routings[run_preprocessing_hash]
+                r2, rmse = ModelEvaluation.get_cluster_metrics(y=y, clusters=run_clusters,
+                                                               prediction_matrix=prediction_matrix,
+                                                               n_clusters=n_clusters)
+                for cluster in clusters:
+                    if trained_model_objects[cluster] is None:
+                        continue
+                    logger.info(f"{'>'*10}Cluster:{cluster} model evaluation{'>'*10}")
+                    previous_accuracy, current_accuracy = r2[cluster]
+                    logger.info("Held out r2, rmse. Previous model %s: %s, %s. Current model %s: %s, %s",
+                                previous_models[cluster], previous_accuracy, rmse[cluster][0],
+                                trained_model_objects[cluster], current_accuracy, rmse[cluster][1])
+                    # at least base accuracy and no worse than the previous model
+                    if current_accuracy >= base_accuracy and (np.isnan(previous_accuracy) or current_accuracy >= previous_accuracy):
+                        is_models_accepted[cluster] = True
+                        self.update_evaluation_report(cluster= cluster, evaluated_model_path=trained_models_file_path[cluster],
+                                                                        is_model_accepted=True)
+                        logger.info(f"Current model accepted. {trained_models_file_path[cluster]} ")
+                    else:
+                        logger.info("Trained model is no better than existing model hence not accepting trained model")
 
-            model_evaluation_artifact = ModelEvaluationArtifact(clusters = self.model_trainer_artifact.clusters, is_models_accepted = is_models_accepted, 
-                                        evaluated_model_paths = evaluated_model_paths)
-            logging.info(f"Model EvaluationArtifact {model_evaluation_artifact}")
+            model_evaluation_artifact = ModelEvaluationArtifact(clusters = clusters, is_models_accepted = is_models_accepted,
+                                        evaluated_model_paths = evaluated_model_paths, is_models_refit = is_models_refit)
+            logger.info(f"Model EvaluationArtifact {model_evaluation_artifact}")
             return model_evaluation_artifact
         except Exception as e:
             raise ConcreteException(e, sys) from e
 
     def __del__(self):
-        logging.info(f"\n{'=' * 20}Model Evaluation log completed.{'=' * 20}\n")
\ No newline at end of file
+        logger.info(f"\n{'=' * 20}Model Evaluation log completed.{'=' * 20}\n")
\ No newline at end of file
@@ -1,11 +1,15 @@
-from concrete_src.logger import logging
+from concrete_src.logger import get_logger
 from concrete_src.exception import ConcreteException
 from concrete_src.entity.artifact_entity import ModelPusherArtifact, ModelEvaluationArtifact 
 from concrete_src.entity.config_entity import ModelPusherConfig
 from concrete_src.util.util import create_list
+from concrete_src.entity.model_bundle import get_model_bundle
+from concrete_src.entity.model_release import promote_release
+from concrete_src.constant import *
 
 import os, sys
-import shutil
+
+logger = get_logger(__name__)
 
 
 class ModelPusher:
@@ -14,7 +18,7 @@ class ModelPusher:
                  model_evaluation_artifact: ModelEvaluationArtifact
                  ):
         try:
-            logging.info(f"\n{'>>' * 30}Model Pusher log started.{'<<' * 30} ")
+            logger.info(f"\n{'>>' * 30}Model Pusher log started.{'<<' * 30} ")
             self.model_pusher_config = model_pusher_config
             self.model_evaluation_artifact = model_evaluation_artifact
 
@@ -22,31 +26,45 @@ class ModelPusher:
             raise ConcreteException(e, sys) from e
 
     def export_model(self) -> ModelPusherArtifact:
+        """
+        Promotes a new release folder holding the bundles of the accepted clusters, each bundle once,
+        and the models still served for the other clusters. Files are hard linked, not copied.
+        """
         try:
             evaluated_model_file_paths = self.model_evaluation_artifact.evaluated_model_paths
             export_dir = self.model_pusher_config.export_dir_path
             is_models_pushed = create_list(len(self.model_evaluation_artifact.clusters))
             export_model_file_paths = create_list(len(self.model_evaluation_artifact.clusters))
+            accepted_model_files = dict()
             for cluster in self.model_evaluation_artifact.clusters:
                 if self.model_evaluation_artifact.is_models_accepted[cluster]:
-                    model_file_name = os.path.basename(evaluated_model_file_paths[cluster])
-                    export_model_file_path = os.path.join(export_dir, model_file_name)
-                    logging.debug(f"Exporting model file: [{export_model_file_path}]")
-                    os.makedirs(export_dir, exist_ok=True)
-
-                    shutil.copy(src=evaluated_model_file_paths[cluster], dst=export_model_file_path)
-                    logging.info(
-                        f"Cluster{cluster} Trained model: {evaluated_model_file_paths[cluster]} is copied in export dir:[{export_model_file_path}]")
+                    # opened first, so that a bundle with a damaged manifest is never promoted
+                    model_bundle = get_model_bundle(evaluated_model_file_paths[cluster])
+                    logger.debug("Exporting cluster %s model bundle %s", cluster, model_bundle.version)
+                    accepted_model_files[int(cluster)] = (evaluated_model_file_paths[cluster],
+                                                          f"model_bundle_{model_bundle.version}.zip")
                     is_models_pushed[cluster] = True
-                    export_model_file_paths[cluster] = export_model_file_path
+                elif self.model_evaluation_artifact.is_models_refit is not None and \
+                        not self.model_evaluation_artifact.is_models_refit[cluster]:
+                    is_models_pushed[cluster] = False
+                    logger.info(f"cluster{cluster} model carried forward, the release being served keeps its model.")
                 else:
                     is_models_pushed[cluster] = False
-                    logging.info(f"cluster{cluster} trained model rejected and hence not pushed.")
+                    logger.info(f"cluster{cluster} trained model rejected and hence not pushed.")
+
+            if len(accepted_model_files) > 0:
+                release_model_paths = promote_release(model_dir=os.path.dirname(export_dir),
+                                                      release=os.path.basename(export_dir),
+                                                      model_files=accepted_model_files)
+                for cluster in accepted_model_files:
+                    export_model_file_paths[cluster] = release_model_paths[cluster]
+                    logger.info(
+                        f"Cluster{cluster} Trained model: {evaluated_model_file_paths[cluster]} is linked in export dir:[{release_model_paths[cluster]}]")
 
             model_pusher_artifact = ModelPusherArtifact(is_models_pushed = is_models_pushed,
                                                         export_model_file_paths = export_model_file_paths
                                                         )
-            logging.info(f"Model pusher artifact: [{model_pusher_artifact}]")
+            logger.info(f"Model pusher artifact: [{model_pusher_artifact}]")
             return model_pusher_artifact
         except Exception as e:
             raise ConcreteException(e, sys) from e
@@ -58,4 +76,4 @@ class ModelPusher:
             raise ConcreteException(e, sys) from e
 
     def __del__(self):
-        logging.info(f"\n{'>>' * 20}Model Pusher log completed.{'<<' * 20} ")
\ No newline at end of file
+        logger.info(f"\n{'>>' * 20}Model Pusher log completed.{'<<' * 20} ")
\ No newline at end of file
@@ -1,54 +1,77 @@
-from concrete_src.entity.config_entity import ModelTrainerConfig
+from concrete_src.entity.config_entity import ModelTrainerConfig, IncrementalTrainingConfig
 from concrete_src.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact
 from concrete_src.util.model_factory import ModelFactory
 from concrete_src.exception import ConcreteException
-from concrete_src.logger import logging
+from concrete_src.logger import get_logger
 from concrete_src.constant import *
 from concrete_src.util.util import *
 from concrete_src.entity.model_entity import *
 from concrete_src.util.model_factory import evaluate_regression_model
+from concrete_src.entity.estimator import ConcreteStrengthEstimatorModel, ClusterRoutedEstimatorModel
+from concrete_src.entity.model_bundle import ModelBundle, get_model_bundle, load_cluster_model
+from concrete_src.entity.model_cache import load_cached_object
+from concrete_src.entity.stage_profiler import profile
+from concrete_src.entity.incremental_state import *
+from concrete_src.entity.stage_cache import StageCache
 
 import os, sys
-from typing import List
+import copy
+from joblib import Parallel, delayed, parallel_config
+from typing import Dict, List, Tuple
+import numpy as np
 import pandas as pd
 
-class ConcreteStrengthEstimatorModel:
-    def __init__(self, cluster, preprocessing_object, trained_model_object):
-        """
-        Train Model constructor
-        preprocessing_object: preprocessing_object
-        trained_model_object: trained_model_object
-        """
-        self.preprocessing_object = preprocessing_object
-        self.trained_model_object = trained_model_object
-        self.cluster = cluster
+logger = get_logger(__name__)
 
-    def predict(self, X:pd.DataFrame):
-        """
-        function accepts raw inputs and then transformed raw input using preprocessing_object
-        which gurantees that the inputs are in the same format as the training data
-        At last it perform prediction on transformed features
-        """
-        logging.debug(f"Input data sample: {X.iloc[1]}")
-        transformed_feature = self.preprocessing_object.transform(X)
-        logging.debug(f"Data Transformed.")
-        input_columns = list(X.columns)
-        input_columns.append('cluster')
-        logging.debug(f"Transformed Columns {input_columns}")
-        train_df = pd.DataFrame(transformed_feature, columns= input_columns)
-        logging.debug(f"DataFrame Created")
-        cluster_X=train_df[train_df['cluster']==self.cluster] # filter the data for the current cluster
-        logging.debug(f"Get cluster specific data for cluster {self.cluster}")
-        # Prepare the feature columns by removing cluster column
-        cluster_X = cluster_X[cluster_X.columns[:-1]]
-        logging.debug(f"Remove cluster column {cluster_X.columns}")        
-        return self.trained_model_object.predict(cluster_X), cluster_X.index
-
-    def __repr__(self):
-        return f"{type(self.trained_model_object).__name__}()"
-
-    def __str__(self):
-        return f"{type(self.trained_model_object).__name__}()"
+def train_cluster_model(cluster:int, cluster_features:pd.DataFrame, cluster_label:pd.Series,
+                        model_factory:ModelFactory, base_accuracy:float,
+                        previous_model=None, new_rows_share:float=None,
+                        max_n_estimators:int=None)->Tuple[MetricInfoArtifact, List[dict]]:
+    """
+    Searches the best model for one cluster and evaluates the searched models.
+    Defined at module level so that it can be run in a process pool.
+    previous_model: fitted estimator of the previous run, warm started instead of searching
+    when it supports warm_start and still reaches the base accuracy
+    new_rows_share: share of the rows of the cluster that are new, for the warm start
+    max_n_estimators: no. of estimators a warm started ensemble is not grown beyond
+    Returns:
+    metric info of the best model, with its out of fold predictions on the cluster rows
+    (on the held out new rows only for a warm started model), and the profile records of the cluster and of each model search
+    """
+    try:
+        with profile("cluster_search", rows=len(cluster_features), cluster=int(cluster)) as cluster_profile:
+            metric_info = None
+            if previous_model is not None:
+                warm_started_model = model_factory.warm_start_model(previous_model, cluster_features, cluster_label,
+                                                                    new_rows_share=new_rows_share,
+                                                                    max_n_estimators=max_n_estimators)
+                if warm_started_model is not None:
+                    grid_searched_best_model_list = [warm_started_model]
+                    metric_info = evaluate_regression_model(model_list=grid_searched_best_model_list,
+                                                            X_train=cluster_features, y_train=cluster_label,
+                                                            flag=2, base_accuracy=base_accuracy)
+                    if metric_info is None:
+                        logger.info(f"Warm started model of cluster {cluster} below base accuracy, searching again")
+            if metric_info is None:
+                #getting the best model for each of the clusters  
+                logger.info(f"\n\t\t{'#'*20}Training for cluster {cluster}{'#'*20}")  
+                best_model, grid_searched_best_model_list = model_factory.get_best_model(X=cluster_features,y=cluster_label,base_accuracy=base_accuracy)
+                logger.info(f"Best model for cluster {cluster}: {best_model.model} with score {best_model.best_score}")
+
+                logger.info(f"Evaluating all trained model on training dataset with the cv scores of the search")
+                metric_info:MetricInfoArtifact = evaluate_regression_model(model_list=grid_searched_best_model_list,X_train=cluster_features,y_train=cluster_label, flag =2, base_accuracy=base_accuracy)
+
+            logger.info(f"Cluster {cluster} over all best model: {metric_info.model_name}")
+            fold_predictions = grid_searched_best_model_list[metric_info.index_number].fold_predictions
+            if fold_predictions is None:
+                fold_predictions = model_factory.get_fold_predictions(metric_info.model_object, cluster_features,
+                                                                      cluster_label)
+            metric_info = metric_info._replace(fold_predictions=fold_predictions)
+        search_profiles = [{**grid_searched_best_model.search_profile, "cluster": int(cluster)}
+                           for grid_searched_best_model in grid_searched_best_model_list]
+        return metric_info, [cluster_profile] + search_profiles
+    except Exception as e:
+        raise ConcreteException(e,sys) from e
 
 class ModelTrainer:
     #loading transformed training  datset
@@ -61,77 +84,210 @@ class ModelTrainer:
     #return model_trainer_artifact
 
     def __init__(self, model_trainer_config : ModelTrainerConfig,
-     data_transformation_artifact : DataTransformationArtifact):
+     data_transformation_artifact : DataTransformationArtifact,
+     incremental_training_config : IncrementalTrainingConfig = None):
         try:
-            logging.info(f"\n{'*'*20}Model Trainer log started{'*'*20}")
+            logger.info(f"\n{'*'*20}Model Trainer log started{'*'*20}")
             self.model_trainer_config = model_trainer_config
             self.data_transformation_artifact = data_transformation_artifact
+            self.incremental_training_config = incremental_training_config
+            # profile records of the cluster and model searches, filled by train_clusters
+            self.search_profiles = []
+        except Exception as e:
+            raise ConcreteException(e,sys) from e
+
+    def train_clusters(self, cluster_training_data:Dict[int, tuple], model_factory:ModelFactory,
+                       base_accuracy:float, warm_start_models:Dict[int, tuple]=None)->Dict[int, MetricInfoArtifact]:
+        """
+        Trains every cluster, one after another or concurrently in a process pool
+        depending on the configured executor. Clusters are independent of each other.
+        cluster_training_data: (features, label) of each cluster keyed by cluster
+        warm_start_models: (previous estimator, share of new rows, max no. of estimators) of the clusters to warm start
+        Returns:
+        Metric info of the best model of each cluster keyed by cluster
+        """
+        try:
+            executor = self.model_trainer_config.executor
+            max_workers = self.model_trainer_config.max_workers
+            logger.info(f"Training {len(cluster_training_data)} clusters with executor: {executor}")
+            clusters = list(cluster_training_data.keys())
+            warm_start_models = dict() if warm_start_models is None else warm_start_models
+            if executor == "sequential":
+                cluster_results = [train_cluster_model(cluster, cluster_features, cluster_label, model_factory, base_accuracy,
+                                                       *warm_start_models.get(cluster, (None, None, None)))
+                                   for cluster, (cluster_features, cluster_label) in cluster_training_data.items()]
+            elif executor == "process":
+                # loky process pool. Each worker gets its share of the cores: its searches run with
+                # at most that many jobs, and native thread pools (BLAS, OpenMP) of the worker are capped to it
+                cores_per_worker = max(1, (os.cpu_count() or 1) // max_workers)
+                worker_model_factory = copy.copy(model_factory)
+                worker_model_factory.n_cores = cores_per_worker
+                with parallel_config(backend="loky", inner_max_num_threads=cores_per_worker):
+                    cluster_results = Parallel(n_jobs=max_workers)(
+                        delayed(train_cluster_model)(cluster, cluster_features, cluster_label, worker_model_factory,
+                                                     base_accuracy, *warm_start_models.get(cluster, (None, None, None)))
+                        for cluster, (cluster_features, cluster_label) in cluster_training_data.items())
+            else:
+                raise Exception(f"Unknown executor: {executor}. Expected sequential or process")
+            for _, search_profiles in cluster_results:
+                self.search_profiles.extend(search_profiles)
+            return {cluster: metric_info for cluster, (metric_info, _) in zip(clusters, cluster_results)}
+        except Exception as e:
+            raise ConcreteException(e,sys) from e
+
+    def get_model_config_key(self)->str:
+        """
+        Hash of what the trained models depend on besides the data and the preprocessing.
+        """
+        return StageCache.get_key(self.model_trainer_config.base_accuracy,
+                                  get_file_hash(self.model_trainer_config.model_config_file_path))
+
+    def get_previous_cluster_models(self)->Dict[int, tuple]:
+        """
+        Returns the last trained model of each cluster when the data was preprocessed by the same
+        preprocessing object and the model configuration did not change, else an empty dictionary.
+        Returns:
+        (model file path, model, manifest entry with metrics and row statistics) keyed by cluster
+        """
+        try:
+            if self.incremental_training_config is None or not self.incremental_training_config.enabled:
+                return dict()
+            state = IncrementalState(self.incremental_training_config.state_file_path).read()
+            cluster_model_paths = state.get(STATE_CLUSTER_MODEL_PATHS) or dict()
+            if len(cluster_model_paths) == 0 or \
+                    any(not os.path.exists(model_file_path) for model_file_path in cluster_model_paths.values()):
+                logger.info("Incremental training: no previous models found, training every cluster")
+                return dict()
+            if state.get(STATE_PREPROCESSED_OBJECT_HASH) != get_file_hash(self.data_transformation_artifact.preprocessed_object_file_path):
+                logger.info("Incremental training: data preprocessed from scratch, training every cluster")
+                return dict()
+            if state.get(STATE_MODEL_CONFIG_KEY) != self.get_model_config_key():
+                logger.info("Incremental training: model configuration changed, training every cluster")
+                return dict()
+            return {int(cluster): (model_file_path, load_cluster_model(model_file_path, int(cluster)),
+                                   get_model_bundle(model_file_path).manifest[MODEL_BUNDLE_CLUSTERS_KEY][int(cluster)])
+                    for cluster, model_file_path in cluster_model_paths.items()}
         except Exception as e:
             raise ConcreteException(e,sys) from e
 
     def initiate_model_trainer(self)->ModelTrainerArtifact:
         try:
-            logging.debug(f"Loading transformed training dataset")
+            logger.debug("Loading transformed training dataset")
             transformed_train_file_path = self.data_transformation_artifact.transformed_train_file_path
-            train_df = pd.read_csv(transformed_train_file_path)
+            train_df = load_data_frame(transformed_train_file_path)
 
-            logging.debug(f"Extracting model config file path")
+            logger.debug("Extracting model config file path")
             model_config_file_path = self.model_trainer_config.model_config_file_path
 
-            logging.debug(f"Initializing model factory class using above model config file: {model_config_file_path}")
+            logger.debug("Initializing model factory class using above model config file: %s", model_config_file_path)
             model_factory = ModelFactory(model_config_path=model_config_file_path)  
 
-            logging.info("Initializing models from config file")
+            logger.info("Initializing models from config file")
             model_factory.get_supplied_model_details()             
             
             base_accuracy = self.model_trainer_config.base_accuracy
-            logging.info(f"Expected accuracy: {base_accuracy}")
+            logger.info(f"Expected accuracy: {base_accuracy}")
 
             all_clusters = list(train_df['cluster'].unique())
             trained_models_file_path = create_list(len(all_clusters))
             train_rmse_list = create_list(len(all_clusters))
             train_accuracy_list = create_list(len(all_clusters))
             model_accuracy_list = create_list(len(all_clusters))
+            is_models_refit = create_list(len(all_clusters))
+            # label and out of fold prediction of every training row, nan for the clusters carried forward
+            fold_predictions = np.column_stack([train_df[train_df.columns[-1]].to_numpy(dtype=float),
+                                                np.full(len(train_df), np.nan)])
 
+            cluster_training_data = dict()
             for cluster in all_clusters:
                 cluster_data=train_df[train_df['cluster']==cluster] # filter the data for one cluster
                 # Prepare the feature and Label columns
                 cluster_features = cluster_data[train_df.columns[:-2]]
                 cluster_label= cluster_data[train_df.columns[-1]]
-                #getting the best model for each of the clusters  
-                logging.info(f"\n\t\t{'#'*20}Training for cluster {cluster}{'#'*20}")  
-                best_model, grid_searched_best_model_list = model_factory.get_best_model(X=cluster_features,y=cluster_label,base_accuracy=base_accuracy)
-                logging.info(f"Best model for cluster {cluster}: {best_model.model} with score {best_model.best_score}")
-                                      
-                model_list = [grid_searched_model.best_model for grid_searched_model in grid_searched_best_model_list ]
-                logging.info(f"Evaluating all trained model on training dataset by Kfold cv")
-                metric_info:MetricInfoArtifact = evaluate_regression_model(model_list=model_list,X_train=cluster_features,y_train=cluster_label, flag =2, base_accuracy=base_accuracy)
-
-                logging.info(f"Over all best model: {metric_info.model_name}")
-                
-                preprocessing_obj=  load_object(file_path=self.data_transformation_artifact.preprocessed_object_file_path)
-                model_object = metric_info.model_object
-
-
-                trained_models_path=self.model_trainer_config.trained_models_path
-                trained_model_file_name = 'model_cluster'+str(cluster)+'.pkl'
-                trained_model_file_path = os.path.join(trained_models_path, trained_model_file_name)
-                trained_models_file_path[cluster] = trained_model_file_path
-                concrete_strength_estimator_model = ConcreteStrengthEstimatorModel(cluster=cluster, preprocessing_object=preprocessing_obj,trained_model_object=model_object)
-                logging.info(f"Saving model {concrete_strength_estimator_model} at path: {trained_model_file_path}")
-                save_object(file_path=trained_model_file_path,obj=concrete_strength_estimator_model)
+                cluster_training_data[cluster] = (cluster_features, cluster_label)
+
+            # only the clusters whose rows changed enough since their last training are refit,
+            # the models of the other clusters are carried forward
+            previous_cluster_models = self.get_previous_cluster_models()
+            clusters_to_refit = all_clusters
+            if len(previous_cluster_models) > 0:
+                clusters_to_refit = get_clusters_to_refit(
+                    cluster_data={cluster: (cluster_features.to_numpy(dtype=float), cluster_label.to_numpy(dtype=float))
+                                  for cluster, (cluster_features, cluster_label) in cluster_training_data.items()},
+                    previous_statistics={cluster: details for cluster, (_, _, details) in previous_cluster_models.items()},
+                    rows_change_threshold=self.incremental_training_config.rows_change_threshold,
+                    drift_threshold=self.incremental_training_config.drift_threshold)
+            warm_start_models = dict()
+            if len(previous_cluster_models) > 0 and self.incremental_training_config.warm_start:
+                for cluster in clusters_to_refit:
+                    if cluster in previous_cluster_models:
+                        previous_rows = previous_cluster_models[cluster][2].get("rows", 0)
+                        cluster_rows = len(cluster_training_data[cluster][0])
+                        warm_start_models[cluster] = (previous_cluster_models[cluster][1].trained_model_object,
+                                                      max(cluster_rows - previous_rows, 0) / max(cluster_rows, 1),
+                                                      self.incremental_training_config.max_n_estimators)
+            logger.info(f"Clusters refit: {sorted(int(cluster) for cluster in clusters_to_refit)} of {len(all_clusters)}")
+
+            cluster_metric_info = self.train_clusters(cluster_training_data={cluster: cluster_training_data[cluster]
+                                                                             for cluster in clusters_to_refit},
+                                                      model_factory=model_factory, base_accuracy=base_accuracy,
+                                                      warm_start_models=warm_start_models)
+
+            # models are saved by this process whichever executor trained them, in a single bundle
+            # that stores the preprocessing object once for all the refit clusters
+            model_bundle_file_path = os.path.join(self.model_trainer_config.trained_models_path, MODEL_BUNDLE_FILE_NAME)
+            cluster_models = dict()
+            cluster_details = dict()
+            for cluster in all_clusters:
+                if cluster not in cluster_metric_info:
+                    model_file_path, _, details = previous_cluster_models[cluster]
+                    trained_models_file_path[cluster] = model_file_path
+                    train_rmse_list[cluster] = details["train_rmse"]
+                    train_accuracy_list[cluster] = details["train_accuracy"]
+                    model_accuracy_list[cluster] = details["model_accuracy"]
+                    is_models_refit[cluster] = False
+                    continue
+                metric_info = cluster_metric_info[cluster]
+                cluster_models[cluster] = metric_info.model_object
+                cluster_features, cluster_label = cluster_training_data[cluster]
+                cluster_details[cluster] = {"train_rmse": float(metric_info.train_rmse),
+                                            "train_accuracy": float(metric_info.train_accuracy),
+                                            "model_accuracy": float(metric_info.model_accuracy),
+                                            "model_rmse": float(metric_info.model_rmse),
+                                            # compared with the rows of the next run to decide a refit
+                                            **get_cluster_statistics(cluster_features.to_numpy(dtype=float),
+                                                                     cluster_label.to_numpy(dtype=float))}
+                trained_models_file_path[cluster] = model_bundle_file_path
                 train_rmse_list[cluster] = metric_info.train_rmse
                 train_accuracy_list[cluster] = metric_info.train_accuracy
                 model_accuracy_list[cluster] = metric_info.model_accuracy
+                is_models_refit[cluster] = True
+                fold_predictions[np.flatnonzero(train_df['cluster'].to_numpy() == cluster), 1] = metric_info.fold_predictions
+            fold_predictions_file_path = os.path.join(self.model_trainer_config.trained_models_path,
+                                                      FOLD_PREDICTIONS_FILE_NAME)
+            save_numpy_array_data(file_path=fold_predictions_file_path, array=fold_predictions)
+            if len(cluster_models) > 0:
+                preprocessing_obj = load_cached_object(file_path=self.data_transformation_artifact.preprocessed_object_file_path)
+                logger.info(f"Saving models {cluster_models} at path: {model_bundle_file_path}")
+                ModelBundle.save(bundle_file_path=model_bundle_file_path, preprocessing_object=preprocessing_obj,
+                                 cluster_models=cluster_models, cluster_details=cluster_details)
+
+            if self.incremental_training_config is not None and self.incremental_training_config.enabled:
+                IncrementalState(self.incremental_training_config.state_file_path).update(**{
+                    STATE_PREPROCESSED_OBJECT_HASH: get_file_hash(self.data_transformation_artifact.preprocessed_object_file_path),
+                    STATE_MODEL_CONFIG_KEY: self.get_model_config_key(),
+                    STATE_CLUSTER_MODEL_PATHS: {int(cluster): trained_models_file_path[cluster] for cluster in all_clusters}})
 
             model_trainer_artifact=  ModelTrainerArtifact(is_trained=True,message="Model Trained successfully",
                 clusters = all_clusters,
                 trained_models_file_path=trained_models_file_path,
                 train_rmse=train_rmse_list,
                 train_accuracy=train_accuracy_list,
-                model_accuracy=model_accuracy_list          
+                model_accuracy=model_accuracy_list,
+                is_models_refit=is_models_refit,
+                fold_predictions_file_path=fold_predictions_file_path
             )
-            logging.info(f"Model Trainer Artifact: {model_trainer_artifact}")
+            logger.info(f"Model Trainer Artifact: {model_trainer_artifact}")
             return model_trainer_artifact                
         except Exception as e:
             raise ConcreteException(e,sys) from e
@@ -140,4 +296,4 @@ class ModelTrainer:
         """
         Acts as destructor. Called before all references to the class object are deleted.
         """
-        logging.info(f"\t{'*' *25} Model Trainer log completed {'*' *25}\n")
\ No newline at end of file
+        logger.info(f"\t{'*' *25} Model Trainer log completed {'*' *25}\n")
\ No newline at end of file
@@ -3,9 +3,11 @@ import sys
 from concrete_src.constant import *
 from concrete_src.util.util import read_yaml_file
 from concrete_src.exception import ConcreteException
-from concrete_src.logger import logging
+from concrete_src.logger import get_logger
 from concrete_src.entity.config_entity import *
 
+logger = get_logger(__name__)
+
 class Configuration:
 
     def __init__(self, 
@@ -17,8 +19,9 @@ class Configuration:
         Get training pipeline configurations.
         """
         try:
+            self.config_file_path = config_file_path
             self.config_info = read_yaml_file(file_path = config_file_path)
-            logging.info(f"Read configuration file: {config_file_path}")
+            logger.info(f"Read configuration file: {config_file_path}")
             self.training_pipeline_config = self.get_training_pipeline_config()
             self.time_stamp = current_time_stamp
         except Exception as e:
@@ -36,8 +39,11 @@ class Configuration:
             training_pipeline_config[TRAINING_PIPELINE_NAME_KEY], 
             training_pipeline_config[TRAINING_PIPELINE_ARTIFACT_DIR_KEY]
             )            
-            training_pipeline_config = TrainingPipeLineConfig(artifact_dir = artifact_dir) 
-            logging.info(f"TrainingPipelineConfig: {training_pipeline_config}")
+            artifact_format = training_pipeline_config[TRAINING_PIPELINE_ARTIFACT_FORMAT_KEY]
+            if artifact_format not in ARTIFACT_FORMAT_EXTENSIONS:
+                raise Exception(f"Unknown artifact format: {artifact_format}. Expected one of {list(ARTIFACT_FORMAT_EXTENSIONS.keys())}")
+            training_pipeline_config = TrainingPipeLineConfig(artifact_dir = artifact_dir, artifact_format = artifact_format) 
+            logger.info(f"TrainingPipelineConfig: {training_pipeline_config}")
             return training_pipeline_config
         except Exception as e:
             raise ConcreteException(e, sys) from e
@@ -56,15 +62,23 @@ class Configuration:
             raw_data = os.path.join(data_ingestion_artifact_dir,data_ingestion_config_info[DATA_INGESTION_RAW_DATA_DIR])
             injested_data_dir = os.path.join(data_ingestion_artifact_dir, data_ingestion_config_info[DATA_INGESTION_DIR_NAME_KEY])
             train_dir = os.path.join(injested_data_dir, data_ingestion_config_info[DATA_INGESTION_TRAIN_DIR])
+            # downloads are reused across runs, hence not timestamped
+            download_cache_dir = os.path.join(self.training_pipeline_config.artifact_dir, DATA_INGESTION_ARTIFACT_DIR,
+                                              data_ingestion_config_info[DATA_INGESTION_DOWNLOAD_CACHE_DIR])
 
             data_ingestion_config_info = DataIngestionConfig(
                 dataset_name = dataset_name, 
                 dataset_filename = dataset_filename,
                 raw_data_dir=raw_data,
-                ingested_train_dir=train_dir
+                ingested_train_dir=train_dir,
+                source_type=data_ingestion_config_info[DATA_INGESTION_SOURCE_TYPE],
+                source_path=data_ingestion_config_info[DATA_INGESTION_SOURCE_PATH],
+                download_cache_dir=download_cache_dir,
+                artifact_format=self.training_pipeline_config.artifact_format,
+                download_timeout_seconds=data_ingestion_config_info.get(DATA_INGESTION_DOWNLOAD_TIMEOUT_SECONDS, 60)
                 )
                 
-            logging.info(f"DataIngestionConfig: {data_ingestion_config_info}")
+            logger.info(f"DataIngestionConfig: {data_ingestion_config_info}")
             return data_ingestion_config_info
         except Exception as e:
             raise ConcreteException(e, sys) from e
@@ -79,9 +93,13 @@ class Configuration:
             data_validation_config_info = self.config_info[DATA_VALIDATION_CONFIG_KEY]
             data_validation_schema_file_name = data_validation_config_info[DATA_VALIDATION_SCHEMA_FILE_NAME]
             file_path = os.path.join(ROOT_DIR, data_validation_config_info[DATA_VALIDATION_SCHEMA_DIR], data_validation_schema_file_name)
+            report_file_path = os.path.join(self.training_pipeline_config.artifact_dir, DATA_VALIDATION_ARTIFACT_DIR,
+                                            self.time_stamp, data_validation_config_info[DATA_VALIDATION_REPORT_FILE_NAME])
             data_validation_config_info = DataValidationConfig(
-                schema_file_path = file_path) 
-            logging.info(f"DataValidationConfig: {data_validation_config_info}")
+                schema_file_path = file_path,
+                chunk_size = data_validation_config_info[DATA_VALIDATION_CHUNK_SIZE],
+                report_file_path = report_file_path) 
+            logger.info(f"DataValidationConfig: {data_validation_config_info}")
             return data_validation_config_info
         except Exception as e:
             raise ConcreteException(e, sys)  from e
@@ -99,12 +117,21 @@ class Configuration:
             transformed_train_dir = os.path.join(transformed_dir, data_transformation_config_info[TRANSFORMED_TRAIN_DIR])
             preprocessing_dir = os.path.join(data_transformation_artifact_dir, PREPROCESSING_DIR)
             preprocessed_file_name = os.path.join(preprocessing_dir, data_transformation_config_info[PREPROCESSED_OBJECT_FILE_NAME] )
+            # elbow search results are reused across runs, hence not timestamped
+            cluster_cache_dir = os.path.join(self.training_pipeline_config.artifact_dir, DATA_TRANSFORMATION_ARTIFACT_DIR,
+                                             data_transformation_config_info[CLUSTER_CACHE_DIR])
 
             data_transformation_config_info = DataTransformationConfig(
                 transformed_train_dir = transformed_train_dir, 
-                preprocessed_object_file_path = preprocessed_file_name
+                preprocessed_object_file_path = preprocessed_file_name,
+                min_clusters = data_transformation_config_info[MIN_CLUSTERS],
+                max_clusters = data_transformation_config_info[MAX_CLUSTERS],
+                cluster_algorithm = data_transformation_config_info[CLUSTER_ALGORITHM],
+                cluster_n_jobs = data_transformation_config_info[CLUSTER_N_JOBS],
+                cluster_cache_dir = cluster_cache_dir,
+                artifact_format = self.training_pipeline_config.artifact_format
                 )
-            logging.info(f"DataTransformationConfig: {data_transformation_config_info}")
+            logger.info(f"DataTransformationConfig: {data_transformation_config_info}")
             return data_transformation_config_info
         except Exception as e:
             raise ConcreteException(e, sys) from e
@@ -115,12 +142,18 @@ class Configuration:
         artifact_dir = os.path.join(self.training_pipeline_config.artifact_dir,
                                         MODEL_EVALUATION_DIR)
         try:
+            # current models are accepted on the settings they were trained with
+            model_train_config = self.get_model_train_config()
+            model_config = read_yaml_file(file_path = model_train_config.model_config_file_path)
+            cv_folds = model_config[MODEL_CONFIG_GRID_SEARCH_KEY][MODEL_CONFIG_PARAM_KEY].get("cv", 5)
             model_evaluation_config_info = ModelEvaluationConfig(
                 model_evaluation_files_folder = artifact_dir, 
                 model_evaluation_file_prefix = model_evaluation_file_prefix,
-                time_stamp = self.time_stamp
+                time_stamp = self.time_stamp,
+                base_accuracy = model_train_config.base_accuracy,
+                cv_folds = cv_folds
             )
-            logging.info(f"ModelEvaluationConfig: {model_evaluation_config_info}")
+            logger.info(f"ModelEvaluationConfig: {model_evaluation_config_info}")
             return model_evaluation_config_info
         except Exception as e:
             raise ConcreteException(e, sys) from e
@@ -132,7 +165,7 @@ class Configuration:
             export_dir_path = os.path.join(ROOT_DIR, model_pusher_config_info[MODEL_EXPORT_DIR],
                                            time_stamp)
             model_pusher_config = ModelPusherConfig(export_dir_path=export_dir_path)
-            logging.info(f"Model pusher config {model_pusher_config}")
+            logger.info(f"Model pusher config {model_pusher_config}")
             return model_pusher_config            
         except Exception as e:
             raise ConcreteException(e, sys) from e
@@ -162,9 +195,59 @@ class Configuration:
             model_train_config_info = ModelTrainerConfig(
                 trained_models_path = trained_models_path, 
                 base_accuracy = base_accuracy,
-                model_config_file_path = model_config_file_path
+                model_config_file_path = model_config_file_path,
+                executor = model_train_config_info[MODEL_TRAINER_EXECUTOR],
+                max_workers = model_train_config_info[MODEL_TRAINER_MAX_WORKERS]
                 )
-            logging.info(f"ModelTrainingConfig: {model_train_config_info}")
+            logger.info(f"ModelTrainingConfig: {model_train_config_info}")
             return model_train_config_info
         except Exception as e:
             raise ConcreteException(e, sys) from e
+
+    def get_training_job_config(self)->TrainingJobConfig:
+        """
+        Reads background training job configuration details
+        Returns:
+            TrainingJobConfig
+        """
+        try:
+            training_job_config_info = self.config_info[TRAINING_JOB_CONFIG_KEY]
+            # not timestamped, jobs of every run share the queue
+            job_dir = os.path.join(self.training_pipeline_config.artifact_dir,
+                                   training_job_config_info[TRAINING_JOB_DIR])
+            training_job_config = TrainingJobConfig(
+                job_dir = job_dir,
+                max_concurrent_jobs = training_job_config_info[TRAINING_JOB_MAX_CONCURRENT_JOBS],
+                config_file_path = os.path.abspath(self.config_file_path)
+                )
+            logger.info(f"TrainingJobConfig: {training_job_config}")
+            return training_job_config
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def get_incremental_training_config(self)->IncrementalTrainingConfig:
+        """
+        Reads incremental training configuration details, disabled when the section is missing
+        Returns:
+            IncrementalTrainingConfig
+        """
+        try:
+            incremental_training_config_info = self.config_info.get(INCREMENTAL_TRAINING_CONFIG_KEY) or dict()
+            # not timestamped, each run starts from the state left by the previous one
+            state_file_path = os.path.join(self.training_pipeline_config.artifact_dir,
+                                           incremental_training_config_info.get(INCREMENTAL_TRAINING_STATE_DIR,
+                                                                                "incremental_training"),
+                                           INCREMENTAL_STATE_FILE_NAME)
+            incremental_training_config = IncrementalTrainingConfig(
+                enabled = incremental_training_config_info.get(INCREMENTAL_TRAINING_ENABLED, False),
+                state_file_path = state_file_path,
+                max_new_rows_fraction = incremental_training_config_info.get(INCREMENTAL_TRAINING_MAX_NEW_ROWS_FRACTION, 0.2),
+                rows_change_threshold = incremental_training_config_info.get(INCREMENTAL_TRAINING_ROWS_CHANGE_THRESHOLD, 0.05),
+                drift_threshold = incremental_training_config_info.get(INCREMENTAL_TRAINING_DRIFT_THRESHOLD, 0.25),
+                warm_start = incremental_training_config_info.get(INCREMENTAL_TRAINING_WARM_START, True),
+                max_n_estimators = incremental_training_config_info.get(INCREMENTAL_TRAINING_MAX_N_ESTIMATORS)
+                )
+            logger.info(f"IncrementalTrainingConfig: {incremental_training_config}")
+            return incremental_training_config
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
@@ -20,11 +20,22 @@ MODEL_CONFIG_CLASS_KEY = 'class'
 MODEL_CONFIG_PARAM_KEY = 'params'
 MODEL_CONFIG_SUPPLIED_MODELS = 'models'
 MODEL_CONFIG_PARAM_GRID_KEY = "search_param_grid"
+MODEL_CONFIG_MODEL_N_JOBS_KEY = "model_n_jobs"
+MODEL_CONFIG_SEARCH_N_JOBS_KEY = "search_n_jobs"
+MODEL_CONFIG_SEARCH_COST_KEY = "search_cost"
+MODEL_CONFIG_SEARCH_STRATEGY_KEY = "strategy"
+MODEL_CONFIG_SEARCH_BUDGET_KEY = "budget"
+MODEL_CONFIG_BUDGET_N_TRIALS_KEY = "n_trials"
+MODEL_CONFIG_BUDGET_MIN_RESOURCES_KEY = "min_resources"
+MODEL_CONFIG_BUDGET_MAX_TIME_KEY = "max_time"
 
 # training pipeline config
 TRAINING_PIPELINE_CONFIG_KEY = "training_pipeline_config"
 TRAINING_PIPELINE_ARTIFACT_DIR_KEY = "artifact_dir"
 TRAINING_PIPELINE_NAME_KEY = "pipeline_name"
+TRAINING_PIPELINE_ARTIFACT_FORMAT_KEY = "artifact_format"
+# file extension of each data artifact format handed between stages
+ARTIFACT_FORMAT_EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather", "npy": ".npy"}
 
 # data ingestion config
 DATA_INGESTION_CONFIG_KEY = "data_ingestion_config"
@@ -34,11 +45,19 @@ DATA_INGESTION_ARTIFACT_DIR = "data_ingestion"
 DATA_INGESTION_RAW_DATA_DIR = "raw_data_dir"
 DATA_INGESTION_DIR_NAME_KEY = "ingested_dir"
 DATA_INGESTION_TRAIN_DIR = "ingested_train_dir"
+DATA_INGESTION_SOURCE_TYPE = "source_type"
+DATA_INGESTION_SOURCE_PATH = "source_path"
+DATA_INGESTION_DOWNLOAD_CACHE_DIR = "download_cache_dir"
+DATA_INGESTION_DOWNLOAD_TIMEOUT_SECONDS = "download_timeout_seconds"
+DOWNLOAD_CACHE_MANIFEST_FILE_NAME = "manifest.yaml"
 
 # data validation config
 DATA_VALIDATION_CONFIG_KEY = "data_validation_config"
 DATA_VALIDATION_SCHEMA_DIR = "schema_dir"
 DATA_VALIDATION_SCHEMA_FILE_NAME = "schema_file_name"
+DATA_VALIDATION_ARTIFACT_DIR = "data_validation"
+DATA_VALIDATION_CHUNK_SIZE = "chunk_size"
+DATA_VALIDATION_REPORT_FILE_NAME = "report_file_name"
 
 # data transformation config
 DATA_TRANSFORMATION_CONFIG_KEY = "data_transformation_config"
@@ -47,6 +66,11 @@ TRANFORMED_DIR = "transformed_dir"
 TRANSFORMED_TRAIN_DIR = "transformed_train_dir"
 PREPROCESSING_DIR = "preprocessing_dir"
 PREPROCESSED_OBJECT_FILE_NAME = "preprocessed_object_file_name"
+MIN_CLUSTERS = "min_clusters"
+MAX_CLUSTERS = "max_clusters"
+CLUSTER_ALGORITHM = "cluster_algorithm"
+CLUSTER_N_JOBS = "cluster_n_jobs"
+CLUSTER_CACHE_DIR = "cluster_cache_dir"
 
 # model trainer config
 MODEL_TRAINER_ARTIFACT_DIR = "model_trainer"
@@ -56,6 +80,25 @@ TRIANED_MODEL_FILENAME = "model_file_name"
 BASE_ACCURACY = "base_accuracy"
 MODEL_CONFIG_DIR = "model_config_dir"
 MODEL_CONFIG_FILE_NAME = "model_config_file_name"
+MODEL_TRAINER_EXECUTOR = "executor"
+MODEL_TRAINER_MAX_WORKERS = "max_workers"
+
+# model cache, size of the cached model files kept in memory per process
+MODEL_CACHE_MAX_SIZE_MB = 512
+
+# model bundle
+MODEL_BUNDLE_FILE_NAME = "model_bundle.zip"
+# label and out of fold prediction of every training row, saved next to the trained models
+FOLD_PREDICTIONS_FILE_NAME = "fold_predictions.npy"
+MODEL_BUNDLE_MANIFEST_NAME = "manifest.json"
+MODEL_BUNDLE_PREPROCESSING_MEMBER_NAME = "preprocessing.pkl"
+MODEL_BUNDLE_FORMAT_VERSION = 1
+MODEL_BUNDLE_FORMAT_VERSION_KEY = "format_version"
+MODEL_BUNDLE_VERSION_KEY = "version"
+MODEL_BUNDLE_PREPROCESSING_KEY = "preprocessing"
+MODEL_BUNDLE_CLUSTERS_KEY = "clusters"
+MODEL_BUNDLE_MEMBER_KEY = "member"
+MODEL_BUNDLE_SHA256_KEY = "sha256"
 
 # model evaluation config
 MODEL_EVALUATION_CONFIG_KEY = "model_evaluation_config"
@@ -70,11 +113,67 @@ MODEL_PATH_KEY = "model_path"
 # model pusher config
 MODEL_PUSH_CONFIG_INFO_KEY = "model_pusher_config"
 MODEL_EXPORT_DIR = "model_export_dir"
+# cluster -> bundle file of every cluster served by a release folder
+EXPORTED_CLUSTERS_FILE_NAME = "exported_clusters.yaml"
+# pointer to the release folder being served, swapped atomically by the model pusher
+CURRENT_RELEASE_FILE_NAME = "current_release.yaml"
+CURRENT_RELEASE_KEY = "release"
+# seconds between two checks of the serving workers for a new release, none disables the reload
+MODEL_RELOAD_INTERVAL_SECONDS_KEY = "reload_interval_seconds"
 
 # schema.yaml
 SCHEMA_FILE_COLUMNS_KEY = "columns"
 SCHEMA_FILE_TARGET_COLUMNS = "target_column"
 
+# stage cache
+STAGE_CACHE_DIR_NAME = "stage_cache"
+
+# logging config
+LOGGING_CONFIG_KEY = "logging_config"
+LOGGING_DIR_KEY = "log_dir"
+LOGGING_LEVEL_KEY = "level"
+LOGGING_CONSOLE_KEY = "console"
+LOGGING_MODULES_KEY = "modules"
+LOGGING_SAMPLE_RATE_KEY = "sample_rate"
+LOGGING_FILE_NAME_KEY = "file_name"
+# environment variable overriding the log folder of the configuration file, set by the tests
+LOG_DIR_ENV_KEY = "CONCRETE_LOG_DIR"
+
+# training job config
+TRAINING_JOB_CONFIG_KEY = "training_job_config"
+TRAINING_JOB_DIR = "job_dir"
+TRAINING_JOB_MAX_CONCURRENT_JOBS = "max_concurrent_jobs"
+TRAINING_JOB_STATUS_QUEUED = "queued"
+TRAINING_JOB_STATUS_RUNNING = "running"
+TRAINING_JOB_STATUS_SUCCEEDED = "succeeded"
+TRAINING_JOB_STATUS_FAILED = "failed"
+TRAINING_JOB_STATUS_CANCELLED = "cancelled"
+TRAINING_JOB_LOCK_FILE_NAME = ".lock"
+
+# incremental training config
+INCREMENTAL_TRAINING_CONFIG_KEY = "incremental_training_config"
+INCREMENTAL_TRAINING_ENABLED = "enabled"
+INCREMENTAL_TRAINING_STATE_DIR = "state_dir"
+INCREMENTAL_TRAINING_MAX_NEW_ROWS_FRACTION = "max_new_rows_fraction"
+INCREMENTAL_TRAINING_ROWS_CHANGE_THRESHOLD = "rows_change_threshold"
+INCREMENTAL_TRAINING_DRIFT_THRESHOLD = "drift_threshold"
+INCREMENTAL_TRAINING_WARM_START = "warm_start"
+INCREMENTAL_TRAINING_MAX_N_ESTIMATORS = "max_n_estimators"
+INCREMENTAL_STATE_FILE_NAME = "incremental_state.yaml"
+# hash of every training row, in row order, next to the transformed training file
+ROW_HASHES_FILE_NAME = "row_hashes.npy"
+
 # experiment.yaml
 EXPERIMENT_DIR_NAME="experiment"
-EXPERIMENT_FILE_NAME="experiment.csv"
+EXPERIMENT_FILE_NAME="experiment.db"
+# csv history written before the sqlite store, imported once when the store is created
+EXPERIMENT_CSV_FILE_NAME="experiment.csv"
+EXPERIMENT_STORE_TIMEOUT_SECONDS=30
+# per run json with the wall time, cpu time, peak memory and rows of every stage and model search
+EXPERIMENT_PROFILE_DIR_NAME="profile"
+
+# serving import budget, checked by the benchmark suite on a fresh interpreter
+SERVING_IMPORT_MODULE = "concrete_src.entity.concrete_predictor"
+SERVING_IMPORT_TIME_BUDGET_SECONDS = 1.0
+# loaded by training only, never by importing the serving path
+TRAINING_ONLY_MODULES = ["sklearn", "scipy", "kneed", "kaggle"]
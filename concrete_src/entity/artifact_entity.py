@@ -2,13 +2,22 @@ from collections import namedtuple
 
 DataIngestionArtifact = namedtuple("DataIngestionArtifact", [ "train_file_path", "is_ingested", "message" ])
 
-DataValidationArtifact = namedtuple("DataValidationArtifact", ["schema_file_path", "is_validated", "message" ])
+DataValidationArtifact = namedtuple("DataValidationArtifact", ["schema_file_path", "report_file_path", "is_validated", "message" ])
 
-DataTransformationArtifact = namedtuple("DataTransformationArtifact", ["transformed_train_file_path", "preprocessed_object_file_path", "is_transformed", "message" ])
+# fields added later default to None, so that artifacts stored by earlier runs in the stage cache still load
+DataTransformationArtifact = namedtuple("DataTransformationArtifact", ["transformed_train_file_path", "preprocessed_object_file_path", "is_transformed", "message",
+                                                                       "row_hashes_file_path", "is_incremental", "new_rows"],
+                                        defaults=[None, None, None])
 
 ModelTrainerArtifact = namedtuple("ModelTrainerArtifact", ["is_trained", "message", "clusters" ,"trained_models_file_path",
-                                                           "train_rmse", "train_accuracy", "model_accuracy"])
+                                                           "train_rmse", "train_accuracy", "model_accuracy",
+                                                           "is_models_refit", "fold_predictions_file_path"],
+                                  defaults=[None, None])
 
-ModelEvaluationArtifact = namedtuple("ModelEvaluationArtifact", ["clusters", "is_models_accepted", "evaluated_model_paths"])
+ModelEvaluationArtifact = namedtuple("ModelEvaluationArtifact", ["clusters", "is_models_accepted", "evaluated_model_paths",
+                                                                 "is_models_refit"],
+                                     defaults=[None])
 
-ModelPusherArtifact = namedtuple("ModelPusherArtifact", ["is_models_pushed", "export_model_file_paths"])
\ No newline at end of file
+ModelPusherArtifact = namedtuple("ModelPusherArtifact", ["is_models_pushed", "export_model_file_paths"])
+
+BatchScoringArtifact = namedtuple("BatchScoringArtifact", ["output_file_path", "rows", "elapsed_seconds", "rows_per_second", "peak_memory_mb"])
@@ -0,0 +1,131 @@
+import os, sys
+import threading
+from typing import Dict
+import numpy as np
+import pandas as pd
+
+from concrete_src.exception import ConcreteException
+from concrete_src.logger import get_logger
+from concrete_src.constant import *
+from concrete_src.util.util import read_yaml_file
+from concrete_src.entity.estimator import ClusterRoutedEstimatorModel
+from concrete_src.entity.model_bundle import load_cluster_model, get_preprocessing_hash
+from concrete_src.entity.model_release import get_served_model_paths, get_release_key
+
+logger = get_logger(__name__)
+
+class ConcretePredictor:
+
+    def __init__(self, model_dir: str, schema_file_path: str, reload_interval_seconds: float = None) -> None:
+        """
+        Loads every cluster model of the release being served once.
+        model_dir: Directory holding the timestamped model export folders
+        schema_file_path: Path of schema file
+        reload_interval_seconds: when set, a background thread checks for a new release this often
+        and swaps in its models once loaded, requests keep being served by the previous models meanwhile
+        """
+        try:
+            self.model_dir = model_dir
+            dataset_schema = read_yaml_file(schema_file_path)
+            self.target_column = dataset_schema[SCHEMA_FILE_TARGET_COLUMNS]
+            self.input_columns = [column.strip() for column in dataset_schema[SCHEMA_FILE_COLUMNS_KEY].keys()
+                                  if column != self.target_column]
+            self.release_key = get_release_key(model_dir)
+            self.model = self.load_model()
+            self.reload_interval_seconds = reload_interval_seconds
+            self.reload_stop_event = threading.Event()
+            if reload_interval_seconds:
+                threading.Thread(target=self.watch_releases, name="model-reload", daemon=True).start()
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def get_latest_model_paths(self) -> Dict[int, str]:
+        """
+        Returns the model file of each cluster in the release being served.
+        """
+        try:
+            if not os.path.isdir(self.model_dir):
+                raise Exception(f"Model directory [{self.model_dir}] not found")
+            model_paths = get_served_model_paths(self.model_dir)
+            if len(model_paths) == 0:
+                raise Exception(f"No model found in [{self.model_dir}]")
+            return model_paths
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def load_model(self) -> ClusterRoutedEstimatorModel:
+        """
+        Loads the latest model of every cluster and combines them into one routed model.
+        The clusters of a release share one preprocessing object, which routes the rows.
+        A release mixing clusters whose preprocessing differs is refused: the cluster ids
+        of separately fitted preprocessing objects do not name the same clusters.
+        Clusters served by the same bundle share its preprocessing object.
+        """
+        try:
+            models = []
+            preprocessing_hashes = dict()
+            for cluster, model_file_path in sorted(self.get_latest_model_paths().items()):
+                logger.info("Loading cluster %s model from [%s]", cluster, model_file_path)
+                models.append(load_cluster_model(model_file_path, cluster))
+                preprocessing_hashes.setdefault(get_preprocessing_hash(model_file_path, cluster), []).append(cluster)
+            if len(preprocessing_hashes) > 1:
+                raise Exception(f"Release in [{self.model_dir}] mixes models of different preprocessing, clusters by "
+                                f"preprocessing: {list(preprocessing_hashes.values())}. "
+                                f"Push the models of every cluster of one training run together")
+            return ClusterRoutedEstimatorModel.from_cluster_models(models=models)
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def reload_model(self) -> bool:
+        """
+        Loads the models of a newly promoted release and swaps them in with one assignment,
+        so a request is scored by either the previous or the new models, never a mix.
+        Models of clusters unchanged by the release are hard links of files already loaded,
+        and come from the model cache. On failure the previous models keep serving.
+        Returns:
+        True when a new release was loaded
+        """
+        try:
+            release_key = get_release_key(self.model_dir)
+            if release_key == self.release_key:
+                return False
+            logger.info(f"New model release [{release_key}] found in [{self.model_dir}], reloading")
+            model = self.load_model()
+            self.model, self.release_key = model, release_key
+            logger.info(f"Serving model release [{release_key}]")
+            return True
+        except Exception as e:
+            logger.error(f"Model release could not be loaded, previous models kept: {e}")
+            return False
+
+    def watch_releases(self):
+        while not self.reload_stop_event.wait(self.reload_interval_seconds):
+            self.reload_model()
+
+    def stop_reload(self):
+        self.reload_stop_event.set()
+
+    def get_input_data_frame(self, records) -> pd.DataFrame:
+        """
+        Builds the model input dataframe from raw records.
+        records: list of dicts or dataframe with the schema input columns
+        """
+        try:
+            input_df = pd.DataFrame(records)
+            input_df.columns = [str(column).strip() for column in input_df.columns]
+            missing_columns = [column for column in self.input_columns if column not in input_df.columns]
+            if len(missing_columns) > 0:
+                raise Exception(f"Missing input columns: {missing_columns}")
+            return input_df[self.input_columns].astype(float).reset_index(drop=True)
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def predict(self, records) -> np.ndarray:
+        """
+        Scores a whole batch in one routed call. Predictions are returned in input order.
+        """
+        try:
+            input_df = self.get_input_data_frame(records)
+            return self.model.predict(input_df)
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
@@ -1,15 +1,27 @@
 from collections import namedtuple 
 
-TrainingPipeLineConfig = namedtuple("TrainingPipeLineConfig", ["artifact_dir"])
+TrainingPipeLineConfig = namedtuple("TrainingPipeLineConfig", ["artifact_dir", "artifact_format"])
 
-DataIngestionConfig = namedtuple("DataIngestionConfig", ["dataset_name", "dataset_filename","raw_data_dir", "ingested_train_dir"])
+DataIngestionConfig = namedtuple("DataIngestionConfig", ["dataset_name", "dataset_filename","raw_data_dir", "ingested_train_dir",
+                                                         "source_type", "source_path", "download_cache_dir", "artifact_format",
+                                                         "download_timeout_seconds"])
 
-DataValidationConfig = namedtuple("DataValidationConfig", ["schema_file_path"])
+DataValidationConfig = namedtuple("DataValidationConfig", ["schema_file_path", "chunk_size", "report_file_path"])
 
-DataTransformationConfig = namedtuple("DataTransformationConfig", ["transformed_train_dir", "preprocessed_object_file_path"])
+DataTransformationConfig = namedtuple("DataTransformationConfig", ["transformed_train_dir", "preprocessed_object_file_path",
+                                                                   "min_clusters", "max_clusters", "cluster_algorithm",
+                                                                   "cluster_n_jobs", "cluster_cache_dir", "artifact_format"])
 
-ModelTrainerConfig = namedtuple("ModelTrainerConfig", ["trained_models_path", "base_accuracy", "model_config_file_path"])
+ModelTrainerConfig = namedtuple("ModelTrainerConfig", ["trained_models_path", "base_accuracy", "model_config_file_path",
+                                                       "executor", "max_workers"])
 
-ModelEvaluationConfig = namedtuple("ModelEvaluationConfig", ["model_evaluation_files_folder", "model_evaluation_file_prefix", "time_stamp"])
+ModelEvaluationConfig = namedtuple("ModelEvaluationConfig", ["model_evaluation_files_folder", "model_evaluation_file_prefix", "time_stamp",
+                                                             "base_accuracy", "cv_folds"])
 
-ModelPusherConfig = namedtuple("ModelPushConfig", ["export_dir_path"])
\ No newline at end of file
+ModelPusherConfig = namedtuple("ModelPushConfig", ["export_dir_path"])
+
+TrainingJobConfig = namedtuple("TrainingJobConfig", ["job_dir", "max_concurrent_jobs", "config_file_path"])
+IncrementalTrainingConfig = namedtuple("IncrementalTrainingConfig", ["enabled", "state_file_path", "max_new_rows_fraction",
+                                                                     "rows_change_threshold", "drift_threshold",
+                                                                     "warm_start", "max_n_estimators"],
+                                       defaults=[None])
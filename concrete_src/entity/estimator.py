@@ -0,0 +1,95 @@
+from concrete_src.logger import get_logger
+
+import logging
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+
+logger = get_logger(__name__)
+
+class ConcreteStrengthEstimatorModel:
+    def __init__(self, cluster, preprocessing_object, trained_model_object):
+        """
+        Train Model constructor
+        preprocessing_object: preprocessing_object
+        trained_model_object: trained_model_object
+        """
+        self.preprocessing_object = preprocessing_object
+        self.trained_model_object = trained_model_object
+        self.cluster = cluster
+
+    def predict(self, X:pd.DataFrame):
+        """
+        function accepts raw inputs and then transformed raw input using preprocessing_object
+        which gurantees that the inputs are in the same format as the training data
+        At last it perform prediction on transformed features
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            # the sample row is only built when debug logging is on, predict is on the serving path
+            logger.debug("Input data sample: %s", X.iloc[0])
+        transformed_feature = self.preprocessing_object.transform(X)
+        logger.debug("Data Transformed.")
+        input_columns = list(X.columns)
+        input_columns.append('cluster')
+        logger.debug("Transformed Columns %s", input_columns)
+        train_df = pd.DataFrame(transformed_feature, columns= input_columns)
+        logger.debug("DataFrame Created")
+        cluster_X=train_df[train_df['cluster']==self.cluster] # filter the data for the current cluster
+        logger.debug("Get cluster specific data for cluster %s", self.cluster)
+        # Prepare the feature columns by removing cluster column
+        cluster_X = cluster_X[cluster_X.columns[:-1]]
+        logger.debug("Remove cluster column %s", cluster_X.columns)
+        return self.trained_model_object.predict(cluster_X), cluster_X.index
+
+    def __repr__(self):
+        return f"{type(self.trained_model_object).__name__}()"
+
+    def __str__(self):
+        return f"{type(self.trained_model_object).__name__}()"
+
+class ClusterRoutedEstimatorModel:
+    def __init__(self, preprocessing_object, cluster_models: Dict[int, object]):
+        """
+        Routed model constructor
+        preprocessing_object: preprocessing_object routing the rows, shared by the clusters.
+        Cluster ids of separately fitted preprocessing objects do not name the same clusters,
+        so every cluster model was trained on rows of this preprocessing object
+        cluster_models: trained model object of each cluster keyed by cluster
+        """
+        self.preprocessing_object = preprocessing_object
+        self.cluster_models = cluster_models
+
+    @classmethod
+    def from_cluster_models(cls, models: List[ConcreteStrengthEstimatorModel], preprocessing_object=None):
+        """
+        Builds a routed model from per cluster models sharing one preprocessing object,
+        the one of the first model unless one is supplied.
+        """
+        if preprocessing_object is None:
+            preprocessing_object = models[0].preprocessing_object
+        cluster_models = {int(model.cluster): model.trained_model_object for model in models}
+        return cls(preprocessing_object=preprocessing_object, cluster_models=cluster_models)
+
+    def predict(self, X:pd.DataFrame) -> np.ndarray:
+        """
+        Preprocesses the raw inputs once, splits the row indices by cluster with a single
+        stable argsort, calls each cluster model on its own slice and scatters the
+        predictions back in input order.
+        """
+        transformed_feature = np.asarray(self.preprocessing_object.transform(X))
+        clusters = transformed_feature[:, -1].astype(int)
+        features = pd.DataFrame(transformed_feature[:, :-1], columns=list(X.columns))
+        order = np.argsort(clusters, kind="stable")
+        cluster_ids, cluster_starts = np.unique(clusters[order], return_index=True)
+        predictions = np.empty(len(clusters))
+        for cluster, rows in zip(cluster_ids, np.split(order, cluster_starts[1:])):
+            if cluster not in self.cluster_models:
+                raise Exception(f"No model available for cluster {cluster}")
+            predictions[rows] = self.cluster_models[cluster].predict(features.iloc[rows])
+        return predictions
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.cluster_models})"
+
+    def __str__(self):
+        return self.__repr__()
@@ -1,26 +1,256 @@
 from collections import namedtuple
-from datetime import datetime
+from contextlib import closing, contextmanager
+from datetime import datetime, timedelta
+from typing import List
 import os, sys
-import pandas as pd
+import ast
+import re
+import sqlite3
 import uuid
+import json
 
 from concrete_src.exception import ConcreteException
+from concrete_src.logger import get_logger
 from concrete_src.constant import *
 
+logger = get_logger(__name__)
+
 ExperimentDetails = namedtuple("ExperimentDetails", ["experiment_id", "initialization_timestamp", "artifact_time_stamp",
                                        "running_status", "start_time", "stop_time", "execution_time", "message",
-                                       "experiment_file_path", "accuracy", "is_model_accepted"])
+                                       "experiment_file_path", "accuracy", "is_model_accepted",
+                                       "stage_profile", "profile_file_path"])
+
+# one row per run and one row per cluster of a run. Each query of the store reads one index range
+EXPERIMENT_STORE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS experiment (
+        experiment_id TEXT PRIMARY KEY,
+        initialization_timestamp TEXT,
+        artifact_time_stamp TEXT,
+        running_status INTEGER NOT NULL,
+        start_time TEXT NOT NULL,
+        stop_time TEXT,
+        execution_seconds REAL,
+        message TEXT,
+        stage_profile TEXT,
+        profile_file_path TEXT,
+        created_time_stamp TEXT NOT NULL)""",
+    """CREATE TABLE IF NOT EXISTS experiment_cluster (
+        experiment_id TEXT NOT NULL REFERENCES experiment(experiment_id) ON DELETE CASCADE,
+        cluster INTEGER NOT NULL,
+        accuracy REAL,
+        is_model_accepted INTEGER,
+        start_time TEXT NOT NULL,
+        PRIMARY KEY (experiment_id, cluster))""",
+    "CREATE INDEX IF NOT EXISTS experiment_start_time ON experiment(start_time)",
+    "CREATE INDEX IF NOT EXISTS experiment_execution_seconds ON experiment(execution_seconds)",
+    # start time is repeated on the cluster rows, so the runs of a cluster are read newest first from the index
+    """CREATE INDEX IF NOT EXISTS experiment_cluster_accepted
+        ON experiment_cluster(cluster, is_model_accepted, start_time)""",
+]
+
+class ExperimentStore:
+
+    def __init__(self, store_file_path:str, csv_file_path:str=None):
+        """
+        Sqlite store of the experiments with the accuracy and acceptance of each cluster as columns.
+        Runs write in transactions, so concurrent runs never interleave, and readers are not blocked
+        by a writer.
+        csv_file_path: csv history of earlier versions, imported when the store is created
+        """
+        try:
+            self.store_file_path = store_file_path
+            is_new_store = not os.path.exists(store_file_path)
+            os.makedirs(os.path.dirname(store_file_path), exist_ok=True)
+            with self.transaction() as connection:
+                for statement in EXPERIMENT_STORE_SCHEMA:
+                    connection.execute(statement)
+            if is_new_store and csv_file_path is not None and os.path.exists(csv_file_path):
+                self.import_csv(csv_file_path)
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def connect(self)->sqlite3.Connection:
+        connection = sqlite3.connect(self.store_file_path, timeout=EXPERIMENT_STORE_TIMEOUT_SECONDS,
+                                     isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA foreign_keys=ON")
+        return connection
+
+    @contextmanager
+    def transaction(self):
+        """
+        Takes the write lock at the start, waiting for other writers, and commits when the block exits.
+        """
+        with closing(self.connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    @staticmethod
+    def write_experiment(connection:sqlite3.Connection, experiment:ExperimentDetails, created_time_stamp:datetime):
+        start_time = experiment.start_time.isoformat()
+        connection.execute("DELETE FROM experiment WHERE experiment_id = ?", (experiment.experiment_id,))
+        connection.execute(
+            "INSERT INTO experiment VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (experiment.experiment_id, experiment.initialization_timestamp, experiment.artifact_time_stamp,
+             int(experiment.running_status), start_time,
+             None if experiment.stop_time is None else experiment.stop_time.isoformat(),
+             None if experiment.execution_time is None else experiment.execution_time.total_seconds(),
+             experiment.message, experiment.stage_profile, experiment.profile_file_path,
+             created_time_stamp.isoformat()))
+        accuracies = experiment.accuracy or []
+        accepted = experiment.is_model_accepted or []
+        connection.executemany(
+            "INSERT INTO experiment_cluster VALUES (?, ?, ?, ?, ?)",
+            [(experiment.experiment_id, cluster,
+              None if cluster >= len(accuracies) or accuracies[cluster] is None else float(accuracies[cluster]),
+              None if cluster >= len(accepted) or accepted[cluster] is None else int(bool(accepted[cluster])),
+              start_time)
+             for cluster in range(max(len(accuracies), len(accepted)))])
+
+    def save(self, experiment:ExperimentDetails):
+        """
+        Inserts the experiment, or replaces it with its clusters when it was saved before.
+        """
+        try:
+            with self.transaction() as connection:
+                self.write_experiment(connection, experiment, datetime.now())
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def read_experiments(self, query:str, parameters:tuple)->List[ExperimentDetails]:
+        """
+        Runs a query returning experiment ids and returns their experiments in the order of the query.
+        """
+        try:
+            with closing(self.connect()) as connection:
+                experiment_ids = [row[0] for row in connection.execute(query, parameters)]
+                if len(experiment_ids) == 0:
+                    return []
+                placeholders = ", ".join("?" * len(experiment_ids))
+                experiment_rows = {row["experiment_id"]: row for row in connection.execute(
+                    f"SELECT * FROM experiment WHERE experiment_id IN ({placeholders})", experiment_ids)}
+                cluster_rows = {}
+                for row in connection.execute(
+                        f"SELECT * FROM experiment_cluster WHERE experiment_id IN ({placeholders}) "
+                        f"ORDER BY experiment_id, cluster", experiment_ids):
+                    cluster_rows.setdefault(row["experiment_id"], []).append(row)
+            return [self.to_experiment_details(experiment_rows[experiment_id], cluster_rows.get(experiment_id, []))
+                    for experiment_id in experiment_ids if experiment_id in experiment_rows]
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def to_experiment_details(self, row:sqlite3.Row, cluster_rows:List[sqlite3.Row])->ExperimentDetails:
+        return ExperimentDetails(experiment_id=row["experiment_id"],
+                                 initialization_timestamp=row["initialization_timestamp"],
+                                 artifact_time_stamp=row["artifact_time_stamp"],
+                                 running_status=bool(row["running_status"]),
+                                 start_time=datetime.fromisoformat(row["start_time"]),
+                                 stop_time=None if row["stop_time"] is None else datetime.fromisoformat(row["stop_time"]),
+                                 execution_time=None if row["execution_seconds"] is None
+                                                else timedelta(seconds=row["execution_seconds"]),
+                                 message=row["message"],
+                                 experiment_file_path=self.store_file_path,
+                                 accuracy=[cluster_row["accuracy"] for cluster_row in cluster_rows] or None,
+                                 is_model_accepted=[None if cluster_row["is_model_accepted"] is None
+                                                    else bool(cluster_row["is_model_accepted"])
+                                                    for cluster_row in cluster_rows] or None,
+                                 stage_profile=row["stage_profile"],
+                                 profile_file_path=row["profile_file_path"])
+
+    def get_experiment(self, experiment_id:str)->ExperimentDetails:
+        """
+        Returns the experiment, None if not found.
+        """
+        experiments = self.read_experiments("SELECT experiment_id FROM experiment WHERE experiment_id = ?",
+                                            (experiment_id,))
+        return experiments[0] if len(experiments) > 0 else None
+
+    def get_latest_experiments(self, limit:int=10)->List[ExperimentDetails]:
+        """
+        Returns the last started experiments, newest first.
+        """
+        return self.read_experiments("SELECT experiment_id FROM experiment ORDER BY start_time DESC LIMIT ?",
+                                     (limit,))
+
+    def get_experiments_by_accepted_cluster(self, cluster:int, limit:int=10)->List[ExperimentDetails]:
+        """
+        Returns the last experiments whose model of the cluster was accepted, newest first.
+        """
+        return self.read_experiments("SELECT experiment_id FROM experiment_cluster "
+                                     "WHERE cluster = ? AND is_model_accepted = 1 ORDER BY start_time DESC LIMIT ?",
+                                     (cluster, limit))
+
+    def get_slow_experiments(self, min_seconds:float, limit:int=10)->List[ExperimentDetails]:
+        """
+        Returns the finished experiments that ran longer than min_seconds, slowest first.
+        """
+        return self.read_experiments("SELECT experiment_id FROM experiment WHERE execution_seconds > ? "
+                                     "ORDER BY execution_seconds DESC LIMIT ?", (min_seconds, limit))
+
+    def import_csv(self, csv_file_path:str):
+        """
+        Imports the csv history of earlier versions. The last row of an experiment is kept,
+        like the finished run after its started row.
+        """
+        try:
+            import pandas as pd
+            experiment_df = pd.read_csv(csv_file_path).drop_duplicates("experiment_id", keep="last")
+            experiment_df = experiment_df.astype(object).where(experiment_df.notna(), None)
+            with self.transaction() as connection:
+                for record in experiment_df.to_dict("records"):
+                    experiment = ExperimentDetails(
+                        experiment_id=record["experiment_id"],
+                        initialization_timestamp=record["initialization_timestamp"],
+                        artifact_time_stamp=record["artifact_time_stamp"],
+                        running_status=str(record["running_status"]) == "True",
+                        start_time=datetime.fromisoformat(record["start_time"]),
+                        stop_time=None if record["stop_time"] is None else datetime.fromisoformat(record["stop_time"]),
+                        execution_time=None if record["execution_time"] is None
+                                       else pd.Timedelta(record["execution_time"]).to_pytimedelta(),
+                        message=record["message"], experiment_file_path=self.store_file_path,
+                        accuracy=parse_csv_list(record["accuracy"]),
+                        is_model_accepted=parse_csv_list(record["is_model_accepted"]),
+                        stage_profile=record.get("stage_profile"),
+                        profile_file_path=record.get("profile_file_path"))
+                    created_time_stamp = record.get("created_time_stamp")
+                    self.write_experiment(connection, experiment, datetime.now() if created_time_stamp is None
+                                          else datetime.fromisoformat(created_time_stamp))
+            logger.info(f"Imported {len(experiment_df)} experiments from [{csv_file_path}] "
+                        f"into [{self.store_file_path}]")
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+def parse_csv_list(value)->list:
+    """
+    Parses a list written to the csv as its repr, numpy scalars like np.float64(0.5) included.
+    """
+    if value is None:
+        return None
+    return ast.literal_eval(re.sub(r"np\.\w+\(([^()]*)\)", r"\1", str(value)))
 
 class Experiment:
     def __init__(self, artifact_dir, timestamp):
         self.current_experiment = None
         os.makedirs(artifact_dir, exist_ok=True)
         self.experiment_file_path=os.path.join(artifact_dir,EXPERIMENT_DIR_NAME, EXPERIMENT_FILE_NAME)
+        self.profile_dir = os.path.join(artifact_dir, EXPERIMENT_DIR_NAME, EXPERIMENT_PROFILE_DIR_NAME)
+        self.experiment_store = ExperimentStore(self.experiment_file_path,
+                                                csv_file_path=os.path.join(artifact_dir, EXPERIMENT_DIR_NAME,
+                                                                           EXPERIMENT_CSV_FILE_NAME))
         self.timestamp = timestamp
 
     def get_experiment_details(self):
         return self.current_experiment
 
+    def get_profile_file_path(self):
+        return os.path.join(self.profile_dir, f"{self.current_experiment.experiment_id}.json")
+
     def start_experiment(self, msg):
         experiment_id = str(uuid.uuid4())
         self.current_experiment = ExperimentDetails(experiment_id=experiment_id,
@@ -34,9 +264,11 @@ class Experiment:
                                              is_model_accepted=None,
                                              message= msg,
                                              accuracy=None,
+                                             stage_profile=None,
+                                             profile_file_path=None
                                              )
 
-    def stop_experiment(self, msg, is_model_accepted, model_accuracy):
+    def stop_experiment(self, msg, is_model_accepted, model_accuracy, stage_profile=None, profile_file_path=None):
         stop_time = datetime.now()
         self.current_experiment = ExperimentDetails(experiment_id=self.current_experiment.experiment_id,
                                              initialization_timestamp=self.timestamp,
@@ -48,26 +280,16 @@ class Experiment:
                                              message=msg,
                                              experiment_file_path=self.experiment_file_path,
                                              is_model_accepted=is_model_accepted,
-                                             accuracy=model_accuracy
+                                             accuracy=model_accuracy,
+                                             # json text column of the store
+                                             stage_profile=None if stage_profile is None else json.dumps(stage_profile),
+                                             profile_file_path=profile_file_path
                                              )
 
     def save_experiment(self):
         try:
             if self.current_experiment.experiment_id is not None:
-                experiment_dict = self.current_experiment._asdict()
-                experiment_dict: dict = {key: [value] for key, value in experiment_dict.items()}
-
-                experiment_dict.update({
-                    "created_time_stamp": [datetime.now()],
-                    "experiment_file_path": [os.path.basename(self.current_experiment.experiment_file_path)]})
-
-                experiment_report = pd.DataFrame(experiment_dict)
-                
-                os.makedirs(os.path.dirname(self.experiment_file_path) , exist_ok=True)
-                if os.path.exists(self.experiment_file_path):
-                    experiment_report.to_csv(self.experiment_file_path, index=False, header=False, mode="a")
-                else:
-                    experiment_report.to_csv(self.experiment_file_path, mode="w", index=False, header=True)
+                self.experiment_store.save(self.current_experiment)
             else:
                 print("Please start experiment")
         except Exception as e:
@@ -0,0 +1,107 @@
+import os, sys
+from typing import Dict, List
+
+import numpy as np
+import yaml
+
+from concrete_src.exception import ConcreteException
+from concrete_src.logger import get_logger
+from concrete_src.constant import *
+
+logger = get_logger(__name__)
+
+# keys of the state, written by the data transformation
+STATE_TRANSFORMATION_KEY = "transformation_key"
+STATE_TRANSFORMED_TRAIN_FILE_PATH = "transformed_train_file_path"
+STATE_ROW_HASHES_FILE_PATH = "row_hashes_file_path"
+STATE_PREPROCESSED_OBJECT_FILE_PATH = "preprocessed_object_file_path"
+STATE_PREPROCESSING_FITTED_ROWS = "preprocessing_fitted_rows"
+# and by the model trainer
+STATE_PREPROCESSED_OBJECT_HASH = "preprocessed_object_hash"
+STATE_MODEL_CONFIG_KEY = "model_config_key"
+STATE_CLUSTER_MODEL_PATHS = "cluster_model_paths"
+
+class IncrementalState:
+
+    def __init__(self, state_file_path:str) -> None:
+        """
+        State a training run leaves for the next one: the rows already transformed,
+        the preprocessing object routing them, and the last trained model of each cluster.
+        Each stage updates its own keys once it completed.
+        state_file_path: yaml file of the state, shared by the runs
+        """
+        self.state_file_path = state_file_path
+
+    def read(self)->dict:
+        """
+        Returns the state, empty when no run completed yet.
+        """
+        try:
+            if not os.path.exists(self.state_file_path):
+                return dict()
+            with open(self.state_file_path, "rb") as state_file:
+                return yaml.safe_load(state_file) or dict()
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def update(self, **values):
+        """
+        Sets the given keys. The file is replaced in one rename, a run stopped halfway leaves the previous state.
+        """
+        try:
+            state = self.read()
+            state.update(values)
+            os.makedirs(os.path.dirname(self.state_file_path), exist_ok=True)
+            tmp_file_path = f"{self.state_file_path}.{os.getpid()}.tmp"
+            with open(tmp_file_path, "w") as state_file:
+                yaml.dump(state, state_file)
+            os.replace(tmp_file_path, self.state_file_path)
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+def get_cluster_statistics(features:np.ndarray, label:np.ndarray)->dict:
+    """
+    Statistics of the rows of a cluster that a refit is decided on, stored with its model.
+    """
+    return {"rows": int(len(features)),
+            "feature_mean": features.mean(axis=0).tolist(), "feature_std": features.std(axis=0).tolist(),
+            "label_mean": float(label.mean()), "label_std": float(label.std())}
+
+def get_drift(previous_statistics:dict, features:np.ndarray, label:np.ndarray)->float:
+    """
+    Largest move of the mean of a feature or of the label since the model was trained,
+    in standard deviations of the rows it was trained on.
+    """
+    previous_std = np.maximum(np.asarray(previous_statistics["feature_std"], dtype=float), 1e-12)
+    feature_drift = np.abs(features.mean(axis=0) - np.asarray(previous_statistics["feature_mean"], dtype=float)) / previous_std
+    label_drift = abs(float(label.mean()) - previous_statistics["label_mean"]) / max(previous_statistics["label_std"], 1e-12)
+    return float(max(feature_drift.max(initial=0.0), label_drift))
+
+def get_clusters_to_refit(cluster_data:Dict[int, tuple], previous_statistics:Dict[int, dict],
+                          rows_change_threshold:float, drift_threshold:float)->List[int]:
+    """
+    Clusters without a previous model, or whose rows grew by rows_change_threshold,
+    or whose feature or label means drifted by drift_threshold.
+    cluster_data: (features, label) of each cluster keyed by cluster
+    previous_statistics: statistics of the rows of the previous model of each cluster
+    """
+    clusters_to_refit = []
+    for cluster, (features, label) in cluster_data.items():
+        statistics = previous_statistics.get(cluster)
+        if statistics is None or "rows" not in statistics:
+            logger.info(f"Cluster {cluster}: no previous model statistics, refitting")
+            clusters_to_refit.append(cluster)
+            continue
+        new_rows = len(features) - statistics["rows"]
+        if new_rows == 0:
+            logger.info(f"Cluster {cluster}: no new rows, carried forward")
+            continue
+        rows_change = abs(new_rows) / max(statistics["rows"], 1)
+        drift = get_drift(statistics, features, label)
+        if rows_change >= rows_change_threshold or drift >= drift_threshold:
+            logger.info(f"Cluster {cluster}: {new_rows} new rows ({rows_change:.3f}), drift {drift:.3f}, refitting")
+            clusters_to_refit.append(cluster)
+        else:
+            logger.info(f"Cluster {cluster}: {new_rows} new rows ({rows_change:.3f}), drift {drift:.3f}, "
+                        f"below thresholds, carried forward")
+    return clusters_to_refit
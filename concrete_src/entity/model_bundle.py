@@ -0,0 +1,183 @@
+import os, sys
+import hashlib
+import zipfile
+import json, dill
+from datetime import datetime
+from typing import Dict, List
+
+from concrete_src.exception import ConcreteException
+from concrete_src.logger import get_logger
+from concrete_src.constant import *
+from concrete_src.entity.estimator import ConcreteStrengthEstimatorModel, ClusterRoutedEstimatorModel
+from concrete_src.entity.model_cache import model_cache, load_cached_object
+
+logger = get_logger(__name__)
+
+class ModelBundle:
+
+    def __init__(self, bundle_file_path:str) -> None:
+        """
+        Model bundle of one training run. Only the manifest is read here,
+        the preprocessing object and the cluster models are unpickled when first used.
+        bundle_file_path: Path of the bundle file
+        """
+        try:
+            self.bundle_file_path = bundle_file_path
+            # kept open so that the zip directory is parsed once per bundle
+            self.bundle_file = zipfile.ZipFile(bundle_file_path)
+            self.manifest = json.loads(self.read_member(MODEL_BUNDLE_MANIFEST_NAME, sha256=None))
+            if self.manifest[MODEL_BUNDLE_FORMAT_VERSION_KEY] != MODEL_BUNDLE_FORMAT_VERSION:
+                raise Exception(f"Unsupported bundle format version: {self.manifest[MODEL_BUNDLE_FORMAT_VERSION_KEY]}")
+            # json object keys are strings
+            self.manifest[MODEL_BUNDLE_CLUSTERS_KEY] = {int(cluster): member for cluster, member
+                                                        in self.manifest[MODEL_BUNDLE_CLUSTERS_KEY].items()}
+            self.version = self.manifest[MODEL_BUNDLE_VERSION_KEY]
+            self.clusters = sorted(self.manifest[MODEL_BUNDLE_CLUSTERS_KEY].keys())
+            self.preprocessing_object = None
+            self.cluster_models = dict()
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def __del__(self):
+        if hasattr(self, "bundle_file"):
+            self.bundle_file.close()
+
+    @staticmethod
+    def is_model_bundle(file_path:str)->bool:
+        return zipfile.is_zipfile(file_path)
+
+    def read_member(self, member_name:str, sha256:str)->bytes:
+        """
+        Reads one member of the bundle and checks it against its sha256 from the manifest.
+        """
+        try:
+            content = self.bundle_file.read(member_name)
+            if sha256 is not None and hashlib.sha256(content).hexdigest() != sha256:
+                raise Exception(f"Bundle member [{member_name}] of [{self.bundle_file_path}] does not match its checksum")
+            return content
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def get_preprocessing_object(self):
+        try:
+            if self.preprocessing_object is None:
+                member = self.manifest[MODEL_BUNDLE_PREPROCESSING_KEY]
+                logger.debug("Loading preprocessing object from [%s]", self.bundle_file_path)
+                self.preprocessing_object = dill.loads(self.read_member(member[MODEL_BUNDLE_MEMBER_KEY],
+                                                                        member[MODEL_BUNDLE_SHA256_KEY]))
+            return self.preprocessing_object
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def get_cluster_model(self, cluster:int)->ConcreteStrengthEstimatorModel:
+        """
+        Returns the model of the cluster. All the cluster models of the bundle share one preprocessing object.
+        """
+        try:
+            cluster = int(cluster)
+            if cluster not in self.cluster_models:
+                if cluster not in self.manifest[MODEL_BUNDLE_CLUSTERS_KEY]:
+                    raise Exception(f"No model for cluster {cluster} in [{self.bundle_file_path}]")
+                member = self.manifest[MODEL_BUNDLE_CLUSTERS_KEY][cluster]
+                logger.debug("Loading cluster %s model from [%s]", cluster, self.bundle_file_path)
+                trained_model_object = dill.loads(self.read_member(member[MODEL_BUNDLE_MEMBER_KEY],
+                                                                   member[MODEL_BUNDLE_SHA256_KEY]))
+                self.cluster_models[cluster] = ConcreteStrengthEstimatorModel(
+                    cluster=cluster, preprocessing_object=self.get_preprocessing_object(),
+                    trained_model_object=trained_model_object)
+            return self.cluster_models[cluster]
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def get_routed_model(self, clusters:List[int]=None)->ClusterRoutedEstimatorModel:
+        """
+        Combines the models of the clusters, all of them by default, into one routed model.
+        """
+        try:
+            clusters = self.clusters if clusters is None else clusters
+            return ClusterRoutedEstimatorModel.from_cluster_models(
+                models=[self.get_cluster_model(cluster) for cluster in clusters],
+                preprocessing_object=self.get_preprocessing_object())
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    @staticmethod
+    def save(bundle_file_path:str, preprocessing_object, cluster_models:Dict[int, object],
+             cluster_details:Dict[int, dict]=None)->dict:
+        """
+        Writes the preprocessing object once and the trained model object of every cluster
+        into a single bundle file with a manifest. The file is replaced atomically.
+        cluster_models: trained model object of each cluster keyed by cluster
+        cluster_details: extra manifest entries of each cluster, like metrics
+        Returns:
+        manifest of the bundle
+        """
+        try:
+            cluster_details = dict() if cluster_details is None else cluster_details
+            members = {MODEL_BUNDLE_PREPROCESSING_MEMBER_NAME: dill.dumps(preprocessing_object)}
+            for cluster, trained_model_object in cluster_models.items():
+                members[f"model_cluster{int(cluster)}.pkl"] = dill.dumps(trained_model_object)
+            member_hashes = {member_name: hashlib.sha256(content).hexdigest() for member_name, content in members.items()}
+
+            def get_member_entry(member_name):
+                return {MODEL_BUNDLE_MEMBER_KEY: member_name, MODEL_BUNDLE_SHA256_KEY: member_hashes[member_name],
+                        "size": len(members[member_name])}
+
+            bundle_hash = hashlib.sha256("".join(member_hashes[name] for name in sorted(member_hashes)).encode())
+            manifest = {
+                MODEL_BUNDLE_FORMAT_VERSION_KEY: MODEL_BUNDLE_FORMAT_VERSION,
+                # content addressed, the same models always give the same version
+                MODEL_BUNDLE_VERSION_KEY: bundle_hash.hexdigest()[:16],
+                "created_at": datetime.now().isoformat(),
+                MODEL_BUNDLE_PREPROCESSING_KEY: get_member_entry(MODEL_BUNDLE_PREPROCESSING_MEMBER_NAME),
+                MODEL_BUNDLE_CLUSTERS_KEY: {
+                    int(cluster): {"model_name": type(trained_model_object).__name__,
+                                   **get_member_entry(f"model_cluster{int(cluster)}.pkl"),
+                                   **cluster_details.get(cluster, dict())}
+                    for cluster, trained_model_object in cluster_models.items()}
+            }
+
+            os.makedirs(os.path.dirname(bundle_file_path), exist_ok=True)
+            temp_file_path = f"{bundle_file_path}.tmp"
+            # members are stored uncompressed, reading one is a plain slice of the file
+            with zipfile.ZipFile(temp_file_path, "w", compression=zipfile.ZIP_STORED) as bundle_file:
+                # json rather than yaml, the manifest is parsed on every load
+                bundle_file.writestr(MODEL_BUNDLE_MANIFEST_NAME, json.dumps(manifest, indent=2))
+                for member_name, content in members.items():
+                    bundle_file.writestr(member_name, content)
+            os.replace(temp_file_path, bundle_file_path)
+            logger.info(f"Saved model bundle {manifest[MODEL_BUNDLE_VERSION_KEY]} at [{bundle_file_path}]")
+            return manifest
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+def get_model_bundle(bundle_file_path:str)->ModelBundle:
+    """
+    Opens the bundle through the process wide model cache, so that its members are loaded once per process.
+    """
+    return model_cache.get(bundle_file_path, ModelBundle)
+
+def load_cluster_model(model_file_path:str, cluster:int)->ConcreteStrengthEstimatorModel:
+    """
+    Loads the model of the cluster from a bundle, or from a per cluster pickle of earlier releases.
+    Both are served from the process wide model cache. Pickles whose preprocessing was not fitted,
+    written before the imputer fences and the cluster centroids were kept, fail to load with a retrain required error.
+    """
+    try:
+        if not ModelBundle.is_model_bundle(model_file_path):
+            return load_cached_object(model_file_path)
+        return get_model_bundle(model_file_path).get_cluster_model(cluster)
+    except Exception as e:
+        raise ConcreteException(e, sys) from e
+
+def get_preprocessing_hash(model_file_path:str, cluster:int)->str:
+    """
+    sha256 of the preprocessing object of a cluster model. Models with the same hash
+    route rows to the same clusters, models with different hashes cannot be served together.
+    """
+    try:
+        if ModelBundle.is_model_bundle(model_file_path):
+            return get_model_bundle(model_file_path).manifest[MODEL_BUNDLE_PREPROCESSING_KEY][MODEL_BUNDLE_SHA256_KEY]
+        return hashlib.sha256(dill.dumps(load_cluster_model(model_file_path, cluster).preprocessing_object)).hexdigest()
+    except Exception as e:
+        raise ConcreteException(e, sys) from e
@@ -0,0 +1,99 @@
+import os, sys
+import threading
+from collections import OrderedDict
+
+from concrete_src.exception import ConcreteException
+from concrete_src.logger import get_logger
+from concrete_src.constant import *
+from concrete_src.util.util import load_object
+
+logger = get_logger(__name__)
+
+class ModelCache:
+
+    def __init__(self, max_size_bytes:int) -> None:
+        """
+        Keeps deserialized objects in memory, keyed by file identity, size and modification time,
+        so that each file is loaded once per process until it changes on disk.
+        Hard links of a file, like a bundle taken over by a later release, share one entry.
+        The least recently used objects are evicted once the cached files add up to max_size_bytes.
+        max_size_bytes: memory cap, the size of an object is estimated by the size of its file
+        """
+        self.max_size_bytes = max_size_bytes
+        self.cached_objects = OrderedDict()
+        self.cached_size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_file_version(file_path:str)->tuple:
+        """
+        Returns the key of the file, its device and inode or its path where there are no inodes,
+        and its version, its size and modification time.
+        """
+        file_stat = os.stat(file_path)
+        file_key = (file_stat.st_dev, file_stat.st_ino) if file_stat.st_ino else file_path
+        return file_key, (file_stat.st_size, file_stat.st_mtime_ns)
+
+    def get(self, file_path:str, loader=load_object):
+        """
+        Returns the object of the file, loading it with loader(file_path) on a miss
+        or when the file changed since it was cached.
+        """
+        try:
+            file_path = os.path.abspath(file_path)
+            with self.lock:
+                file_key, file_version = ModelCache.get_file_version(file_path)
+                if file_key in self.cached_objects:
+                    cached_version, cached_object = self.cached_objects[file_key]
+                    if cached_version == file_version:
+                        self.cached_objects.move_to_end(file_key)
+                        self.hits += 1
+                        return cached_object
+                    logger.info("Model cache: [%s] changed on disk, reloading", file_path)
+                    self.remove(file_key)
+                self.misses += 1
+                cached_object = loader(file_path)
+                self.cached_objects[file_key] = (file_version, cached_object)
+                self.cached_size_bytes += file_version[0]
+                self.evict()
+                return cached_object
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def remove(self, file_key):
+        (file_size, _), _ = self.cached_objects.pop(file_key)
+        self.cached_size_bytes -= file_size
+
+    def evict(self):
+        """
+        Drops the least recently used objects until the cache fits its cap.
+        The most recent object is kept even if it alone is over the cap.
+        """
+        while self.cached_size_bytes > self.max_size_bytes and len(self.cached_objects) > 1:
+            file_key = next(iter(self.cached_objects))
+            self.remove(file_key)
+            self.evictions += 1
+            logger.debug("Model cache: evicted [%s]", file_key)
+
+    def clear(self):
+        with self.lock:
+            self.cached_objects.clear()
+            self.cached_size_bytes = 0
+
+    def get_info(self)->dict:
+        return {"objects": len(self.cached_objects), "size_bytes": self.cached_size_bytes,
+                "max_size_bytes": self.max_size_bytes, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions}
+
+# shared by the trainer, the evaluator and the serving layer of a process
+model_cache = ModelCache(max_size_bytes=MODEL_CACHE_MAX_SIZE_MB * 1024 * 1024)
+
+def load_cached_object(file_path:str):
+    """
+    load_object through the process wide model cache.
+    file_path: str
+    """
+    return model_cache.get(file_path, load_object)
@@ -1,14 +1,20 @@
 from collections import namedtuple
 
 ModelInitializationDetail = namedtuple("ModelInitializationDetail",
-                                    ["model_serial_number", "model", "param_grid", "model_name"])
+                                    ["model_serial_number", "model", "param_grid", "model_name",
+                                     "search_n_jobs", "search_cost"])
 
 GridSearchedBestModel = namedtuple("GridSearchedBestModel", ["model_serial_number",
                                                              "model",
                                                              "best_model",
                                                              "best_parameters",
                                                              "best_score",
-                                                             ])
+                                                             "search_time",
+                                                             "cv_results",
+                                                             "search_profile",
+                                                             "fold_predictions",
+                                                             ],
+                                   defaults=[None])
 
 BestModel = namedtuple("BestModel", ["model_serial_number",
                                      "model",
@@ -20,4 +26,5 @@ ClusterModelDetails = namedtuple("ClusterModelDetails", ["best_model", "grid_sea
 
 MetricInfoArtifact = namedtuple("MetricInfoArtifact",
                                 ["model_name", "model_object", "train_rmse", "train_accuracy",
-                                 "model_accuracy", "index_number"])
\ No newline at end of file
+                                 "model_accuracy", "index_number", "model_rmse", "fold_predictions"],
+                                defaults=[None, None])
\ No newline at end of file
@@ -0,0 +1,180 @@
+import os, sys
+import re
+import shutil
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import yaml
+
+from concrete_src.exception import ConcreteException
+from concrete_src.logger import get_logger
+from concrete_src.constant import *
+from concrete_src.util.util import read_yaml_file, write_yaml_file, get_cluster, get_file_hash, link_file
+from concrete_src.entity.model_bundle import ModelBundle, get_model_bundle, get_preprocessing_hash
+
+logger = get_logger(__name__)
+
+MODEL_FILE_PATTERN = re.compile(r"^model_cluster\d+\.pkl$")
+
+def list_release_dirs(model_dir:str)->List[str]:
+    """
+    Returns the names of the release folders, oldest first. Folders being staged start with a dot.
+    """
+    if not os.path.isdir(model_dir):
+        return []
+    return sorted(name for name in os.listdir(model_dir)
+                  if not name.startswith(".") and os.path.isdir(os.path.join(model_dir, name)))
+
+def get_current_release(model_dir:str)->str:
+    """
+    Returns the release folder being served, None when no release was promoted yet.
+    """
+    try:
+        with open(os.path.join(model_dir, CURRENT_RELEASE_FILE_NAME), "rb") as release_file:
+            return (yaml.safe_load(release_file) or dict()).get(CURRENT_RELEASE_KEY)
+    except FileNotFoundError:
+        return None
+
+def get_release_key(model_dir:str):
+    """
+    Changes whenever another release is to be served.
+    """
+    current_release = get_current_release(model_dir)
+    if current_release is not None:
+        return current_release
+    return tuple(list_release_dirs(model_dir))
+
+def get_release_model_paths(release_dir:str)->Dict[int, str]:
+    """
+    Returns the model file of each cluster of a release folder.
+    Folders of earlier releases hold one pickle per cluster and no exported_clusters.yaml.
+    """
+    exported_clusters_file_path = os.path.join(release_dir, EXPORTED_CLUSTERS_FILE_NAME)
+    if os.path.exists(exported_clusters_file_path):
+        return {int(cluster): os.path.join(release_dir, model_file_name)
+                for cluster, model_file_name in read_yaml_file(exported_clusters_file_path).items()}
+    model_paths = dict()
+    for file_name in os.listdir(release_dir):
+        if MODEL_FILE_PATTERN.match(file_name):
+            model_file_path = os.path.join(release_dir, file_name)
+            model_paths[get_cluster(model_file_path)] = model_file_path
+    return model_paths
+
+def get_served_model_paths(model_dir:str)->Dict[int, str]:
+    """
+    Returns the model file of each cluster being served.
+    A promoted release lists every cluster. Before the first promotion, each cluster
+    is looked up in the newest release folder that contains it.
+    """
+    try:
+        current_release = get_current_release(model_dir)
+        if current_release is not None:
+            return get_release_model_paths(os.path.join(model_dir, current_release))
+        model_paths = dict()
+        for release in list_release_dirs(model_dir):
+            model_paths.update(get_release_model_paths(os.path.join(model_dir, release)))
+        return model_paths
+    except Exception as e:
+        raise ConcreteException(e, sys) from e
+
+def set_current_release(model_dir:str, release:str):
+    """
+    Points the serving workers to the release. The pointer is replaced in one rename,
+    so a reader sees either the previous or the new release.
+    """
+    try:
+        current_release_file_path = os.path.join(model_dir, CURRENT_RELEASE_FILE_NAME)
+        tmp_file_path = f"{current_release_file_path}.{os.getpid()}.tmp"
+        with open(tmp_file_path, "w") as release_file:
+            yaml.dump({CURRENT_RELEASE_KEY: release, "promoted_at": datetime.now().isoformat()}, release_file)
+            release_file.flush()
+            os.fsync(release_file.fileno())
+        os.replace(tmp_file_path, current_release_file_path)
+    except Exception as e:
+        raise ConcreteException(e, sys) from e
+
+def get_release_file_hashes(release_dir:str)->Dict[str, str]:
+    """
+    Returns the hash of every file of a release folder keyed by file name.
+    """
+    return {file_name: get_file_hash(os.path.join(release_dir, file_name))
+            for file_name in sorted(os.listdir(release_dir))}
+
+def get_served_preprocessing_hash(model_file_path:str, cluster:int)->str:
+    """
+    Hash of the preprocessing of a model being served, None when the model cannot be loaded anymore,
+    like the pickles of earlier releases that require a retrain.
+    """
+    try:
+        return get_preprocessing_hash(model_file_path, cluster)
+    except Exception as e:
+        logger.warning(f"Served model [{model_file_path}] of cluster {cluster} cannot be loaded, not kept: {e}")
+        return None
+
+def promote_release(model_dir:str, release:str, model_files:Dict[int, Tuple[str, str]])->Dict[int, str]:
+    """
+    Creates the release folder with the given cluster models on top of the models being served,
+    and promotes it. Files are hard linked, never copied over a file being read.
+    The models of a release share one preprocessing object. When the models being served were routed
+    by another preprocessing, none of them is kept, and the given models have to cover every cluster of their run.
+    The folder is filled under a hidden name and renamed once complete. A push retried with the
+    same release name reuses the existing folder when its files are identical, and fails otherwise.
+    model_files: cluster -> (model file, its file name in the release), names are unique per content
+    Returns:
+    the model file of each cluster in the release
+    """
+    staging_dir = os.path.join(model_dir, f".{release}.staging")
+    try:
+        preprocessing_hashes = {get_preprocessing_hash(model_file_path, cluster)
+                                for cluster, (model_file_path, _) in model_files.items()}
+        if len(preprocessing_hashes) > 1:
+            raise Exception(f"Models of clusters {sorted(model_files)} were routed by different preprocessing, "
+                            f"they cannot be released together")
+        served_model_paths = get_served_model_paths(model_dir)
+        if all(get_served_preprocessing_hash(model_file_path, cluster) in preprocessing_hashes
+               for cluster, model_file_path in served_model_paths.items()):
+            release_files = {cluster: (model_file_path, os.path.basename(model_file_path))
+                             for cluster, model_file_path in served_model_paths.items()}
+        else:
+            run_clusters = set()
+            for model_file_path, _ in model_files.values():
+                if ModelBundle.is_model_bundle(model_file_path):
+                    run_clusters.update(get_model_bundle(model_file_path).clusters)
+            if not run_clusters <= set(model_files):
+                raise Exception(f"Models being served were routed by another preprocessing, the release needs the "
+                                f"models of every cluster of the run {sorted(run_clusters)}, got {sorted(model_files)}")
+            logger.info(f"Models being served were routed by another preprocessing, release [{release}] "
+                        f"holds the models of the new run only")
+            release_files = dict()
+        release_files.update(model_files)
+        if os.path.exists(staging_dir):
+            shutil.rmtree(staging_dir)
+        os.makedirs(staging_dir)
+        exported_clusters = dict()
+        for cluster, (model_file_path, model_file_name) in sorted(release_files.items()):
+            release_file_path = os.path.join(staging_dir, model_file_name)
+            if not os.path.exists(release_file_path):
+                link_file(model_file_path, release_file_path)
+            elif not os.path.samefile(model_file_path, release_file_path) and \
+                    get_file_hash(model_file_path) != get_file_hash(release_file_path):
+                raise Exception(f"Different model files named [{model_file_name}] in release [{release}]")
+            exported_clusters[int(cluster)] = model_file_name
+        write_yaml_file(file_path=os.path.join(staging_dir, EXPORTED_CLUSTERS_FILE_NAME), data=exported_clusters)
+        release_dir = os.path.join(model_dir, release)
+        if not os.path.exists(release_dir):
+            os.rename(staging_dir, release_dir)
+        elif get_release_file_hashes(release_dir) == get_release_file_hashes(staging_dir):
+            logger.info(f"Release [{release_dir}] already exists with the same models, promoting it again")
+            shutil.rmtree(staging_dir)
+        else:
+            raise Exception(f"Release [{release_dir}] already exists with other models, "
+                            f"it is never overwritten. Push again under another release name")
+        set_current_release(model_dir, release)
+        logger.info(f"Promoted release [{release_dir}] serving clusters {sorted(exported_clusters)}, "
+                    f"new models of clusters {sorted(model_files)}")
+        return {cluster: os.path.join(release_dir, model_file_name)
+                for cluster, model_file_name in exported_clusters.items()}
+    except Exception as e:
+        # a failed push leaves no partial folder behind, the release being served is unchanged
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise ConcreteException(e, sys) from e
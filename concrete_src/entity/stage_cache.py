@@ -0,0 +1,80 @@
+import os, sys
+import hashlib
+import json
+
+from concrete_src.exception import ConcreteException
+from concrete_src.logger import get_logger
+from concrete_src.constant import *
+from concrete_src.util.util import read_yaml_file, write_yaml_file
+
+logger = get_logger(__name__)
+
+def to_serializable(value):
+    """
+    Converts numpy scalars and tuples in an artifact to plain python values.
+    """
+    if isinstance(value, (list, tuple)):
+        return [to_serializable(item) for item in value]
+    if isinstance(value, dict):
+        return {key: to_serializable(item) for key, item in value.items()}
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+class StageCache:
+    def __init__(self, artifact_dir):
+        """
+        Stores the artifact of each pipeline stage under a key computed from the stage inputs.
+        artifact_dir: pipeline artifact directory
+        """
+        self.stage_cache_dir = os.path.join(artifact_dir, STAGE_CACHE_DIR_NAME)
+
+    @staticmethod
+    def get_key(*inputs)->str:
+        """
+        Returns sha256 of the stage inputs. Inputs are hashes, file contents or yaml serializable values.
+        """
+        key = hashlib.sha256()
+        for stage_input in inputs:
+            key.update(json.dumps(to_serializable(stage_input), sort_keys=True, default=str).encode())
+        return key.hexdigest()
+
+    def get_cache_file_path(self, stage_name:str, key:str)->str:
+        return os.path.join(self.stage_cache_dir, stage_name, f"{key}.yaml")
+
+    @staticmethod
+    def is_artifact_available(value)->bool:
+        """
+        Checks that every file referenced by the artifact still exists.
+        """
+        if isinstance(value, (list, tuple)):
+            return all(StageCache.is_artifact_available(item) for item in value)
+        if isinstance(value, str) and os.path.isabs(value):
+            return os.path.exists(value)
+        return True
+
+    def get_artifact(self, stage_name:str, key:str, artifact_class):
+        """
+        Returns the stored artifact of the stage for the key, None if not found.
+        """
+        try:
+            cache_file_path = self.get_cache_file_path(stage_name, key)
+            if not os.path.exists(cache_file_path):
+                return None
+            artifact = artifact_class(**read_yaml_file(file_path=cache_file_path))
+            if not StageCache.is_artifact_available(list(artifact)):
+                logger.info(f"Stage {stage_name}: cached artifact files missing, rerunning stage")
+                return None
+            return artifact
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def save_artifact(self, stage_name:str, key:str, artifact):
+        """
+        Stores the artifact of the stage for the key.
+        """
+        try:
+            write_yaml_file(file_path=self.get_cache_file_path(stage_name, key),
+                            data=to_serializable(artifact._asdict()))
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
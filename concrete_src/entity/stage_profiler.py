@@ -0,0 +1,139 @@
+import os, sys
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List
+
+from concrete_src.exception import ConcreteException
+from concrete_src.logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import resource
+except ImportError:
+    # cpu time of child processes and peak memory are not available on windows
+    resource = None
+
+PROC_STATUS_FILE_PATH = "/proc/self/status"
+PROC_CLEAR_REFS_FILE_PATH = "/proc/self/clear_refs"
+
+def reset_peak_rss()->bool:
+    """
+    Resets the peak resident memory of this process, so that the next reading is the peak of a stage.
+    Only linux allows it, elsewhere the peak since the process started is reported.
+    """
+    try:
+        with open(PROC_CLEAR_REFS_FILE_PATH, "w") as clear_refs_file:
+            clear_refs_file.write("5")
+        return True
+    except OSError:
+        return False
+
+def get_peak_rss_mb()->float:
+    """
+    Peak resident memory of this process in MB, None where it cannot be read.
+    """
+    try:
+        with open(PROC_STATUS_FILE_PATH) as status_file:
+            for line in status_file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def get_child_peak_rss_mb()->float:
+    """
+    Peak resident memory of the largest child process that exited, in MB, None where it cannot be read.
+    """
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+def get_child_cpu_time()->float:
+    if resource is None:
+        return 0.0
+    child_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return child_usage.ru_utime + child_usage.ru_stime
+
+@contextmanager
+def profile(stage_name:str, rows:int=None, reset_peak:bool=False, thread:bool=False, cpu:bool=True, **details):
+    """
+    Measures the block and yields its profile record, filled in when the block exits.
+    rows: no. of rows processed, can also be set on the record inside the block
+    reset_peak: reports the peak memory of the block rather than of the process so far
+    thread: cpu time of the calling thread only, for blocks running next to each other in threads
+    cpu: False when the work of the block runs in pool workers that outlive it, their cpu time
+    is neither in this process nor in the exited children, cpu_seconds is then None rather than near 0
+    details: extra fields of the record, like the cluster
+    Record:
+    wall_seconds, cpu_seconds, child_cpu_seconds (worker processes that exited during the block),
+    peak_rss_mb and rows
+    """
+    record = {"stage": stage_name, **details, "started_at": datetime.now().isoformat(), "pid": os.getpid(),
+              "rows": rows}
+    cpu_clock = time.thread_time if thread else time.process_time
+    if reset_peak:
+        reset_peak_rss()
+    start_child_cpu_time = get_child_cpu_time()
+    start_cpu_time = cpu_clock()
+    start_time = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["wall_seconds"] = time.perf_counter() - start_time
+        record["cpu_seconds"] = cpu_clock() - start_cpu_time if cpu else None
+        record["child_cpu_seconds"] = None if thread or not cpu else get_child_cpu_time() - start_child_cpu_time
+        record["peak_rss_mb"] = get_peak_rss_mb()
+
+class StageProfiler:
+
+    def __init__(self) -> None:
+        """
+        Collects the profile records of the pipeline stages and of the model searches of a run.
+        """
+        self.stage_profiles = []
+        self.search_profiles = []
+
+    @contextmanager
+    def profile_stage(self, stage_name:str, rows:int=None):
+        with profile(stage_name, rows=rows, reset_peak=True, cached=False) as record:
+            yield record
+        self.stage_profiles.append(record)
+        logger.info(f"Stage {stage_name}: {record['wall_seconds']:.2f}s wall, {record['cpu_seconds']:.2f}s cpu, "
+                    f"{record['peak_rss_mb']} MB peak rss, {record['rows']} rows")
+
+    def add_cached_stage(self, stage_name:str):
+        self.stage_profiles.append({"stage": stage_name, "cached": True, "started_at": datetime.now().isoformat(),
+                                    "pid": os.getpid(), "rows": None, "wall_seconds": 0.0, "cpu_seconds": 0.0,
+                                    "child_cpu_seconds": 0.0, "peak_rss_mb": None})
+
+    def add_search_profiles(self, search_profiles:List[dict]):
+        self.search_profiles.extend(search_profiles)
+
+    def get_summary(self)->dict:
+        """
+        Wall time, cpu time, peak memory and rows of each stage, keyed by stage.
+        """
+        return {record["stage"]: {key: record[key] for key in
+                                  ["cached", "wall_seconds", "cpu_seconds", "peak_rss_mb", "rows"]}
+                for record in self.stage_profiles}
+
+    def save(self, file_path:str, **run_details):
+        """
+        Writes the profile of the run as json.
+        run_details: fields identifying the run, like the experiment id
+        """
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, "w") as profile_file:
+                json.dump({**run_details, "stages": self.stage_profiles, "searches": self.search_profiles},
+                          profile_file, indent=2, default=str)
+            logger.info(f"Saved run profile at [{file_path}]")
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
@@ -1,6 +1,8 @@
 import os
 import sys
-from concrete_src.logger import logging
+from concrete_src.logger import get_logger
+
+logger = get_logger(__name__)
 
 class ConcreteException(Exception):
     
@@ -14,7 +16,7 @@ class ConcreteException(Exception):
         self.error_message=ConcreteException.get_detailed_error_message(error_message=error_message,
                                                                        error_detail=error_detail
                                                                         )
-        logging.error(self.error_message)
+        logger.error(self.error_message)
 
     @staticmethod
     def get_detailed_error_message(error_message:Exception,error_detail:sys)->str:
@@ -37,6 +39,23 @@ class ConcreteException(Exception):
     def __str__(self):
         return self.error_message
 
+    def __reduce__(self):
+        """
+        Exceptions raised in worker processes are pickled back to the parent,
+        where there is no traceback to rebuild the message from.
+        """
+        return (rebuild_concrete_exception, (self.error_message,))
+
 
     def __repr__(self) -> str:
         return ConcreteException.__name__.str()
+
+
+def rebuild_concrete_exception(error_message:str)->ConcreteException:
+    """
+    Recreates a pickled ConcreteException from its detailed error message.
+    """
+    exception = ConcreteException.__new__(ConcreteException)
+    Exception.__init__(exception, error_message)
+    exception.error_message = error_message
+    return exception
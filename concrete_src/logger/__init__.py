@@ -1,20 +1,176 @@
 import logging
-from datetime import datetime
+import logging.handlers
+import atexit
+import multiprocessing.util
 import os
-from time import asctime
+import queue
+import random
+import threading
+from datetime import datetime
+
+import yaml
+
+from concrete_src.constant import *
 
 LOG_DIR = "development_logs"
 CURRENT_TIME_STAMP = f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
 LOG_FILE_NAME = f"log_{CURRENT_TIME_STAMP}.log"
 LOG_FILE_PATH = os.path.join(LOG_DIR, LOG_FILE_NAME)
+LOG_FORMAT = '[%(asctime)s] %(filename)s:%(lineno)d - %(levelname)s -%(message)s'
+
+class SamplingFilter(logging.Filter):
+    """
+    Lets through sample_rate of the records below WARNING, warnings and errors are always kept.
+    """
+    def __init__(self, sample_rate:float):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.sample_rate
+
+class DeferredFileHandler(logging.FileHandler):
+    """
+    File handler that creates its directory and opens its file on the first record,
+    so that importing the package writes nothing to disk.
+    """
+    def __init__(self, file_path:str):
+        super().__init__(file_path, mode="a", delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that starts the listener thread on the first record.
+    """
+    def enqueue(self, record):
+        if log_listener is None:
+            start_listener()
+        super().enqueue(record)
+
+class ModuleFilter(logging.Filter):
+    """
+    Passes the records of the given modules and of their submodules, or every other record when exclude.
+    """
+    def __init__(self, module_names:list, exclude:bool=False):
+        super().__init__()
+        self.module_names = tuple(module_names)
+        self.exclude = exclude
+
+    def filter(self, record):
+        is_matched = any(record.name == module_name or record.name.startswith(f"{module_name}.")
+                         for module_name in self.module_names)
+        return is_matched != self.exclude
+
+# handlers of the listener, queue handler of the root logger and the listener thread.
+# The handlers are set up by configure_logging, the thread is started by the first record
+log_handlers = []
+log_queue_handler = None
+log_listener = None
+log_lock = threading.Lock()
+
+def read_logging_config(config_file_path:str)->dict:
+    """
+    Returns the logging section of the configuration file, empty when there is none.
+    """
+    try:
+        with open(config_file_path, "rb") as config_file:
+            return (yaml.safe_load(config_file) or dict()).get(LOGGING_CONFIG_KEY) or dict()
+    except OSError:
+        return dict()
+
+def get_file_handler(log_dir:str, file_name:str)->logging.Handler:
+    file_handler = DeferredFileHandler(os.path.join(log_dir, file_name))
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return file_handler
+
+def start_listener():
+    """
+    Log records are put on a queue by the logging threads and written by a single listener thread,
+    so a slow disk never blocks prediction or training.
+    """
+    global log_listener
+    with log_lock:
+        if log_listener is not None:
+            return
+        log_listener = logging.handlers.QueueListener(log_queue_handler.queue, *log_handlers,
+                                                      respect_handler_level=True)
+        log_listener.start()
+        atexit.register(stop_listener)
+        # worker processes of multiprocessing pools exit without running atexit
+        multiprocessing.util.Finalize(None, stop_listener, exitpriority=0)
+
+def stop_listener():
+    """
+    Writes out the queued records. Registered to run at exit.
+    """
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+
+def reset_listener_after_fork():
+    """
+    A forked worker has no listener thread, it starts its own on the same handlers with its first record.
+    """
+    global log_listener, log_lock
+    log_lock = threading.Lock()
+    log_listener = None
+    if log_queue_handler is not None:
+        log_queue_handler.queue = queue.SimpleQueue()
+
+def configure_logging(config_file_path:str=CONFIG_FILE_PATH):
+    """
+    Sets up the logging of this process from the logging section of the configuration file:
+    log_dir: folder of the log files, the CONCRETE_LOG_DIR environment variable takes precedence
+    level: level of every module without its own level
+    console: also write to stderr
+    modules: per module level, sample_rate and file_name, the records of a module with
+    a file_name are written to that file instead of the main log file
+    Nothing is written to disk and no thread is started until the first record.
+    Called once, later calls do nothing.
+    """
+    global log_handlers, log_queue_handler
+    with log_lock:
+        if log_queue_handler is not None:
+            return
+        logging_config = read_logging_config(config_file_path)
+        log_dir = os.environ.get(LOG_DIR_ENV_KEY) or logging_config.get(LOGGING_DIR_KEY, LOG_DIR)
+        module_configs = logging_config.get(LOGGING_MODULES_KEY) or dict()
 
-os.makedirs(LOG_DIR, exist_ok= True)
+        routed_modules = [module_name for module_name, module_config in module_configs.items()
+                          if module_config.get(LOGGING_FILE_NAME_KEY)]
+        main_handler = get_file_handler(log_dir, LOG_FILE_NAME)
+        main_handler.addFilter(ModuleFilter(routed_modules, exclude=True))
+        log_handlers = [main_handler]
+        for module_name in routed_modules:
+            module_handler = get_file_handler(log_dir, module_configs[module_name][LOGGING_FILE_NAME_KEY])
+            module_handler.addFilter(ModuleFilter([module_name]))
+            log_handlers.append(module_handler)
+        if logging_config.get(LOGGING_CONSOLE_KEY, False):
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            log_handlers.append(console_handler)
 
-logging.basicConfig(
-    filename= LOG_FILE_PATH,
-    filemode= "a",
-    format='[%(asctime)s] %(filename)s:%(lineno)d - %(levelname)s -%(message)s',
-    level= logging.INFO
-)
+        logging.getLogger().setLevel(logging_config.get(LOGGING_LEVEL_KEY, "INFO"))
+        for module_name, module_config in module_configs.items():
+            module_logger = logging.getLogger(module_name)
+            if LOGGING_LEVEL_KEY in module_config:
+                module_logger.setLevel(module_config[LOGGING_LEVEL_KEY])
+            if module_config.get(LOGGING_SAMPLE_RATE_KEY, 1) < 1:
+                module_logger.addFilter(SamplingFilter(module_config[LOGGING_SAMPLE_RATE_KEY]))
 
+        log_queue_handler = DeferredQueueHandler(queue.SimpleQueue())
+        logging.getLogger().addHandler(log_queue_handler)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=reset_listener_after_fork)
 
+def get_logger(name:str)->logging.Logger:
+    """
+    Returns the logger of the module. Debug calls on hot paths pass their arguments
+    lazily, logger.debug("... %s", value), so nothing is formatted when debug is off.
+    """
+    configure_logging()
+    return logging.getLogger(name)
@@ -0,0 +1,123 @@
+import os, sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+from concrete_src.exception import ConcreteException
+from concrete_src.logger import get_logger
+from concrete_src.constant import *
+from concrete_src.entity.artifact_entity import BatchScoringArtifact
+from concrete_src.entity.concrete_predictor import ConcretePredictor
+from concrete_src.util.util import iter_data_frame_chunks
+from concrete_src.entity.stage_profiler import get_peak_rss_mb, get_child_peak_rss_mb
+
+logger = get_logger(__name__)
+
+# predictor of a scoring worker process, loaded once by init_scoring_worker
+scoring_predictor = None
+
+def init_scoring_worker(model_dir:str, schema_file_path:str):
+    global scoring_predictor
+    scoring_predictor = ConcretePredictor(model_dir=model_dir, schema_file_path=schema_file_path)
+
+def score_chunk(chunk:pd.DataFrame)->pd.DataFrame:
+    """
+    Returns the chunk with the predicted strength appended as the target column.
+    """
+    chunk = chunk.copy()
+    chunk[scoring_predictor.target_column] = scoring_predictor.predict(chunk)
+    return chunk
+
+class BatchScoring:
+
+    def __init__(self, model_dir:str, schema_file_path:str, chunk_size:int=50000, max_workers:int=None) -> None:
+        """
+        Scores a large file of mix designs in chunks of chunk_size rows.
+        model_dir: Directory holding the timestamped model export folders
+        schema_file_path: Path of schema file
+        max_workers: no. of scoring processes, chunks are scored in this process when 0
+        """
+        try:
+            self.model_dir = model_dir
+            self.schema_file_path = schema_file_path
+            self.chunk_size = chunk_size
+            self.max_workers = os.cpu_count() if max_workers is None else max_workers
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def write_chunk(self, scored_chunk:pd.DataFrame, output_file_path:str, is_first_chunk:bool, parquet_writer=None):
+        """
+        Appends a scored chunk to the output file. csv is appended as text,
+        parquet through a single writer that adds a row group per chunk.
+        Returns the parquet writer to use for the next chunk.
+        """
+        try:
+            if output_file_path.endswith(ARTIFACT_FORMAT_EXTENSIONS["parquet"]):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(scored_chunk, preserve_index=False)
+                if parquet_writer is None:
+                    parquet_writer = pq.ParquetWriter(output_file_path, table.schema)
+                parquet_writer.write_table(table)
+                return parquet_writer
+            scored_chunk.to_csv(output_file_path, index=False, header=is_first_chunk, mode="w" if is_first_chunk else "a")
+            return None
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def iter_scored_chunks(self, input_file_path:str):
+        """
+        Yields the scored chunks in input order.
+        At most two chunks per worker are in flight, so memory does not grow with the file.
+        """
+        try:
+            chunks = iter_data_frame_chunks(input_file_path, self.chunk_size)
+            if self.max_workers == 0:
+                init_scoring_worker(self.model_dir, self.schema_file_path)
+                for chunk in chunks:
+                    yield score_chunk(chunk)
+                return
+            with ProcessPoolExecutor(max_workers=self.max_workers, initializer=init_scoring_worker,
+                                     initargs=(self.model_dir, self.schema_file_path)) as executor:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(executor.submit(score_chunk, chunk))
+                    if len(pending) >= 2 * self.max_workers:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def score(self, input_file_path:str, output_file_path:str)->BatchScoringArtifact:
+        """
+        Streams the input file through the cluster models and writes the predictions to the output file.
+        input_file_path: csv, parquet, feather or npy file with the schema input columns
+        output_file_path: csv or parquet file
+        """
+        try:
+            logger.info(f"Scoring [{input_file_path}] into [{output_file_path}] in chunks of {self.chunk_size} rows "
+                        f"with {self.max_workers} workers")
+            os.makedirs(os.path.dirname(os.path.abspath(output_file_path)), exist_ok=True)
+            start_time = time.perf_counter()
+            rows, parquet_writer = 0, None
+            try:
+                for scored_chunk in self.iter_scored_chunks(input_file_path):
+                    parquet_writer = self.write_chunk(scored_chunk, output_file_path, rows == 0, parquet_writer)
+                    rows += len(scored_chunk)
+                    logger.debug("Scored %s rows", rows)
+            finally:
+                if parquet_writer is not None:
+                    parquet_writer.close()
+            elapsed_seconds = time.perf_counter() - start_time
+            batch_scoring_artifact = BatchScoringArtifact(
+                output_file_path=output_file_path,
+                rows=rows,
+                elapsed_seconds=elapsed_seconds,
+                rows_per_second=rows / elapsed_seconds if elapsed_seconds > 0 else 0.0,
+                peak_memory_mb={"main": get_peak_rss_mb(), "worker": get_child_peak_rss_mb()})
+            logger.info(f"BatchScoringArtifact: {batch_scoring_artifact}")
+            return batch_scoring_artifact
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
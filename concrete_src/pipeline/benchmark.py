@@ -0,0 +1,275 @@
+import os, sys
+import json
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+from typing import List
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.impute import KNNImputer
+from sklearn.preprocessing import StandardScaler
+
+from concrete_src.exception import ConcreteException
+from concrete_src.logger import get_logger
+from concrete_src.constant import *
+from concrete_src.component.data_transformation import OutlierImputer, ClusterGenerator
+from concrete_src.entity.concrete_predictor import ConcretePredictor
+from concrete_src.entity.stage_profiler import profile
+from concrete_src.util.model_factory import ModelFactory
+from concrete_src.util.util import read_yaml_file, get_code_version
+
+logger = get_logger(__name__)
+
+def make_synthetic_data(base_df:pd.DataFrame, rows:int, seed:int=42)->pd.DataFrame:
+    """
+    Resamples the rows of the base dataset and adds gaussian noise of 5% of the standard deviation
+    of each column, so that the distribution, the outliers and the clusters of the real data
+    are kept at any size. Values stay non negative like the mix quantities.
+    """
+    rng = np.random.default_rng(seed)
+    base = base_df.to_numpy(dtype=float)
+    data = base[rng.integers(0, len(base), size=rows)]
+    # column by column, a noise matrix of the full size would double the memory
+    for column_index, column_std in enumerate(base.std(axis=0)):
+        data[:, column_index] += rng.normal(0, 0.05 * column_std, size=rows)
+    np.maximum(data, 0, out=data)
+    return pd.DataFrame(data, columns=base_df.columns)
+
+# run by a fresh interpreter, prints the import time of the module, the training only modules it loaded
+# and the files it created in the working directory
+IMPORT_TIME_SCRIPT = """
+import json, os, sys, time
+start_time = time.perf_counter()
+import {module}
+import_seconds = time.perf_counter() - start_time
+print(json.dumps({{"import_seconds": import_seconds,
+                  "loaded_modules": [name for name in {modules} if name in sys.modules],
+                  "created_files": sorted(os.listdir("."))}}))
+"""
+
+def get_latency_summary(latencies:List[float])->dict:
+    latencies = np.asarray(latencies, dtype=float)
+    return {"p50": float(np.percentile(latencies, 50)), "p90": float(np.percentile(latencies, 90)),
+            "p99": float(np.percentile(latencies, 99)), "mean": float(latencies.mean()),
+            "min": float(latencies.min()), "max": float(latencies.max())}
+
+class Benchmark:
+
+    def __init__(self, base_data_file_path:str, schema_file_path:str, model_config_file_path:str, model_dir:str,
+                 sizes:List[int], repeats:int=3, max_cluster_rows:int=1000000, max_search_rows:int=100000,
+                 single_row_calls:int=1000, min_clusters:int=1, max_clusters:int=10,
+                 cluster_algorithm:str="KMeans", cluster_n_jobs:int=-1,
+                 import_budget_seconds:float=SERVING_IMPORT_TIME_BUDGET_SECONDS) -> None:
+        """
+        Times the preprocessing steps, the clustering, the model searches and the prediction
+        on synthetic data of each size derived from the base dataset.
+        model_dir: Directory holding the timestamped model export folders, for the prediction benchmarks
+        max_cluster_rows, max_search_rows: larger sizes are skipped for the clustering and the model searches
+        single_row_calls: no. of one row predictions timed for the single row latency
+        import_budget_seconds: cold import time allowed for the serving path
+        """
+        try:
+            dataset_schema = read_yaml_file(schema_file_path)
+            self.target_column = dataset_schema[SCHEMA_FILE_TARGET_COLUMNS]
+            base_df = pd.read_csv(base_data_file_path)
+            base_df.columns = [column.strip() for column in base_df.columns]
+            self.base_df = base_df
+            self.input_columns = [column for column in base_df.columns if column != self.target_column]
+            self.schema_file_path = schema_file_path
+            self.model_config_file_path = model_config_file_path
+            self.model_dir = model_dir
+            self.sizes = sizes
+            self.repeats = repeats
+            self.max_cluster_rows = max_cluster_rows
+            self.max_search_rows = max_search_rows
+            self.single_row_calls = single_row_calls
+            self.min_clusters = min_clusters
+            self.max_clusters = max_clusters
+            self.cluster_algorithm = cluster_algorithm
+            self.cluster_n_jobs = cluster_n_jobs
+            self.import_budget_seconds = import_budget_seconds
+            self.results = []
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def run_timed(self, benchmark_name:str, rows:int, function, repeats:int=None, **details)->dict:
+        """
+        Calls function repeats times and records the latency percentiles, the throughput
+        at the median latency and the peak memory of the calls.
+        """
+        try:
+            repeats = self.repeats if repeats is None else repeats
+            records = []
+            for _ in range(repeats):
+                with profile(benchmark_name, rows=rows, reset_peak=True) as record:
+                    function()
+                records.append(record)
+            latency = get_latency_summary([record["wall_seconds"] for record in records])
+            result = {"benchmark": benchmark_name, **details, "rows": rows, "repeats": repeats,
+                      "latency_seconds": latency,
+                      "rows_per_second": rows / latency["p50"] if latency["p50"] > 0 else None,
+                      "cpu_seconds": float(np.median([record["cpu_seconds"] for record in records])),
+                      "peak_rss_mb": max((record["peak_rss_mb"] or 0) for record in records) or None}
+            logger.info(f"Benchmark {benchmark_name} {details} at {rows} rows: {latency['p50']:.4f}s p50, "
+                        f"{result['rows_per_second']} rows/s")
+            self.results.append(result)
+            return result
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def add_skipped(self, benchmark_name:str, rows:int, reason:str, **details):
+        logger.info(f"Benchmark {benchmark_name} {details} at {rows} rows skipped: {reason}")
+        self.results.append({"benchmark": benchmark_name, **details, "rows": rows, "skipped": reason})
+
+    def benchmark_serving_import(self, module_name:str=SERVING_IMPORT_MODULE)->dict:
+        """
+        Cold import time of the serving path, each repeat in a new interpreter started in an empty directory.
+        The import must stay within the import budget, load none of the training only modules and create no files.
+        """
+        try:
+            budget_seconds = self.import_budget_seconds
+            package_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [package_root,
+                                                                             os.environ.get("PYTHONPATH")]))}
+            script = IMPORT_TIME_SCRIPT.format(module=module_name, modules=TRAINING_ONLY_MODULES)
+            import_reports = []
+            for _ in range(self.repeats):
+                with tempfile.TemporaryDirectory() as working_dir:
+                    output = subprocess.run([sys.executable, "-c", script], cwd=working_dir, env=env,
+                                            capture_output=True, text=True, check=True).stdout
+                import_reports.append(json.loads(output.strip().splitlines()[-1]))
+            latency = get_latency_summary([import_report["import_seconds"] for import_report in import_reports])
+            loaded_modules = sorted({name for import_report in import_reports
+                                     for name in import_report["loaded_modules"]})
+            created_files = sorted({name for import_report in import_reports
+                                    for name in import_report["created_files"]})
+            result = {"benchmark": "serving_import", "module": module_name, "rows": 0, "repeats": self.repeats,
+                      "latency_seconds": latency, "budget_seconds": budget_seconds,
+                      "loaded_training_modules": loaded_modules, "created_files": created_files,
+                      "within_budget": latency["p50"] <= budget_seconds and not loaded_modules
+                                       and not created_files}
+            log = logger.info if result["within_budget"] else logger.warning
+            log(f"Benchmark serving_import of {module_name}: {latency['p50']:.3f}s p50, budget {budget_seconds}s, "
+                f"training modules loaded {loaded_modules}, files created {created_files}")
+            self.results.append(result)
+            return result
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def benchmark_preprocessing(self, features:np.ndarray):
+        """
+        OutlierImputer.transform and the KNNImputer step, both fitted on the base dataset as in training.
+        """
+        try:
+            base_features = self.base_df[self.input_columns].to_numpy(dtype=float)
+            outlier_imputer = OutlierImputer().fit(base_features)
+            knn_imputer = KNNImputer(n_neighbors=3).fit(outlier_imputer.transform(base_features))
+            rows = len(features)
+            self.run_timed("outlier_imputer_transform", rows, lambda: outlier_imputer.transform(features))
+            features_with_nan = outlier_imputer.transform(features)
+            self.run_timed("knn_imputer_transform", rows, lambda: knn_imputer.transform(features_with_nan),
+                           missing_rows=int(np.isnan(features_with_nan).any(axis=1).sum()))
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def benchmark_clustering(self, scaled_features:np.ndarray):
+        """
+        ClusterGenerator fit, the elbow search, and transform, the centroid assignment.
+        """
+        try:
+            rows = len(scaled_features)
+            if rows > self.max_cluster_rows:
+                for benchmark_name in ["cluster_generator_fit", "cluster_generator_transform"]:
+                    self.add_skipped(benchmark_name, rows, f"above max cluster rows {self.max_cluster_rows}")
+                return
+            cluster_generator = ClusterGenerator(min_clusters=self.min_clusters, max_clusters=self.max_clusters,
+                                                 algorithm=self.cluster_algorithm, n_jobs=self.cluster_n_jobs)
+            # no cache dir, every repeat runs the full elbow search
+            self.run_timed("cluster_generator_fit", rows, lambda: cluster_generator.fit(scaled_features))
+            self.run_timed("cluster_generator_transform", rows, lambda: cluster_generator.transform(scaled_features),
+                           n_clusters=cluster_generator.number_of_clusters)
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def benchmark_model_search(self, scaled_features:np.ndarray, label:np.ndarray):
+        """
+        ModelFactory.get_best_model for each model family of model.yaml on its own, timed once per size.
+        """
+        try:
+            rows = len(scaled_features)
+            model_factory = ModelFactory(model_config_path=self.model_config_file_path)
+            supplied_models = model_factory.get_supplied_model_details()
+            for supplied_model in supplied_models:
+                if rows > self.max_search_rows:
+                    self.add_skipped("model_search", rows, f"above max search rows {self.max_search_rows}",
+                                     model=supplied_model.model_name)
+                    continue
+                model_factory.supplied_models_details = [supplied_model]
+                # every family is timed, whatever its score
+                self.run_timed("model_search", rows, repeats=1, model=supplied_model.model_name,
+                               function=lambda: model_factory.get_best_model(X=scaled_features, y=label,
+                                                                             base_accuracy=-np.inf))
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def benchmark_prediction(self, predictor:ConcretePredictor, input_df:pd.DataFrame):
+        try:
+            self.run_timed("batch_prediction", len(input_df), lambda: predictor.predict(input_df))
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def benchmark_single_row_prediction(self, predictor:ConcretePredictor):
+        """
+        Latency of one row requests, as served by the predict endpoint.
+        """
+        try:
+            records = make_synthetic_data(self.base_df, self.single_row_calls)[self.input_columns].to_dict("records")
+            latencies = []
+            for record in records:
+                with profile("single_row_prediction", rows=1) as call_profile:
+                    predictor.predict([record])
+                latencies.append(call_profile["wall_seconds"])
+            latency = get_latency_summary(latencies)
+            result = {"benchmark": "single_row_prediction", "rows": 1, "repeats": len(latencies),
+                      "latency_seconds": latency, "rows_per_second": len(latencies) / sum(latencies)}
+            logger.info(f"Benchmark single_row_prediction: {latency['p50'] * 1000:.3f}ms p50, "
+                        f"{latency['p99'] * 1000:.3f}ms p99")
+            self.results.append(result)
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def run(self)->dict:
+        """
+        Runs every benchmark at every size.
+        Returns:
+        the environment of the run and one result per benchmark and size
+        """
+        try:
+            self.benchmark_serving_import()
+            predictor = None
+            if os.path.isdir(self.model_dir):
+                predictor = ConcretePredictor(model_dir=self.model_dir, schema_file_path=self.schema_file_path)
+                self.benchmark_single_row_prediction(predictor)
+            else:
+                self.add_skipped("single_row_prediction", 1, f"no model found in [{self.model_dir}]")
+            for size in self.sizes:
+                logger.info(f"Benchmarking {size} rows")
+                synthetic_df = make_synthetic_data(self.base_df, size)
+                features = synthetic_df[self.input_columns].to_numpy(dtype=float)
+                self.benchmark_preprocessing(features)
+                scaled_features = StandardScaler().fit_transform(np.log1p(features))
+                self.benchmark_clustering(scaled_features)
+                self.benchmark_model_search(scaled_features, synthetic_df[self.target_column].to_numpy())
+                if predictor is not None:
+                    self.benchmark_prediction(predictor, synthetic_df[self.input_columns])
+                else:
+                    self.add_skipped("batch_prediction", size, f"no model found in [{self.model_dir}]")
+                del synthetic_df, features, scaled_features
+            return {"created_at": datetime.now().isoformat(), "code_version": get_code_version(),
+                    "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+                    "sklearn": sklearn.__version__, "machine": platform.machine(), "cpu_count": os.cpu_count(),
+                    "sizes": self.sizes, "repeats": self.repeats, "results": self.results}
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
@@ -0,0 +1,266 @@
+import os, sys
+import signal
+import subprocess
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List
+
+from concrete_src.exception import ConcreteException
+from concrete_src.logger import get_logger
+from concrete_src.constant import *
+from concrete_src.entity.config_entity import TrainingJobConfig
+from concrete_src.util.util import read_yaml_file, write_yaml_file
+
+logger = get_logger(__name__)
+
+try:
+    import fcntl
+except ImportError:
+    # no cross process lock on windows, a single serving worker is assumed there
+    fcntl = None
+
+class TrainingJobRunner:
+
+    def __init__(self, training_job_config:TrainingJobConfig) -> None:
+        """
+        Runs training pipelines in background processes, at most max_concurrent_jobs at a time.
+        Further jobs wait in a queue. The state of every job is kept in a yaml file of the job dir,
+        so any serving worker can submit, poll and cancel jobs started by another one.
+        """
+        try:
+            self.job_dir = training_job_config.job_dir
+            self.max_concurrent_jobs = training_job_config.max_concurrent_jobs
+            self.config_file_path = training_job_config.config_file_path
+            os.makedirs(self.job_dir, exist_ok=True)
+            # processes started by this process, polled so that finished ones are reaped
+            self.processes = dict()
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def get_job_file_path(self, job_id:str)->str:
+        return os.path.join(self.job_dir, f"{job_id}.yaml")
+
+    def get_job_log_file_path(self, job_id:str)->str:
+        return os.path.join(self.job_dir, f"{job_id}.log")
+
+    @contextmanager
+    def lock(self):
+        """
+        Serializes changes of the job states across serving workers and job processes.
+        """
+        with open(os.path.join(self.job_dir, TRAINING_JOB_LOCK_FILE_NAME), "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read_job(self, job_id:str)->dict:
+        """
+        Returns the state of the job, None if there is no such job.
+        """
+        try:
+            job_file_path = self.get_job_file_path(job_id)
+            if not os.path.exists(job_file_path):
+                return None
+            return read_yaml_file(job_file_path)
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def write_job(self, job:dict):
+        """
+        Replaces the state file of the job atomically, readers never see a partial file.
+        """
+        try:
+            job_file_path = self.get_job_file_path(job["job_id"])
+            write_yaml_file(file_path=f"{job_file_path}.tmp", data=job)
+            os.replace(f"{job_file_path}.tmp", job_file_path)
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def read_jobs(self)->List[dict]:
+        """
+        Returns the state of every job, oldest first.
+        """
+        try:
+            jobs = [self.read_job(file_name[:-len(".yaml")]) for file_name in os.listdir(self.job_dir)
+                    if file_name.endswith(".yaml")]
+            return sorted([job for job in jobs if job is not None], key=lambda job: job["submitted_at"])
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def list_jobs(self)->List[dict]:
+        try:
+            self.dispatch()
+            return self.read_jobs()
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def get_job(self, job_id:str)->dict:
+        try:
+            self.dispatch()
+            return self.read_job(job_id)
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def submit(self)->dict:
+        """
+        Queues a training run and starts it if a slot is free. Returns at once with the job state.
+        """
+        try:
+            job = {"job_id": str(uuid.uuid4()), "status": TRAINING_JOB_STATUS_QUEUED,
+                   "submitted_at": datetime.now().isoformat(), "started_at": None, "finished_at": None,
+                   "pid": None, "experiment_id": None, "message": None}
+            with self.lock():
+                self.write_job(job)
+                logger.info(f"Training job {job['job_id']} queued")
+                self.dispatch_jobs()
+            return self.read_job(job["job_id"])
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def cancel(self, job_id:str)->dict:
+        """
+        Cancels a queued job, or terminates the process group of a running one.
+        Finished jobs are left as they are. Returns the job state, None if there is no such job.
+        """
+        try:
+            with self.lock():
+                job = self.read_job(job_id)
+                if job is None:
+                    return None
+                if job["status"] == TRAINING_JOB_STATUS_RUNNING:
+                    self.terminate(job)
+                if job["status"] in (TRAINING_JOB_STATUS_QUEUED, TRAINING_JOB_STATUS_RUNNING):
+                    job.update(status=TRAINING_JOB_STATUS_CANCELLED, finished_at=datetime.now().isoformat(),
+                               message="Cancelled")
+                    self.write_job(job)
+                    logger.info(f"Training job {job_id} cancelled")
+                self.dispatch_jobs()
+            return self.read_job(job_id)
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def terminate(self, job:dict):
+        try:
+            # jobs run in their own session, killing the group also stops their training workers
+            if hasattr(os, "killpg"):
+                os.killpg(job["pid"], signal.SIGTERM)
+            else:
+                os.kill(job["pid"], signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        process = self.processes.pop(job["job_id"], None)
+        if process is not None:
+            process.wait()
+
+    def is_process_alive(self, job:dict)->bool:
+        if job["job_id"] in self.processes:
+            if self.processes[job["job_id"]].poll() is None:
+                return True
+            del self.processes[job["job_id"]]
+            return False
+        try:
+            os.kill(job["pid"], 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+
+    def dispatch(self):
+        try:
+            with self.lock():
+                self.dispatch_jobs()
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def dispatch_jobs(self):
+        """
+        Marks running jobs whose process died as failed, then starts the oldest queued jobs
+        while fewer than max_concurrent_jobs are running. Called with the lock held.
+        """
+        try:
+            for job_id, process in list(self.processes.items()):
+                if process.poll() is not None:
+                    del self.processes[job_id]
+            jobs = self.read_jobs()
+            running_jobs = 0
+            for job in jobs:
+                if job["status"] != TRAINING_JOB_STATUS_RUNNING:
+                    continue
+                if self.is_process_alive(job):
+                    running_jobs += 1
+                    continue
+                job.update(status=TRAINING_JOB_STATUS_FAILED, finished_at=datetime.now().isoformat(),
+                           message=f"Training process exited unexpectedly, see [{self.get_job_log_file_path(job['job_id'])}]")
+                self.write_job(job)
+                logger.info(f"Training job {job['job_id']} failed: process {job['pid']} not running")
+            for job in jobs:
+                if running_jobs >= self.max_concurrent_jobs:
+                    break
+                if job["status"] == TRAINING_JOB_STATUS_QUEUED:
+                    self.start_job(job)
+                    running_jobs += 1
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def start_job(self, job:dict):
+        """
+        Starts the job in a new python process, so training neither blocks nor shares memory with the caller.
+        """
+        try:
+            with open(self.get_job_log_file_path(job["job_id"]), "a") as log_file:
+                process = subprocess.Popen(
+                    [sys.executable, "-m", "concrete_src.pipeline.job_runner", job["job_id"], self.config_file_path],
+                    cwd=ROOT_DIR, stdin=subprocess.DEVNULL, stdout=log_file, stderr=subprocess.STDOUT,
+                    start_new_session=True)
+            self.processes[job["job_id"]] = process
+            job.update(status=TRAINING_JOB_STATUS_RUNNING, started_at=datetime.now().isoformat(), pid=process.pid)
+            self.write_job(job)
+            logger.info(f"Training job {job['job_id']} started in process {process.pid}")
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def finish_job(self, job_id:str, status:str, message:str, experiment_id:str=None):
+        """
+        Records the outcome of a job from its own process and starts the next queued job.
+        A job cancelled in the meantime keeps its cancelled state.
+        """
+        try:
+            with self.lock():
+                job = self.read_job(job_id)
+                if job["status"] == TRAINING_JOB_STATUS_RUNNING:
+                    job.update(status=status, finished_at=datetime.now().isoformat(), message=message,
+                               experiment_id=experiment_id)
+                    self.write_job(job)
+                    logger.info(f"Training job {job_id} {status}: {message}")
+                self.dispatch_jobs()
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+def run_job(job_id:str, config_file_path:str):
+    """
+    Entry point of a job process. Runs the training pipeline with its own timestamp
+    and records the outcome in the job state.
+    """
+    from concrete_src.config.configuartion import Configuration
+    from concrete_src.pipeline.pipeline import Pipeline
+
+    config = Configuration(config_file_path=config_file_path, current_time_stamp=get_current_time_stamp())
+    job_runner = TrainingJobRunner(config.get_training_job_config())
+    try:
+        pipeline = Pipeline(config)
+        pipeline.run_pipeline()
+        experiment = pipeline.experiment.current_experiment
+        job_runner.finish_job(job_id, TRAINING_JOB_STATUS_SUCCEEDED, experiment.message, experiment.experiment_id)
+    except Exception as e:
+        logger.error(f"Training job {job_id} failed: {e}")
+        job_runner.finish_job(job_id, TRAINING_JOB_STATUS_FAILED, str(e))
+        raise
+
+if __name__ == "__main__":
+    run_job(job_id=sys.argv[1], config_file_path=sys.argv[2])
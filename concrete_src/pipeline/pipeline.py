@@ -4,15 +4,15 @@ from threading import Thread
 
 from concrete_src.config.configuartion import Configuration
 from concrete_src.exception import ConcreteException
-from concrete_src.logger import logging
+from concrete_src.logger import get_logger
 from concrete_src.entity.artifact_entity import *
-from concrete_src.component.data_ingestion import DataIngestion
-from concrete_src.component.data_validation import DataValidation
-from concrete_src.component.data_transformation import DataTransformation
-from concrete_src.component.model_trainer import ModelTrainer
-from concrete_src.component.model_evaluation import ModelEvaluation
-from concrete_src.component.model_pusher import ModelPusher
 from concrete_src.entity.experiment import ExperimentDetails, Experiment
+from concrete_src.entity.stage_cache import StageCache
+from concrete_src.entity.stage_profiler import StageProfiler
+from concrete_src.constant import *
+from concrete_src.util.util import get_file_hash, get_code_version, get_row_count
+
+logger = get_logger(__name__)
 
 
 class Pipeline(Thread):
@@ -21,62 +21,128 @@ class Pipeline(Thread):
         try:            
             self.config = config
             self.experiment = Experiment(config.training_pipeline_config.artifact_dir, config.time_stamp)            
+            self.stage_cache = StageCache(config.training_pipeline_config.artifact_dir)
+            self.stage_profiler = StageProfiler()
             super().__init__(daemon=False, name="pipeline")
         except Exception as e:
             raise ConcreteException(e, sys) from e
 
+    def run(self):
+        """
+        Runs the pipeline when started as a thread with start().
+        """
+        self.run_pipeline()
+
     def run_pipeline(self):
         try:
             if self.experiment.current_experiment!=None and self.experiment.current_experiment.running_status:
                 msg:str = "Pipeline already running"
-                logging.info(msg)
+                logger.info(msg)
                 return self.experiment
 
-            logging.info(f"{'*'*20}Pipeline starting{'*'*20}\n")
+            logger.info(f"{'*'*20}Pipeline starting{'*'*20}\n")
             self.experiment.start_experiment("Pipeline has been started.")
-            logging.info(f"Pipeline experiment: {self.experiment.current_experiment}")
+            logger.info(f"Pipeline experiment: {self.experiment.current_experiment}")
 
             self.experiment.save_experiment()
 
+            # stages are keyed by a hash of their inputs, chained so that a change
+            # invalidates every stage after the first stage whose inputs changed
+            code_version = get_code_version()
+            cache_hits = []
             data_ingestion_artifact = self.start_data_ingestion()
-            data_validation_artifact = self.start_data_validation(data_ingestion_artifact)
-            data_transformation_artifact = self.start_data_transformation(
-                data_ingestion_artifact=data_ingestion_artifact,
-                data_validation_artifact=data_validation_artifact
-            )
-            model_trainer_artifact = self.start_model_trainer(data_transformation_artifact=data_transformation_artifact)
+            data_validation_artifact, data_validation_key = self.run_cached_stage(
+                stage_name="data_validation", artifact_class=DataValidationArtifact, cache_hits=cache_hits,
+                stage_inputs=[get_file_hash(data_ingestion_artifact.train_file_path),
+                              get_file_hash(self.config.get_data_validation_config().schema_file_path),
+                              code_version],
+                run_stage=lambda: self.start_data_validation(data_ingestion_artifact))
+            data_transformation_artifact, data_transformation_key = self.run_cached_stage(
+                stage_name="data_transformation", artifact_class=DataTransformationArtifact, cache_hits=cache_hits,
+                stage_inputs=[data_validation_key, self.config.config_info[DATA_TRANSFORMATION_CONFIG_KEY],
+                              self.config.config_info.get(INCREMENTAL_TRAINING_CONFIG_KEY)],
+                run_stage=lambda: self.start_data_transformation(
+                    data_ingestion_artifact=data_ingestion_artifact,
+                    data_validation_artifact=data_validation_artifact
+                ))
+            model_trainer_artifact, _ = self.run_cached_stage(
+                stage_name="model_trainer", artifact_class=ModelTrainerArtifact, cache_hits=cache_hits,
+                stage_inputs=[data_transformation_key, self.config.config_info[MODEL_TRAINER_CONFIG_INFO],
+                              get_file_hash(self.config.get_model_train_config().model_config_file_path),
+                              self.config.config_info.get(INCREMENTAL_TRAINING_CONFIG_KEY)],
+                run_stage=lambda: self.start_model_trainer(data_transformation_artifact=data_transformation_artifact))
+            logger.info(f"Stage cache hits: {cache_hits}")
             model_evaluation_artifact = self.start_model_evaluation(data_ingestion_artifact=data_ingestion_artifact,
                                                                     data_validation_artifact=data_validation_artifact,
                                                                     model_trainer_artifact=model_trainer_artifact)
             if True in model_evaluation_artifact.is_models_accepted:
                 model_pusher_artifact = self.start_model_pusher(model_eval_artifact=model_evaluation_artifact)
-                logging.info(f'Model pusher artifact: {model_pusher_artifact}')
+                logger.info(f'Model pusher artifact: {model_pusher_artifact}')
             else:
-                logging.info("Trained models rejected. Models not pushed")
-            logging.info("Pipeline completed.")
+                logger.info("Trained models rejected. Models not pushed")
+            logger.info("Pipeline completed.")
 
-            msg = "Pipeline has been completed."
+            msg = f"Pipeline has been completed. Cached stages: {cache_hits}"
 
+            profile_file_path = self.experiment.get_profile_file_path()
+            self.stage_profiler.save(profile_file_path,
+                                     experiment_id=self.experiment.current_experiment.experiment_id,
+                                     artifact_time_stamp=self.config.time_stamp)
             self.experiment.stop_experiment(msg = msg, is_model_accepted = model_evaluation_artifact.is_models_accepted,
-             model_accuracy = model_trainer_artifact.model_accuracy)
-            logging.info(f"Pipeline experiment: {self.experiment.current_experiment}")
+             model_accuracy = model_trainer_artifact.model_accuracy,
+             stage_profile = self.stage_profiler.get_summary(), profile_file_path = profile_file_path)
+            logger.info(f"Pipeline experiment: {self.experiment.current_experiment}")
             self.experiment.save_experiment()
         except Exception as e:
                 raise ConcreteException(e, sys) from e
 
+    def run_cached_stage(self, stage_name: str, artifact_class, stage_inputs: list, run_stage, cache_hits: list):
+        """
+        Reuses the artifact of a previous run when the stage inputs are unchanged, else runs the stage.
+        stage_inputs: hashes and configuration the stage output depends on
+        run_stage: function running the stage
+        cache_hits: names of the reused stages are appended to it
+        Returns:
+        stage artifact and stage key
+        """
+        try:
+            key = StageCache.get_key(stage_name, *stage_inputs)
+            artifact = self.stage_cache.get_artifact(stage_name, key, artifact_class)
+            if artifact is not None:
+                logger.info(f"Stage {stage_name}: cache hit [{key}], reusing {artifact}")
+                cache_hits.append(stage_name)
+                self.stage_profiler.add_cached_stage(stage_name)
+                return artifact, key
+            logger.info(f"Stage {stage_name}: cache miss [{key}]")
+            artifact = run_stage()
+            self.stage_cache.save_artifact(stage_name, key, artifact)
+            return artifact, key
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    # each stage imports its component when it runs, so importing the pipeline
+    # does not load the training libraries of every stage
     def start_data_ingestion(self) -> DataIngestionArtifact:
         try:
-            data_ingestion = DataIngestion(data_ingestion_config=self.config.get_data_ingestion_config())
-            return data_ingestion.initiate_data_ingestion()
+            from concrete_src.component.data_ingestion import DataIngestion
+            with self.stage_profiler.profile_stage("data_ingestion") as stage_profile:
+                data_ingestion = DataIngestion(data_ingestion_config=self.config.get_data_ingestion_config())
+                data_ingestion_artifact = data_ingestion.initiate_data_ingestion()
+            stage_profile["rows"] = get_row_count(data_ingestion_artifact.train_file_path)
+            return data_ingestion_artifact
         except Exception as e:
             raise ConcreteException(e, sys) from e
 
     def start_data_validation(self, data_ingestion_artifact: DataIngestionArtifact)-> DataValidationArtifact:
         try:
-            data_validation = DataValidation(data_validation_config=self.config.get_data_validation_config(),
-                                             data_ingestion_artifact=data_ingestion_artifact
-                                             )
-            return data_validation.initiate_data_validation()
+            from concrete_src.component.data_validation import DataValidation
+            with self.stage_profiler.profile_stage("data_validation") as stage_profile:
+                data_validation = DataValidation(data_validation_config=self.config.get_data_validation_config(),
+                                                 data_ingestion_artifact=data_ingestion_artifact
+                                                 )
+                data_validation_artifact = data_validation.initiate_data_validation()
+            stage_profile["rows"] = get_row_count(data_ingestion_artifact.train_file_path)
+            return data_validation_artifact
         except Exception as e:
             raise ConcreteException(e, sys) from e
 
@@ -85,21 +151,32 @@ class Pipeline(Thread):
                                   data_validation_artifact: DataValidationArtifact
                                   ) -> DataTransformationArtifact:
         try:
-            data_transformation = DataTransformation(
-                data_transformation_config=self.config.get_data_transformation_config(),
-                data_ingestion_artifact=data_ingestion_artifact,
-                data_validation_artifact=data_validation_artifact
-            )            
-            return data_transformation.initiate_data_transformation()
+            from concrete_src.component.data_transformation import DataTransformation
+            with self.stage_profiler.profile_stage("data_transformation") as stage_profile:
+                data_transformation = DataTransformation(
+                    data_transformation_config=self.config.get_data_transformation_config(),
+                    data_ingestion_artifact=data_ingestion_artifact,
+                    data_validation_artifact=data_validation_artifact,
+                    incremental_training_config=self.config.get_incremental_training_config()
+                )
+                data_transformation_artifact = data_transformation.initiate_data_transformation()
+            stage_profile["rows"] = get_row_count(data_ingestion_artifact.train_file_path)
+            return data_transformation_artifact
         except Exception as e:
             raise ConcreteException(e, sys)
 
     def start_model_trainer(self, data_transformation_artifact: DataTransformationArtifact) -> ModelTrainerArtifact:
         try:
-            model_trainer = ModelTrainer(model_trainer_config=self.config.get_model_train_config(),
-                                         data_transformation_artifact=data_transformation_artifact
-                                         )
-            return model_trainer.initiate_model_trainer()
+            from concrete_src.component.model_trainer import ModelTrainer
+            with self.stage_profiler.profile_stage("model_trainer") as stage_profile:
+                model_trainer = ModelTrainer(model_trainer_config=self.config.get_model_train_config(),
+                                             data_transformation_artifact=data_transformation_artifact,
+                                             incremental_training_config=self.config.get_incremental_training_config()
+                                             )
+                model_trainer_artifact = model_trainer.initiate_model_trainer()
+            stage_profile["rows"] = get_row_count(data_transformation_artifact.transformed_train_file_path)
+            self.stage_profiler.add_search_profiles(model_trainer.search_profiles)
+            return model_trainer_artifact
         except Exception as e:
             raise ConcreteException(e, sys) from e
 
@@ -107,22 +184,29 @@ class Pipeline(Thread):
                                data_validation_artifact: DataValidationArtifact,
                                model_trainer_artifact: ModelTrainerArtifact) -> ModelEvaluationArtifact:
         try:
-            model_eval = ModelEvaluation(
-                model_evaluation_config=self.config.get_model_evaluation_config(),
-                data_ingestion_artifact=data_ingestion_artifact,
-                data_validation_artifact=data_validation_artifact,
-                model_trainer_artifact=model_trainer_artifact)
-            return model_eval.initiate_model_evaluation()
+            from concrete_src.component.model_evaluation import ModelEvaluation
+            with self.stage_profiler.profile_stage("model_evaluation") as stage_profile:
+                model_eval = ModelEvaluation(
+                    model_evaluation_config=self.config.get_model_evaluation_config(),
+                    data_ingestion_artifact=data_ingestion_artifact,
+                    data_validation_artifact=data_validation_artifact,
+                    model_trainer_artifact=model_trainer_artifact)
+                model_evaluation_artifact = model_eval.initiate_model_evaluation()
+            stage_profile["rows"] = get_row_count(data_ingestion_artifact.train_file_path)
+            return model_evaluation_artifact
         except Exception as e:
             raise ConcreteException(e, sys) from e
 
     def start_model_pusher(self, model_eval_artifact: ModelEvaluationArtifact) -> ModelPusherArtifact:
         try:
-            model_pusher = ModelPusher(
-                model_pusher_config=self.config.get_model_pusher_config(),
-                model_evaluation_artifact=model_eval_artifact
-            )
-            return model_pusher.initiate_model_pusher()
+            from concrete_src.component.model_pusher import ModelPusher
+            # nothing row based, no. of rows is left empty
+            with self.stage_profiler.profile_stage("model_pusher"):
+                model_pusher = ModelPusher(
+                    model_pusher_config=self.config.get_model_pusher_config(),
+                    model_evaluation_artifact=model_eval_artifact
+                )
+                return model_pusher.initiate_model_pusher()
         except Exception as e:
             raise ConcreteException(e, sys) from e
 
@@ -131,4 +215,4 @@ class Pipeline(Thread):
         """
         Acts as destructor. Called before all references to the class object are deleted.
         """
-        logging.info(f"{'*' *25} Pipeline log completed {'*' *25}\n")
+        logger.info(f"{'*' *25} Pipeline log completed {'*' *25}\n")
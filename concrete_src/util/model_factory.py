@@ -1,20 +1,57 @@
 import yaml, os, sys
+import copy
+import time
+import inspect
+import importlib
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from pyexpat import model
-from cmath import log
 from typing import List, Tuple
 import pandas as pd
 
 from sklearn.metrics import r2_score,mean_squared_error
-from sklearn.model_selection import cross_val_score
+from sklearn.base import clone
+from sklearn.model_selection import cross_val_score, cross_val_predict, ParameterGrid
 
 from concrete_src.exception import ConcreteException
-from concrete_src.logger import logging
-from concrete_src.util.util import read_yaml_file
+from concrete_src.logger import get_logger
+from concrete_src.util.util import read_yaml_file, create_list
 from concrete_src.constant import *
 from concrete_src.entity.model_entity import *
 from concrete_src.util.model_factory_util import *
+from concrete_src.entity.stage_profiler import profile
 
+logger = get_logger(__name__)
+
+
+# search strategies that can be selected with grid_search.strategy in model.yaml
+SEARCH_STRATEGIES = {
+    "grid": ("sklearn.model_selection", "GridSearchCV"),
+    "randomized": ("sklearn.model_selection", "RandomizedSearchCV"),
+    "halving_grid": ("sklearn.model_selection", "HalvingGridSearchCV"),
+    "halving_random": ("sklearn.model_selection", "HalvingRandomSearchCV"),
+    "bayesian": ("skopt", "BayesSearchCV"),
+}
+
+# constructor argument taking the search space, in order of preference
+SEARCH_SPACE_ARGUMENTS = ["param_grid", "param_distributions", "search_spaces"]
+
+# metrics scored on every fold of a search, models are ranked and refit on r2
+SEARCH_SCORING = {"r2": "r2", "rmse": "neg_root_mean_squared_error"}
+
+def get_best_cv_results(cv_results:dict, best_index:int)->dict:
+    """
+    Cross validation results of the best candidate of a search as mean and std of r2 and rmse
+    on the test and train folds. Searches scored on r2 only (successive halving does not take
+    several metrics) have no rmse, it is nan.
+    """
+    best_cv_results = {key: values[best_index] for key, values in cv_results.items() if not key.startswith("param")}
+    for fold in ["test", "train"]:
+        for statistic in ["mean", "std"]:
+            if f"{statistic}_{fold}_score" in best_cv_results:
+                best_cv_results[f"{statistic}_{fold}_r2"] = best_cv_results.pop(f"{statistic}_{fold}_score")
+            # scored as negative rmse so that greater is better
+            best_cv_results[f"{statistic}_{fold}_rmse"] = abs(float(best_cv_results.get(f"{statistic}_{fold}_rmse", np.nan)))
+    return best_cv_results
 
 def evaluate_regression_model(model_list: list, X_train, y_train, flag: int, base_accuracy:float=0.25) -> MetricInfoArtifact:
     """
@@ -22,16 +59,21 @@ def evaluate_regression_model(model_list: list, X_train, y_train, flag: int, bas
     This function compare multiple regression models and return the best model
 
     Params:
-    model_list: List of model
+    model_list: List of model, GridSearchedBestModel list when flag is 2
     X_train: Training dataset input feature
     y_train: Training dataset target feature
     flag: 1 if called from model_evaluation, 2 if called from model_trainer
 
+    With flag 2 every metric is read from the cross validation results of the search:
+    model accuracy is the mean test r2, train accuracy and train rmse the mean r2 and rmse
+    of the folds on their training rows, so that no estimator is fitted again or predicts
+    again on the data it was searched on.
+
     return
     It returns a named tuple    
     MetricInfoArtifact = namedtuple("MetricInfo",
                                 ["model_name", "model_object", "train_rmse", "train_accuracy",
-                                 "model_accuracy", "index_number"])
+                                 "model_accuracy", "index_number", "model_rmse", "fold_predictions"])
 
     """
     try:
@@ -45,33 +87,44 @@ def evaluate_regression_model(model_list: list, X_train, y_train, flag: int, bas
                 model_obj = model.trained_model_object
                 #Getting prediction for training dataset
                 y_train_pred, cluster_index = model.predict(X_train)
-                y_train = y_train.iloc[cluster_index]
-                X_train = X_train.iloc[cluster_index]
+                # every model is scored on its own cluster rows of the full dataset
+                model_X = X_train.iloc[cluster_index]
+                model_y = y_train.iloc[cluster_index]
                 
             else:
-                model_name = type(model).__name__ 
-                y_train_pred = model.predict(X_train)
-                model_obj = model
+                model_name = type(model.best_model).__name__ 
+                model_obj = model.best_model
 
-            logging.info(f"{'.'*10}Evaluating model: [{model_name}] {'.'*10}")
-            #Calculating r squared score on training testing dataset
-            train_acc = r2_score(y_train, y_train_pred)
-            
-            #Calculating mean squared error on training testing dataset
-            train_rmse = np.sqrt(mean_squared_error(y_train, y_train_pred))
+            logger.info(f"{'.'*10}Evaluating model: [{model_name}] {'.'*10}")
+            if flag == 1:
+                #Calculating r squared score on training testing dataset
+                train_acc = r2_score(model_y, y_train_pred)
+
+                #Calculating mean squared error on training testing dataset
+                train_rmse = np.sqrt(mean_squared_error(model_y, y_train_pred))
+            else:
+                # mean r2 and rmse of the search folds on their training rows
+                train_acc = float(model.cv_results["mean_train_r2"])
+                train_rmse = float(model.cv_results["mean_train_rmse"])
 
             # Model accuracy using kfold cv
-            scores = cross_val_score(model_obj, X_train, y_train, cv = 3, n_jobs = 2, scoring = 'r2')
-            model_accuracy:float = scores.mean()
+            if flag == 1:
+                scores = cross_val_score(model_obj, model_X, model_y, cv = 3, n_jobs = 2, scoring = 'r2')
+                model_accuracy:float = scores.mean()
+                model_rmse = np.nan
+            else:
+                model_accuracy:float = model.best_score
+                model_rmse = float(model.cv_results["mean_test_rmse"])
+                logger.debug("CV results of best candidate: %s", model.cv_results)
             
             #logging all important metric
-            logging.debug(f"Train Score\t\t Average Score\t\t Loss(rmse)")
-            logging.debug(f"{train_acc}\t\t{model_accuracy}\t\t{train_rmse}")
+            logger.debug("Train Score\t\t Average Score\t\t Loss(rmse)\t\t Average Loss(rmse)")
+            logger.debug("%s\t\t%s\t\t%s\t\t%s", train_acc, model_accuracy, train_rmse, model_rmse)
 
 
 
             #if model accuracy is greater than base accuracy we will accept that model as accepted model
-            logging.debug(f"{model_accuracy} >= {base_accuracy} = {model_accuracy >= base_accuracy}")
+            logger.debug("%s >= %s = %s", model_accuracy, base_accuracy, model_accuracy >= base_accuracy)
             if model_accuracy >= base_accuracy:
                 base_accuracy = model_accuracy
                 metric_info_artifact = MetricInfoArtifact(model_name=model_name,
@@ -79,12 +132,13 @@ def evaluate_regression_model(model_list: list, X_train, y_train, flag: int, bas
                                                         train_rmse=train_rmse,
                                                         train_accuracy=train_acc,
                                                         model_accuracy=model_accuracy,
-                                                        index_number=index_number)
+                                                        index_number=index_number,
+                                                        model_rmse=model_rmse)
 
-                logging.info(f"Acceptable model : {metric_info_artifact}. ")
+                logger.info(f"Acceptable model : {metric_info_artifact}. ")
             index_number += 1
         if metric_info_artifact is None:
-            logging.info(f"No model found with higher accuracy than base accuracy")
+            logger.info(f"No model found with higher accuracy than base accuracy")
         return metric_info_artifact
     except Exception as e:
         raise ConcreteException(e, sys) from e
@@ -94,15 +148,85 @@ class ModelFactory:
         try:
             self.model_config: dict = read_yaml_file(model_config_path)
 
-            self.grid_search_class_name: str = self.model_config[MODEL_CONFIG_GRID_SEARCH_KEY][MODEL_CONFIG_CLASS_KEY]
-            self.grid_search_cv_module: str = self.model_config[MODEL_CONFIG_GRID_SEARCH_KEY][MODEL_CONFIG_MODULE_KEY]
-            self.grid_search_param_data: dict = dict(self.model_config[MODEL_CONFIG_GRID_SEARCH_KEY][MODEL_CONFIG_PARAM_KEY])
+            grid_search_config: dict = self.model_config[MODEL_CONFIG_GRID_SEARCH_KEY]
+            if MODEL_CONFIG_SEARCH_STRATEGY_KEY in grid_search_config:
+                # strategy is a shortcut for module and class
+                self.grid_search_cv_module, self.grid_search_class_name = SEARCH_STRATEGIES[grid_search_config[MODEL_CONFIG_SEARCH_STRATEGY_KEY]]
+            else:
+                self.grid_search_class_name: str = grid_search_config[MODEL_CONFIG_CLASS_KEY]
+                self.grid_search_cv_module: str = grid_search_config[MODEL_CONFIG_MODULE_KEY]
+            self.grid_search_param_data: dict = dict(grid_search_config[MODEL_CONFIG_PARAM_KEY])
+            self.search_budget: dict = dict(grid_search_config.get(MODEL_CONFIG_SEARCH_BUDGET_KEY) or {})
             self.supplied_models: dict = dict(self.model_config[MODEL_CONFIG_SUPPLIED_MODELS])
+            # no. of models searched concurrently
+            self.model_n_jobs: int = self.model_config[MODEL_CONFIG_GRID_SEARCH_KEY].get(MODEL_CONFIG_MODEL_N_JOBS_KEY, 1)
+            # no. of cores the searches may use together, lowered when clusters are trained in parallel
+            self.n_cores: int = os.cpu_count() or 1
             # all the accepted models(> base accuracy) with best configurations of parameters
             self.grid_searched_best_model_list = None
         except Exception as e:
             raise ConcreteException(e, sys) from e
 
+    def get_search_cv_class(self):
+        """
+        Loads the configured search class.
+        Successive halving searches are experimental in sklearn and have to be enabled first.
+        """
+        try:
+            if self.grid_search_class_name.startswith("Halving"):
+                importlib.import_module("sklearn.experimental.enable_halving_search_cv")
+            return class_for_name(module_name=self.grid_search_cv_module, class_name=self.grid_search_class_name)
+        except Exception as e:
+            raise ConcreteException(Exception(f"Search class {self.grid_search_cv_module}.{self.grid_search_class_name} "
+                                              f"not available: {e}"), sys) from e
+
+    def get_search_cv_object(self, supplied_model: ModelInitializationDetail):
+        """
+        Instantiates the search class for the supplied model and applies the search budget.
+        n_trials: no. of candidates sampled by randomized, halving random and bayesian searches
+        min_resources: no. of samples of the first successive halving iteration
+        max_time: wall clock cap in seconds, for searches that accept stopping callbacks in fit (bayesian)
+        Returns:
+        search object and the keyword arguments to pass to its fit
+        """
+        try:
+            grid_search_cv_ref = self.get_search_cv_class()
+            search_arguments = inspect.signature(grid_search_cv_ref.__init__).parameters
+            space_argument = next(argument for argument in SEARCH_SPACE_ARGUMENTS if argument in search_arguments)
+            grid_search_cv = grid_search_cv_ref(estimator=supplied_model.model,
+                                                **{space_argument: supplied_model.param_grid})
+            fit_params = dict()
+            budget = self.search_budget
+            if MODEL_CONFIG_BUDGET_N_TRIALS_KEY in budget:
+                n_trials_argument = "n_candidates" if "n_candidates" in search_arguments else "n_iter"
+                if n_trials_argument not in search_arguments:
+                    raise Exception(f"{self.grid_search_class_name} does not take a no. of trials")
+                setattr(grid_search_cv, n_trials_argument, budget[MODEL_CONFIG_BUDGET_N_TRIALS_KEY])
+            if MODEL_CONFIG_BUDGET_MIN_RESOURCES_KEY in budget:
+                if "min_resources" not in search_arguments:
+                    raise Exception(f"{self.grid_search_class_name} does not take min resources")
+                grid_search_cv.min_resources = budget[MODEL_CONFIG_BUDGET_MIN_RESOURCES_KEY]
+            if MODEL_CONFIG_BUDGET_MAX_TIME_KEY in budget:
+                if "callback" not in inspect.signature(grid_search_cv_ref.fit).parameters:
+                    raise Exception(f"{self.grid_search_class_name} does not support a wall clock cap")
+                deadline_stopper_ref = class_for_name(module_name="skopt.callbacks", class_name="DeadlineStopper")
+                fit_params["callback"] = deadline_stopper_ref(budget[MODEL_CONFIG_BUDGET_MAX_TIME_KEY])
+            return grid_search_cv, fit_params
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def get_search_n_jobs(self, n_jobs) -> int:
+        """
+        No. of jobs of one search: the configured n_jobs, at most the share of the cores of one of
+        the model_n_jobs searches running together. Negative n_jobs (-1: all cores) count from that share.
+        """
+        cores_per_search = max(1, self.n_cores // self.model_n_jobs)
+        if n_jobs is None:
+            return 1
+        if n_jobs < 0:
+            return max(1, cores_per_search + 1 + n_jobs)
+        return min(n_jobs, cores_per_search)
+
     def execute_grid_search_operation(self, supplied_model: ModelInitializationDetail, input_feature,
                                       output_feature) -> GridSearchedBestModel:
         """
@@ -117,28 +241,134 @@ class ModelFactory:
         Function will return the best model
         """
         try:
-            # instantiating GridSearchCV class     
-           
-            grid_search_cv_ref = class_for_name(module_name=self.grid_search_cv_module, class_name=self.grid_search_class_name)
-            grid_search_cv = grid_search_cv_ref(estimator=supplied_model.model,
-                                                param_grid=supplied_model.param_grid)
+            # instantiating search class     
+            grid_search_cv, fit_params = self.get_search_cv_object(supplied_model)
             grid_search_cv = update_property_of_class(grid_search_cv, self.grid_search_param_data)
+            # fold level parallelism of this model, within its share of the cores
+            grid_search_cv.n_jobs = self.get_search_n_jobs(supplied_model.search_n_jobs
+                                                           if supplied_model.search_n_jobs is not None
+                                                           else grid_search_cv.n_jobs)
+            # train scores of the folds are the train metrics of the model, no predict over the training rows
+            grid_search_cv.return_train_score = True
+            if self.grid_search_class_name.startswith("Halving"):
+                grid_search_cv.scoring = SEARCH_SCORING["r2"]
+            else:
+                grid_search_cv.scoring, grid_search_cv.refit = SEARCH_SCORING, "r2"
 
             
             message = f"Training {type(supplied_model.model).__name__} Started."
-            logging.debug(message)
-            grid_search_cv.fit(input_feature, output_feature)
+            logger.debug(message)
+            # searches of a cluster run side by side in threads, cpu time is of this thread. The fits of
+            # a parallel search run in joblib workers whose cpu time cannot be read, it is left out
+            with profile("model_search", rows=len(input_feature), thread=True, cpu=grid_search_cv.n_jobs == 1,
+                         model=supplied_model.model_name) as search_profile:
+                grid_search_cv.fit(input_feature, output_feature, **fit_params)
+            search_time = search_profile["wall_seconds"]
+            # cross validation results of the best candidate, kept for model ranking
+            best_cv_results = get_best_cv_results(grid_search_cv.cv_results_, grid_search_cv.best_index_)
             grid_searched_best_model = GridSearchedBestModel(model_serial_number=supplied_model.model_serial_number,
                                                              model=supplied_model.model,
                                                              best_model=grid_search_cv.best_estimator_,
                                                              best_parameters=grid_search_cv.best_params_,
-                                                             best_score=grid_search_cv.best_score_
+                                                             best_score=grid_search_cv.best_score_,
+                                                             search_time=search_time,
+                                                             cv_results=best_cv_results,
+                                                             search_profile=search_profile
                                                              )
-            logging.debug(f"Best score: {grid_search_cv.best_score_}, Best Parameters: {grid_search_cv.best_params_}")
+            logger.debug("Best score: %s, Best Parameters: %s", grid_search_cv.best_score_, grid_search_cv.best_params_)
+            logger.info(f"{type(supplied_model.model).__name__} searched in {search_time:.2f}s")
             return grid_searched_best_model
         except Exception as e:
             raise ConcreteException(e, sys) from e
 
+    def warm_start_model(self, previous_model, input_feature, output_feature,
+                         new_rows_share:float, max_n_estimators:int=None) -> GridSearchedBestModel:
+        """
+        Refits the previous model of a cluster from where it stopped instead of searching again,
+        for estimators that support warm_start. Ensembles keep their fitted trees and add
+        a share of trees equal to the share of new rows, fitted on all the rows, up to max_n_estimators.
+        Cross validation would clone the model and score a cold fit of its parameters, so the
+        warm start is scored on a holdout instead: the last of the new rows, which the previous model
+        never saw, are held out of a first warm start and predicted by it.
+
+        Input:
+        previous_model: fitted estimator of the previous run, the new rows are the last rows
+        new_rows_share: share of the rows of the cluster that are new
+        max_n_estimators: no. of estimators an ensemble is not grown beyond
+
+        return:
+        the refitted model with its predictions of the held out rows (nan for the other rows),
+        None when the estimator does not support warm_start, has reached max_n_estimators
+        or there are fewer new rows than folds to hold out
+        """
+        try:
+            if "warm_start" not in previous_model.get_params():
+                return None
+            cv = self.grid_search_param_data.get("cv", 5)
+            n_folds = cv if isinstance(cv, int) else 5
+            n_new_rows = int(round(len(input_feature) * new_rows_share))
+            if n_new_rows < n_folds:
+                logger.info(f"{n_new_rows} new rows, too few to score a warm start of {type(previous_model).__name__}")
+                return None
+            warm_start_params = {"warm_start": True}
+            if "n_estimators" in previous_model.get_params():
+                n_estimators = previous_model.n_estimators + max(1, int(np.ceil(previous_model.n_estimators * new_rows_share)))
+                if max_n_estimators is not None:
+                    if previous_model.n_estimators >= max_n_estimators:
+                        logger.info(f"{type(previous_model).__name__} has {previous_model.n_estimators} estimators, "
+                                    f"not grown beyond {max_n_estimators}")
+                        return None
+                    n_estimators = min(n_estimators, max_n_estimators)
+                warm_start_params["n_estimators"] = n_estimators
+            # a fold worth of the new rows, at least one row per fold
+            n_holdout_rows = max(n_folds, int(np.ceil(n_new_rows / n_folds)))
+            is_holdout = np.arange(len(input_feature)) >= len(input_feature) - n_holdout_rows
+            with profile("warm_start", rows=len(input_feature), thread=True,
+                         cpu=previous_model.get_params().get("n_jobs") in (None, 1),
+                         model=type(previous_model).__name__) as search_profile:
+                holdout_model = copy.deepcopy(previous_model).set_params(**warm_start_params)
+                holdout_model.fit(input_feature.iloc[~is_holdout], output_feature.iloc[~is_holdout])
+                holdout_prediction = holdout_model.predict(input_feature.iloc[is_holdout])
+                train_prediction = holdout_model.predict(input_feature.iloc[~is_holdout])
+                model = copy.deepcopy(previous_model).set_params(**warm_start_params)
+                model.fit(input_feature, output_feature)
+            holdout_label, train_label = output_feature.iloc[is_holdout], output_feature.iloc[~is_holdout]
+            cv_results = {"mean_test_r2": r2_score(holdout_label, holdout_prediction), "std_test_r2": np.nan,
+                          "mean_test_rmse": np.sqrt(mean_squared_error(holdout_label, holdout_prediction)),
+                          "std_test_rmse": np.nan,
+                          "mean_train_r2": r2_score(train_label, train_prediction), "std_train_r2": np.nan,
+                          "mean_train_rmse": np.sqrt(mean_squared_error(train_label, train_prediction)),
+                          "std_train_rmse": np.nan}
+            fold_predictions = np.full(len(input_feature), np.nan)
+            fold_predictions[is_holdout] = holdout_prediction
+            logger.info(f"{type(model).__name__} warm started with {warm_start_params} in "
+                        f"{search_profile['wall_seconds']:.2f}s, r2 on {n_holdout_rows} held out new rows "
+                        f"{cv_results['mean_test_r2']}")
+            return GridSearchedBestModel(model_serial_number=None,
+                                         model=previous_model,
+                                         best_model=model,
+                                         best_parameters=warm_start_params,
+                                         best_score=cv_results["mean_test_r2"],
+                                         search_time=search_profile["wall_seconds"],
+                                         cv_results=cv_results,
+                                         search_profile=search_profile,
+                                         fold_predictions=fold_predictions
+                                         )
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
+    def get_fold_predictions(self, model, input_feature, output_feature) -> np.ndarray:
+        """
+        Out of fold predictions of the parameters of a model with the folds of the search.
+        Searches keep the fold scores only, the predictions of the chosen model are made once here
+        and kept so that the model evaluation scores the model on them instead of fitting it again.
+        """
+        try:
+            return cross_val_predict(clone(model), input_feature, output_feature,
+                                     cv=self.grid_search_param_data.get("cv", 5))
+        except Exception as e:
+            raise ConcreteException(e, sys) from e
+
     def get_supplied_model_details(self) -> List[ModelInitializationDetail]:
         """
         This function will return a list of supplied model details.
@@ -146,14 +376,14 @@ class ModelFactory:
         """
         try:
             supplied_model_list = []
-            logging.debug("Getting supplied model details")
+            logger.debug("Getting supplied model details")
             for model_index in self.supplied_models.keys():
                 model_initialization_config = self.supplied_models[model_index]
                 model_obj_ref = class_for_name(module_name=model_initialization_config[MODEL_CONFIG_MODULE_KEY],
                                                             class_name=model_initialization_config[MODEL_CONFIG_CLASS_KEY]
                                             )
                 model = model_obj_ref()
-                logging.debug(f"Model: {model}")
+                logger.debug("Model: %s", model)
                 if MODEL_CONFIG_PARAM_KEY in model_initialization_config:
                     model_obj_property_data = dict(model_initialization_config[MODEL_CONFIG_PARAM_KEY])
                     model = update_property_of_class(instance_ref=model,
@@ -165,31 +395,54 @@ class ModelFactory:
                 model_initialization_config = ModelInitializationDetail(model_serial_number=model_index,
                                                                      model=model,
                                                                      param_grid=param_grid,
-                                                                     model_name=model_name
+                                                                     model_name=model_name,
+                                                                     search_n_jobs=model_initialization_config.get(MODEL_CONFIG_SEARCH_N_JOBS_KEY),
+                                                                     search_cost=model_initialization_config.get(MODEL_CONFIG_SEARCH_COST_KEY, 1)
                                                                      )
 
                 supplied_model_list.append(model_initialization_config)
 
             self.supplied_models_details = supplied_model_list
-            logging.info(f"Supplied Models: {self.supplied_models_details}")
+            logger.info(f"Supplied Models: {self.supplied_models_details}")
             return self.supplied_models_details
         except Exception as e:
             raise ConcreteException(e, sys) from e
 
+    def get_estimated_search_cost(self, supplied_model: ModelInitializationDetail) -> float:
+        """
+        Estimated cost of a search: no. of candidates x no. of folds x relative cost of one fit.
+        """
+        cv = self.grid_search_param_data.get('cv', 5)
+        n_folds = cv if isinstance(cv, int) else 5
+        n_candidates = len(ParameterGrid(supplied_model.param_grid))
+        if MODEL_CONFIG_BUDGET_N_TRIALS_KEY in self.search_budget:
+            n_candidates = min(n_candidates, self.search_budget[MODEL_CONFIG_BUDGET_N_TRIALS_KEY])
+        return n_candidates * n_folds * supplied_model.search_cost
+
     def initiate_best_parameter_search_for_supplied_models(self,
                                                               supplied_model_list: List[ModelInitializationDetail],
                                                               input_feature,
                                                               output_feature) -> List[GridSearchedBestModel]:
-
+        """
+        Searches the supplied models, model_n_jobs at a time.
+        The most expensive searches are started first so that the slowest model does not finish last.
+        Results are returned in the order of the supplied models.
+        """
         try:
-            self.grid_searched_best_model_list = []
-            for supplied_model in supplied_model_list:
-                grid_searched_best_model = self.execute_grid_search_operation(
-                    supplied_model=supplied_model,
-                    input_feature=input_feature,
-                    output_feature=output_feature
-                )
-                self.grid_searched_best_model_list.append(grid_searched_best_model)
+            schedule = sorted(range(len(supplied_model_list)),
+                              key=lambda index: self.get_estimated_search_cost(supplied_model_list[index]),
+                              reverse=True)
+            logger.info(f"Search order: {[supplied_model_list[index].model_name for index in schedule]}")
+            self.grid_searched_best_model_list = create_list(len(supplied_model_list))
+            # threads only orchestrate the searches, the fits run in the joblib workers of each search
+            with ThreadPoolExecutor(max_workers=self.model_n_jobs) as executor:
+                futures = {index: executor.submit(self.execute_grid_search_operation,
+                                                  supplied_model=supplied_model_list[index],
+                                                  input_feature=input_feature,
+                                                  output_feature=output_feature)
+                           for index in schedule}
+                for index, future in futures.items():
+                    self.grid_searched_best_model_list[index] = future.result()
             return self.grid_searched_best_model_list
         except Exception as e:
             raise ConcreteException(e, sys) from e
@@ -200,11 +453,11 @@ class ModelFactory:
                                                           ) -> ClusterModelDetails:
         try:
             best_model = None
-            logging.debug(f"Looking for best model based on score")
+            logger.debug("Looking for best model based on score")
             for grid_searched_best_model in grid_searched_best_model_list:
-                logging.info(f"Model: {type(grid_searched_best_model.model).__name__}-> Score: {grid_searched_best_model.best_score}")
+                logger.info(f"Model: {type(grid_searched_best_model.model).__name__}-> Score: {grid_searched_best_model.best_score}")
                 if base_accuracy < grid_searched_best_model.best_score:
-                    logging.debug(f"Acceptable model found")
+                    logger.debug("Acceptable model found")
                     base_accuracy = grid_searched_best_model.best_score
 
                     best_model = grid_searched_best_model
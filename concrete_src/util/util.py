@@ -1,5 +1,7 @@
 from typing import List
 import yaml, sys, os, dill
+import hashlib
+import shutil
 import numpy as np
 import pandas as pd
 
@@ -44,6 +46,119 @@ def load_numpy_array_data(file_path: str) -> np.array:
     except Exception as e:
         raise ConcreteException(e, sys) from e
 
+def get_artifact_file_path(file_path:str, artifact_format:str)->str:
+    """
+    Replaces the extension of the file path with the one of the artifact format.
+    """
+    return os.path.splitext(file_path)[0] + ARTIFACT_FORMAT_EXTENSIONS[artifact_format]
+
+def save_data_frame(file_path:str, dataframe:pd.DataFrame):
+    """
+    Saves the dataframe in the format given by the file extension.
+    npy files hold a structured array, so column names and dtypes are kept.
+    file_path: str location of file to save
+    dataframe: pd.DataFrame data to save
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        extension = os.path.splitext(file_path)[1]
+        if extension == ARTIFACT_FORMAT_EXTENSIONS["csv"]:
+            dataframe.to_csv(file_path, index=False, header=True)
+        elif extension == ARTIFACT_FORMAT_EXTENSIONS["parquet"]:
+            dataframe.to_parquet(file_path, index=False)
+        elif extension == ARTIFACT_FORMAT_EXTENSIONS["feather"]:
+            dataframe.reset_index(drop=True).to_feather(file_path)
+        elif extension == ARTIFACT_FORMAT_EXTENSIONS["npy"]:
+            save_numpy_array_data(file_path=file_path, array=dataframe.to_records(index=False))
+        else:
+            raise Exception(f"Unknown data file format: {file_path}")
+    except Exception as e:
+        raise ConcreteException(e, sys) from e
+
+def load_data_frame(file_path:str)->pd.DataFrame:
+    """
+    Loads a dataframe saved by save_data_frame. Only csv files are parsed,
+    npy files are memory mapped and copied column by column.
+    file_path: str location of file to load
+    """
+    try:
+        extension = os.path.splitext(file_path)[1]
+        if extension == ARTIFACT_FORMAT_EXTENSIONS["csv"]:
+            return pd.read_csv(file_path)
+        if extension == ARTIFACT_FORMAT_EXTENSIONS["parquet"]:
+            return pd.read_parquet(file_path)
+        if extension == ARTIFACT_FORMAT_EXTENSIONS["feather"]:
+            return pd.read_feather(file_path)
+        if extension == ARTIFACT_FORMAT_EXTENSIONS["npy"]:
+            return pd.DataFrame(np.load(file_path, mmap_mode='r', allow_pickle=False))
+        raise Exception(f"Unknown data file format: {file_path}")
+    except Exception as e:
+        raise ConcreteException(e, sys) from e
+
+def iter_data_frame_chunks(file_path:str, chunk_size:int):
+    """
+    Yields the data file as dataframes of at most chunk_size rows, so that
+    the whole file is never held in memory.
+    Feather files are yielded per record batch as written.
+    file_path: str location of file to load
+    chunk_size: no. of rows in a chunk
+    """
+    try:
+        extension = os.path.splitext(file_path)[1]
+        if extension == ARTIFACT_FORMAT_EXTENSIONS["csv"]:
+            with pd.read_csv(file_path, chunksize=chunk_size) as reader:
+                yield from reader
+        elif extension == ARTIFACT_FORMAT_EXTENSIONS["parquet"]:
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_size):
+                yield batch.to_pandas()
+        elif extension == ARTIFACT_FORMAT_EXTENSIONS["feather"]:
+            import pyarrow as pa
+            with pa.memory_map(file_path) as source:
+                reader = pa.ipc.open_file(source)
+                for batch_index in range(reader.num_record_batches):
+                    yield reader.get_batch(batch_index).to_pandas()
+        elif extension == ARTIFACT_FORMAT_EXTENSIONS["npy"]:
+            array = np.load(file_path, mmap_mode='r', allow_pickle=False)
+            for start in range(0, len(array), chunk_size):
+                yield pd.DataFrame(array[start:start + chunk_size])
+        else:
+            raise Exception(f"Unknown data file format: {file_path}")
+    except Exception as e:
+        raise ConcreteException(e, sys) from e
+
+def get_row_count(file_path:str)->int:
+    """
+    Returns the no. of rows of a data file without loading it.
+    csv files are scanned for line breaks, the other formats store the count.
+    file_path: str location of file
+    """
+    try:
+        extension = os.path.splitext(file_path)[1]
+        if extension == ARTIFACT_FORMAT_EXTENSIONS["csv"]:
+            lines, last_block = 0, b""
+            with open(file_path, "rb") as csv_file:
+                for block in iter(lambda: csv_file.read(1 << 20), b""):
+                    lines += block.count(b"\n")
+                    last_block = block
+            if last_block and not last_block.endswith(b"\n"):
+                lines += 1
+            # header line
+            return max(lines - 1, 0)
+        if extension == ARTIFACT_FORMAT_EXTENSIONS["parquet"]:
+            import pyarrow.parquet as pq
+            return pq.ParquetFile(file_path).metadata.num_rows
+        if extension == ARTIFACT_FORMAT_EXTENSIONS["feather"]:
+            import pyarrow as pa
+            with pa.memory_map(file_path) as source:
+                reader = pa.ipc.open_file(source)
+                return sum(reader.get_batch(batch_index).num_rows for batch_index in range(reader.num_record_batches))
+        if extension == ARTIFACT_FORMAT_EXTENSIONS["npy"]:
+            return len(np.load(file_path, mmap_mode='r', allow_pickle=False))
+        raise Exception(f"Unknown data file format: {file_path}")
+    except Exception as e:
+        raise ConcreteException(e, sys) from e
+
 def save_object(file_path:str,obj):
     """
     file_path: str
@@ -84,7 +199,7 @@ def write_yaml_file(file_path:str,data:dict=None):
 
 def load_data(file_path: str, schema_file_path: str) -> pd.DataFrame:
     """
-    Reads csv file and checks if it is as per schema
+    Reads data file and checks if it is as per schema
     file_path: Path of input file
     schema_file_path: Path of schema file
     """
@@ -93,7 +208,7 @@ def load_data(file_path: str, schema_file_path: str) -> pd.DataFrame:
 
         schema = datatset_schema[SCHEMA_FILE_COLUMNS_KEY]
 
-        dataframe = pd.read_csv(file_path)
+        dataframe = load_data_frame(file_path)
 
         error_messgae = ""
 
@@ -128,4 +243,46 @@ def create_list(size:int)->List:
     Input:
     size: size of list
     """
-    return [None]*size
\ No newline at end of file
+    return [None]*size
+
+def get_file_hash(file_path:str)->str:
+    """
+    Returns sha256 of the file content. The file is read in blocks.
+    file_path: str
+    """
+    try:
+        file_hash = hashlib.sha256()
+        with open(file_path, "rb") as file_obj:
+            for block in iter(lambda: file_obj.read(1024*1024), b""):
+                file_hash.update(block)
+        return file_hash.hexdigest()
+    except Exception as e:
+        raise ConcreteException(e,sys) from e
+
+def link_file(src:str, dst:str):
+    """
+    Hard links dst to src, so that both share the same bytes on disk.
+    Copies when the file system does not support links or src is on another one.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+def get_code_version()->str:
+    """
+    Returns sha256 of the source files of the concrete_src package.
+    """
+    try:
+        package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code_hash = hashlib.sha256()
+        for dir_path, dir_names, file_names in os.walk(package_dir):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                if file_name.endswith(".py"):
+                    file_path = os.path.join(dir_path, file_name)
+                    code_hash.update(os.path.relpath(file_path, package_dir).encode())
+                    code_hash.update(get_file_hash(file_path).encode())
+        return code_hash.hexdigest()
+    except Exception as e:
+        raise ConcreteException(e,sys) from e
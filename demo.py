@@ -1,9 +1,11 @@
-from concrete_src.logger import logging
+from concrete_src.logger import get_logger
 from concrete_src.exception import ConcreteException
 from concrete_src.config.configuartion import Configuration
 from concrete_src.pipeline.pipeline import Pipeline
 import sys
 
+logger = get_logger(__name__)
+
 
 
 def main():
@@ -14,7 +16,7 @@ def main():
     except Exception as e:
         raise ConcreteException(e, sys) from e
         print(e)
-        logging.error(f"{e}")
+        logger.error(f"{e}")
 
 if __name__=="__main__":
     main()
\ No newline at end of file
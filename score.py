@@ -0,0 +1,42 @@
+from concrete_src.logger import get_logger
+from concrete_src.exception import ConcreteException
+from concrete_src.constant import *
+from concrete_src.util.util import read_yaml_file
+from concrete_src.pipeline.batch_scoring import BatchScoring
+import argparse
+import sys
+
+logger = get_logger(__name__)
+
+
+def main():
+    """
+    Scores a file of mix designs offline.
+    Usage: python score.py <input file> <output file> [--chunk-size N] [--workers N]
+    """
+    try:
+        parser = argparse.ArgumentParser(description="Predict the compressive strength of every mix design in a file")
+        parser.add_argument("input_file", help="csv, parquet, feather or npy file with the schema input columns")
+        parser.add_argument("output_file", help="csv or parquet file to write the predictions to")
+        parser.add_argument("--chunk-size", type=int, default=50000, help="rows scored at a time")
+        parser.add_argument("--workers", type=int, default=None, help="scoring processes, 0 to score in this process")
+        args = parser.parse_args()
+
+        config_info = read_yaml_file(CONFIG_FILE_PATH)
+        model_dir = os.path.join(ROOT_DIR, config_info[MODEL_PUSH_CONFIG_INFO_KEY][MODEL_EXPORT_DIR])
+        schema_file_path = os.path.join(ROOT_DIR, config_info[DATA_VALIDATION_CONFIG_KEY][DATA_VALIDATION_SCHEMA_DIR],
+                                        config_info[DATA_VALIDATION_CONFIG_KEY][DATA_VALIDATION_SCHEMA_FILE_NAME])
+
+        batch_scoring = BatchScoring(model_dir=model_dir, schema_file_path=schema_file_path,
+                                     chunk_size=args.chunk_size, max_workers=args.workers)
+        batch_scoring_artifact = batch_scoring.score(args.input_file, args.output_file)
+        print(f"Scored {batch_scoring_artifact.rows} rows in {batch_scoring_artifact.elapsed_seconds:.2f}s "
+              f"({batch_scoring_artifact.rows_per_second:.0f} rows/s)")
+        print(f"Peak memory (MB): {batch_scoring_artifact.peak_memory_mb}")
+        print(f"Predictions: {batch_scoring_artifact.output_file_path}")
+    except Exception as e:
+        logger.error(f"{e}")
+        raise ConcreteException(e, sys) from e
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# the logging is configured when concrete_src is first imported, point it at a temporary
+# folder before the tests import it so that running the tests leaves no log files in the tree
+os.environ.setdefault("CONCRETE_LOG_DIR", tempfile.mkdtemp(prefix="concrete_logs_"))
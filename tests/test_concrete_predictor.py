@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.linear_model import Ridge
+
+from concrete_src.entity.concrete_predictor import ConcretePredictor
+from concrete_src.entity.model_bundle import ModelBundle
+from concrete_src.entity.model_release import promote_release
+from concrete_src.exception import ConcreteException
+from concrete_src.util.util import write_yaml_file
+
+SCHEMA_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "schema.yaml")
+COLUMNS = ["cement", "blast_furnace_slag", "fly_ash", "water", "superplasticizer", "coarse_aggregate",
+           "fine_aggregate", "age"]
+X = pd.DataFrame(np.random.RandomState(0).uniform(1, 500, size=(40, len(COLUMNS))), columns=COLUMNS)
+
+
+class CementRouter(BaseEstimator, TransformerMixin):
+    """
+    Appends cluster 1 to the rows with more cement than the threshold, 0 to the others.
+    """
+    def __init__(self, threshold):
+        self.threshold = threshold
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        X = np.asarray(X, dtype=float)
+        return np.column_stack([X, (X[:, 0] > self.threshold).astype(int)])
+
+
+def save_release(model_dir, release, threshold, clusters, offset=0.0):
+    """
+    Saves a bundle with a model for each of the clusters and a release folder listing them.
+    """
+    preprocessing_object = CementRouter(threshold).fit(X)
+    cluster_models = {cluster: Ridge().fit(X, X["cement"] * (cluster + 1) + offset) for cluster in clusters}
+    bundle_file_path = os.path.join(model_dir, release, "model_bundle.zip")
+    ModelBundle.save(bundle_file_path=bundle_file_path, preprocessing_object=preprocessing_object,
+                     cluster_models=cluster_models)
+    write_yaml_file(os.path.join(model_dir, release, "exported_clusters.yaml"),
+                    {cluster: "model_bundle.zip" for cluster in clusters})
+    return cluster_models
+
+
+def test_release_sharing_one_preprocessing_is_routed_with_it(tmp_path):
+    cluster_models = save_release(str(tmp_path), "release_1", threshold=250, clusters=[0, 1])
+    # a later release of cluster 1 only, trained on rows of the same preprocessing
+    cluster_models.update(save_release(str(tmp_path), "release_2", threshold=250, clusters=[1], offset=100.0))
+
+    predictions = ConcretePredictor(model_dir=str(tmp_path), schema_file_path=SCHEMA_FILE_PATH).predict(X)
+
+    is_cluster_1 = X["cement"] > 250
+    np.testing.assert_allclose(predictions[~is_cluster_1], cluster_models[0].predict(X[~is_cluster_1]))
+    np.testing.assert_allclose(predictions[is_cluster_1], cluster_models[1].predict(X[is_cluster_1]))
+
+
+def test_release_mixing_preprocessing_is_refused(tmp_path):
+    save_release(str(tmp_path), "release_1", threshold=250, clusters=[0, 1])
+    save_release(str(tmp_path), "release_2", threshold=100, clusters=[1])
+
+    with pytest.raises(ConcreteException, match="mixes models of different preprocessing"):
+        ConcretePredictor(model_dir=str(tmp_path), schema_file_path=SCHEMA_FILE_PATH)
+
+
+def test_release_of_part_of_a_run_with_other_preprocessing_is_refused(tmp_path):
+    model_dir = str(tmp_path / "saved_models")
+    save_release(model_dir, "release_1", threshold=250, clusters=[0, 1])
+    save_release(str(tmp_path), "run_2", threshold=100, clusters=[0, 1])
+    bundle_file_path = str(tmp_path / "run_2" / "model_bundle.zip")
+
+    with pytest.raises(ConcreteException, match="models of every cluster of the run"):
+        promote_release(model_dir=model_dir, release="release_2",
+                        model_files={1: (bundle_file_path, "model_bundle_run_2.zip")})
+
+    release_model_paths = promote_release(model_dir=model_dir, release="release_2",
+                                          model_files={cluster: (bundle_file_path, "model_bundle_run_2.zip")
+                                                       for cluster in [0, 1]})
+    assert set(release_model_paths) == {0, 1}
+    assert all(os.path.samefile(model_file_path, bundle_file_path) for model_file_path in release_model_paths.values())
+    ConcretePredictor(model_dir=model_dir, schema_file_path=SCHEMA_FILE_PATH)
@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from concrete_src.component.data_ingestion import DataIngestion
+from concrete_src.entity.config_entity import DataIngestionConfig
+from concrete_src.exception import ConcreteException
+from concrete_src.util.util import read_yaml_file
+
+DATASET_FILE_NAME = "concrete_data.csv"
+CSV_CONTENT = b"cement ,water, age\n540.0,162.0,28\n332.5,228.0,270\n"
+ETAG = '"v1"'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Serves the server's content with an ETag, unless its etag is None, answers 304 to a matching If-None-Match.
+    Stalls for the server's delay_seconds before answering.
+    """
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        time.sleep(self.server.delay_seconds)
+        if self.server.etag is not None and self.headers.get("If-None-Match") == self.server.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if self.server.etag is not None:
+            self.send_header("ETag", self.server.etag)
+        self.send_header("Content-Length", str(len(self.server.content)))
+        self.end_headers()
+        self.wfile.write(self.server.content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    http_server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    http_server.requests = []
+    http_server.delay_seconds = 0
+    http_server.etag = ETAG
+    http_server.content = CSV_CONTENT
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    yield http_server
+    http_server.shutdown()
+    http_server.server_close()
+
+
+def get_data_ingestion(tmp_path, source_type, source_path, download_timeout_seconds=5):
+    return DataIngestion(DataIngestionConfig(
+        dataset_name="stand-in", dataset_filename=DATASET_FILE_NAME,
+        raw_data_dir=str(tmp_path / "raw_data"), ingested_train_dir=str(tmp_path / "ingested" / "train"),
+        source_type=source_type, source_path=source_path, download_cache_dir=str(tmp_path / "download_cache"),
+        artifact_format="csv", download_timeout_seconds=download_timeout_seconds))
+
+
+def get_url(http_server):
+    return f"http://127.0.0.1:{http_server.server_address[1]}/{DATASET_FILE_NAME}"
+
+
+def test_http_download_is_revalidated_with_etag(tmp_path, server):
+    data_ingestion = get_data_ingestion(tmp_path, "http", get_url(server))
+    [first_file_path] = data_ingestion.download_http_data()
+    [second_file_path] = data_ingestion.download_http_data()
+
+    assert second_file_path == first_file_path
+    assert "If-None-Match" not in server.requests[0]
+    assert server.requests[1]["If-None-Match"] == ETAG
+    with open(second_file_path, "rb") as cached_file:
+        assert cached_file.read() == CSV_CONTENT
+    manifest = read_yaml_file(os.path.join(os.path.dirname(first_file_path), "manifest.yaml"))
+    assert manifest["etag"] == ETAG
+
+
+def test_http_download_without_validators_keeps_unchanged_cached_file(tmp_path, server):
+    server.etag = None
+    data_ingestion = get_data_ingestion(tmp_path, "http", get_url(server))
+    [cached_file_path] = data_ingestion.download_http_data()
+    os.utime(cached_file_path, (0, 0))
+
+    [unchanged_file_path] = data_ingestion.download_http_data()
+
+    assert unchanged_file_path == cached_file_path
+    assert os.path.getmtime(cached_file_path) == 0
+    assert not os.path.exists(f"{cached_file_path}.part")
+
+    server.content = CSV_CONTENT + b"1.0,2.0,3\n"
+    [changed_file_path] = data_ingestion.download_http_data()
+
+    assert os.path.getmtime(changed_file_path) > 0
+    with open(changed_file_path, "rb") as changed_file:
+        assert changed_file.read() == server.content
+
+
+def test_cached_file_failing_checksum_is_downloaded_again(tmp_path, server):
+    data_ingestion = get_data_ingestion(tmp_path, "http", get_url(server))
+    [cached_file_path] = data_ingestion.download_http_data()
+    with open(cached_file_path, "ab") as cached_file:
+        cached_file.write(b"1.0,2.0,3\n")
+
+    [downloaded_file_path] = data_ingestion.download_http_data()
+
+    # no conditional request for a cached copy that does not match its manifest
+    assert "If-None-Match" not in server.requests[1]
+    with open(downloaded_file_path, "rb") as downloaded_file:
+        assert downloaded_file.read() == CSV_CONTENT
+
+
+def test_stalled_server_times_out(tmp_path, server):
+    server.delay_seconds = 3
+    data_ingestion = get_data_ingestion(tmp_path, "http", get_url(server), download_timeout_seconds=0.5)
+    start_time = time.perf_counter()
+    with pytest.raises(ConcreteException):
+        data_ingestion.download_http_data()
+    assert time.perf_counter() - start_time < 2.5
+
+
+def test_shards_are_joined_with_stripped_header(tmp_path):
+    shard_dir = tmp_path / "shards"
+    shard_dir.mkdir()
+    (shard_dir / "part_0.csv").write_bytes(b"cement ,water\n1,2")
+    (shard_dir / "part_1.csv").write_bytes(b" cement,water \n3,4\n")
+    data_ingestion = get_data_ingestion(tmp_path, "directory", str(shard_dir))
+
+    data_ingestion_artifact = data_ingestion.download_data()
+
+    train_df = pd.read_csv(data_ingestion_artifact.train_file_path)
+    assert list(train_df.columns) == ["cement", "water"]
+    assert train_df.values.tolist() == [[1, 2], [3, 4]]
+
+
+def test_shard_header_mismatch_fails(tmp_path):
+    shard_dir = tmp_path / "shards"
+    shard_dir.mkdir()
+    (shard_dir / "part_0.csv").write_bytes(b"cement,water\n1,2\n")
+    (shard_dir / "part_1.csv").write_bytes(b"cement,age\n3,4\n")
+    data_ingestion = get_data_ingestion(tmp_path, "directory", str(shard_dir))
+
+    with pytest.raises(ConcreteException, match="do not match"):
+        data_ingestion.download_data()
+
+
+def test_header_with_commas_and_quotes_is_quoted(tmp_path):
+    source_file_path = tmp_path / "source.csv"
+    source_file_path.write_bytes(b'" fine, aggregate ","say ""kg""",age\n1,2,3\n')
+    train_file_path = tmp_path / "train.csv"
+
+    get_data_ingestion(tmp_path, "local", str(source_file_path)).write_train_file(
+        [str(source_file_path)], str(train_file_path))
+
+    train_df = pd.read_csv(train_file_path)
+    assert list(train_df.columns) == ["fine, aggregate", 'say "kg"', "age"]
+    assert train_df.values.tolist() == [[1, 2, 3]]
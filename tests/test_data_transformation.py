@@ -0,0 +1,23 @@
+import numpy as np
+
+from concrete_src.component.data_transformation import ClusterGenerator
+
+DATA = np.concatenate([np.random.RandomState(seed).randn(50, 3) + 10 * seed for seed in range(3)])
+
+
+def test_elbow_search_warm_starts_from_searches_with_the_same_settings(tmp_path):
+    cache_dir = str(tmp_path)
+    ClusterGenerator(min_clusters=1, max_clusters=4, algorithm="KMeans", cache_dir=cache_dir).fit(DATA)
+    # an elbow search saved by an earlier release, without its settings
+    np.savez(str(tmp_path / "elbow_legacy.npz"), inertias=np.ones(6),
+             **{f"centers_{k}": np.zeros((k, 3)) for k in range(1, 7)})
+
+    previous_centers = ClusterGenerator(min_clusters=1, max_clusters=4, algorithm="KMeans",
+                                        cache_dir=cache_dir).get_previous_centers(n_features=3)
+
+    assert sorted(previous_centers) == [1, 2, 3, 4]
+    assert all(centers.any() for centers in previous_centers.values())
+    for cluster_generator, n_features in [(ClusterGenerator(1, 6, "KMeans", cache_dir=cache_dir), 3),
+                                          (ClusterGenerator(1, 4, "MiniBatchKMeans", cache_dir=cache_dir), 3),
+                                          (ClusterGenerator(1, 4, "KMeans", cache_dir=cache_dir), 2)]:
+        assert cluster_generator.get_previous_centers(n_features=n_features) == dict()
@@ -0,0 +1,264 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from concrete_src.component.data_transformation import DataTransformation
+from concrete_src.component.model_evaluation import ModelEvaluation
+from concrete_src.component.model_pusher import ModelPusher
+from concrete_src.component.model_trainer import ModelTrainer
+from concrete_src.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
+from concrete_src.entity.config_entity import DataTransformationConfig, IncrementalTrainingConfig, ModelTrainerConfig
+from concrete_src.entity.config_entity import ModelEvaluationConfig, ModelPusherConfig
+from concrete_src.entity.incremental_state import get_cluster_statistics, get_clusters_to_refit
+from concrete_src.entity.concrete_predictor import ConcretePredictor
+from concrete_src.entity.model_release import get_served_model_paths
+from concrete_src.util.util import load_data_frame, get_file_hash, write_yaml_file
+
+SCHEMA_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "schema.yaml")
+COLUMNS = ["cement", "blast_furnace_slag", "fly_ash", "water", "superplasticizer", "coarse_aggregate",
+           "fine_aggregate", "age"]
+TARGET_COLUMN = "concrete_compressive_strength"
+# three well separated mix designs, so that the clustering has more than one cluster
+MIX_DESIGNS = np.array([[520.0, 20.0, 10.0, 160.0, 3.0, 1040.0, 680.0, 28.0],
+                        [260.0, 160.0, 110.0, 190.0, 9.0, 930.0, 800.0, 90.0],
+                        [150.0, 60.0, 170.0, 210.0, 5.0, 1060.0, 720.0, 7.0]])
+MODEL_CONFIG = {"grid_search": {"class": "GridSearchCV", "module": "sklearn.model_selection",
+                                "params": {"cv": 3, "verbose": 0, "n_jobs": 1}},
+                "models": {"model_0": {"class": "Ridge", "module": "sklearn.linear_model",
+                                       "params": {"alpha": 1.0},
+                                       "search_param_grid": {"fit_intercept": [True, False]}},
+                           "model_1": {"class": "RandomForestRegressor", "module": "sklearn.ensemble",
+                                       "params": {"n_estimators": 5, "random_state": 42},
+                                       "search_param_grid": {"max_depth": [3]}}}}
+# a heavily regularized model predicting about the mean strength, that any model of MODEL_CONFIG beats
+WEAK_MODEL_CONFIG = {"grid_search": MODEL_CONFIG["grid_search"],
+                     "models": {"model_0": {"class": "Ridge", "module": "sklearn.linear_model",
+                                            "params": {"alpha": 1e6},
+                                            "search_param_grid": {"fit_intercept": [True]}}}}
+
+
+def get_rows(mix_design, n_rows, seed, label_shift=0.0):
+    """
+    Rows scattered by 3% around a mix design, with a strength that depends on the mix.
+    """
+    random_state = np.random.RandomState(seed)
+    features = MIX_DESIGNS[mix_design] * (1 + 0.03 * random_state.randn(n_rows, len(COLUMNS)))
+    rows = pd.DataFrame(features, columns=COLUMNS).astype({"age": "int64"})
+    rows[TARGET_COLUMN] = (0.08 * rows["cement"] + 0.05 * rows["blast_furnace_slag"] - 0.1 * rows["water"]
+                           + 8 * np.log(rows["age"]) + random_state.randn(n_rows) + label_shift)
+    return rows
+
+
+@pytest.fixture
+def base_df():
+    return pd.concat([get_rows(mix_design, 100, seed=mix_design) for mix_design in range(len(MIX_DESIGNS))],
+                     ignore_index=True)
+
+
+class Pipeline:
+    """
+    Runs transformation, training, evaluation and push of one run in its own folders,
+    sharing the incremental state, evaluation reports and released models with the other runs.
+    """
+    def __init__(self, root_dir, model_config=MODEL_CONFIG):
+        self.root_dir = root_dir
+        self.model_config_file_path = str(root_dir / "model.yaml")
+        write_yaml_file(self.model_config_file_path, model_config)
+        self.incremental_training_config = IncrementalTrainingConfig(
+            enabled=True, state_file_path=str(root_dir / "incremental_state.yaml"), max_new_rows_fraction=0.5,
+            rows_change_threshold=0.1, drift_threshold=0.25, warm_start=True)
+        self.saved_models_dir = str(root_dir / "saved_models")
+
+    def transform(self, run, train_df):
+        run_dir = self.root_dir / run
+        train_file_path = run_dir / "ingested" / "concrete_data.csv"
+        train_file_path.parent.mkdir(parents=True)
+        train_df.to_csv(train_file_path, index=False)
+        self.data_ingestion_artifact = DataIngestionArtifact(train_file_path=str(train_file_path), is_ingested=True,
+                                                             message="")
+        self.data_validation_artifact = DataValidationArtifact(schema_file_path=SCHEMA_FILE_PATH, report_file_path=None,
+                                                               is_validated=True, message="")
+        return DataTransformation(
+            DataTransformationConfig(transformed_train_dir=str(run_dir / "transformed"),
+                                     preprocessed_object_file_path=str(run_dir / "preprocessed" / "preprocessed.pkl"),
+                                     min_clusters=1, max_clusters=6, cluster_algorithm="KMeans", cluster_n_jobs=1,
+                                     cluster_cache_dir=None, artifact_format="csv"),
+            self.data_validation_artifact, self.data_ingestion_artifact,
+            self.incremental_training_config).initiate_data_transformation()
+
+    def train(self, run, data_transformation_artifact):
+        return ModelTrainer(
+            ModelTrainerConfig(trained_models_path=str(self.root_dir / run / "trained_models"), base_accuracy=-100.0,
+                               model_config_file_path=self.model_config_file_path, executor="sequential",
+                               max_workers=1),
+            data_transformation_artifact, self.incremental_training_config).initiate_model_trainer()
+
+    def evaluate_and_push(self, run, model_trainer_artifact):
+        model_evaluation_artifact = ModelEvaluation(
+            ModelEvaluationConfig(model_evaluation_files_folder=str(self.root_dir / "model_evaluation"),
+                                  model_evaluation_file_prefix="model_evaluation_", time_stamp=run,
+                                  base_accuracy=-100.0, cv_folds=3),
+            self.data_ingestion_artifact, self.data_validation_artifact,
+            model_trainer_artifact).initiate_model_evaluation()
+        model_pusher_artifact = ModelPusher(ModelPusherConfig(export_dir_path=os.path.join(self.saved_models_dir, run)),
+                                            model_evaluation_artifact).initiate_model_pusher()
+        return model_evaluation_artifact, model_pusher_artifact
+
+    def run(self, run, train_df):
+        data_transformation_artifact = self.transform(run, train_df)
+        model_trainer_artifact = self.train(run, data_transformation_artifact)
+        return (data_transformation_artifact, model_trainer_artifact) + \
+            self.evaluate_and_push(run, model_trainer_artifact)
+
+
+def assert_run_accepted_as_a_whole(pipeline, model_trainer_artifact, model_evaluation_artifact, train_df):
+    """
+    A run routed by another preprocessing than the models being served is pushed whole or not at all,
+    so the release being served never mixes preprocessing.
+    """
+    is_run_accepted = model_evaluation_artifact.is_models_accepted[0]
+    assert model_evaluation_artifact.is_models_accepted == [is_run_accepted] * len(model_trainer_artifact.clusters)
+    served_model_paths = get_served_model_paths(pipeline.saved_models_dir)
+    if is_run_accepted:
+        assert sorted(served_model_paths) == sorted(model_trainer_artifact.clusters)
+    predictions = ConcretePredictor(model_dir=pipeline.saved_models_dir, schema_file_path=SCHEMA_FILE_PATH).predict(
+        train_df.drop(columns=[TARGET_COLUMN]))
+    assert len(predictions) == len(train_df)
+
+
+def get_new_row_clusters(data_transformation_artifact, n_rows):
+    return set(load_data_frame(data_transformation_artifact.transformed_train_file_path)["cluster"].iloc[-n_rows:])
+
+
+def test_appended_rows_are_transformed_alone_and_unchanged_clusters_carried_forward(tmp_path, base_df, monkeypatch):
+    pipeline = Pipeline(tmp_path)
+    first_transformation, first_trainer, first_evaluation, first_pusher = pipeline.run("run_1", base_df)
+    assert not first_transformation.is_incremental
+    assert len(first_trainer.clusters) > 1
+    assert all(first_trainer.is_models_refit)
+    assert all(first_evaluation.is_models_accepted) and all(first_pusher.is_models_pushed)
+    first_served_model_paths = get_served_model_paths(pipeline.saved_models_dir)
+
+    def fit_transform_rows(self, train_df):
+        raise AssertionError("the preprocessing was fitted again")
+    monkeypatch.setattr(DataTransformation, "fit_transform_rows", fit_transform_rows)
+    train_df = pd.concat([base_df, get_rows(0, 20, seed=10)], ignore_index=True)
+    second_transformation = pipeline.transform("run_2", train_df)
+
+    assert second_transformation.is_incremental
+    assert second_transformation.new_rows == 20
+    assert get_file_hash(second_transformation.preprocessed_object_file_path) == \
+        get_file_hash(first_transformation.preprocessed_object_file_path)
+    second_train_df = load_data_frame(second_transformation.transformed_train_file_path)
+    pd.testing.assert_frame_equal(second_train_df.iloc[:len(base_df)],
+                                  load_data_frame(first_transformation.transformed_train_file_path))
+
+    refit_clusters = get_new_row_clusters(second_transformation, 20)
+    second_trainer = pipeline.train("run_2", second_transformation)
+    held_out_models = []
+    get_held_out_predictions = ModelEvaluation.get_held_out_predictions
+
+    def recording_get_held_out_predictions(self, model, *args):
+        held_out_models.append(model)
+        return get_held_out_predictions(self, model, *args)
+    monkeypatch.setattr(ModelEvaluation, "get_held_out_predictions", recording_get_held_out_predictions)
+    second_evaluation, second_pusher = pipeline.evaluate_and_push("run_2", second_trainer)
+
+    # the refit models are scored on the fold predictions kept by the trainer, only the previous models are fitted again
+    assert len(held_out_models) == len(refit_clusters)
+
+    carried_clusters = set(second_trainer.clusters) - refit_clusters
+    assert len(carried_clusters) > 0
+    for cluster in second_trainer.clusters:
+        assert second_trainer.is_models_refit[cluster] == (cluster in refit_clusters)
+        assert second_evaluation.is_models_refit[cluster] == (cluster in refit_clusters)
+    for cluster in carried_clusters:
+        assert second_trainer.trained_models_file_path[cluster] == first_trainer.trained_models_file_path[cluster]
+        assert second_trainer.model_accuracy[cluster] == pytest.approx(first_trainer.model_accuracy[cluster])
+        assert not second_evaluation.is_models_accepted[cluster]
+        assert second_evaluation.evaluated_model_paths[cluster] == first_trainer.trained_models_file_path[cluster]
+        assert not second_pusher.is_models_pushed[cluster]
+        # the release being served keeps the models of the carried clusters, linked from the first release
+        assert os.path.samefile(get_served_model_paths(pipeline.saved_models_dir)[cluster],
+                                first_served_model_paths[cluster])
+
+
+def test_changed_earlier_row_refits_everything(tmp_path, base_df):
+    pipeline = Pipeline(tmp_path, model_config=WEAK_MODEL_CONFIG)
+    first_transformation, first_trainer, _, _ = pipeline.run("run_1", base_df)
+
+    write_yaml_file(pipeline.model_config_file_path, MODEL_CONFIG)
+    train_df = pd.concat([base_df, get_rows(0, 20, seed=10)], ignore_index=True)
+    train_df.loc[0, TARGET_COLUMN] += 1.0
+    second_transformation, second_trainer, second_evaluation, _ = pipeline.run("run_2", train_df)
+
+    assert not second_transformation.is_incremental
+    assert second_transformation.new_rows == len(train_df)
+    assert get_file_hash(second_transformation.preprocessed_object_file_path) != \
+        get_file_hash(first_transformation.preprocessed_object_file_path)
+    assert all(second_trainer.is_models_refit)
+    assert all(second_evaluation.is_models_refit)
+    # routed by another preprocessing, the run is compared with the weak models being served as a whole
+    assert all(second_evaluation.is_models_accepted)
+    assert_run_accepted_as_a_whole(pipeline, second_trainer, second_evaluation, train_df)
+
+
+def test_run_with_fewer_clusters_than_the_previous_run_is_evaluated(tmp_path, base_df):
+    pipeline = Pipeline(tmp_path)
+    first_transformation, first_trainer, _, _ = pipeline.run("run_1", base_df)
+    first_clusters = load_data_frame(first_transformation.transformed_train_file_path)["cluster"]
+    mix_design_clusters = [first_clusters.iloc[100 * mix_design] for mix_design in range(len(MIX_DESIGNS))]
+
+    # two of the mix designs, the one in the last cluster of the first run among them,
+    # so that the previous models route rows to a cluster the second run does not have
+    last_mix_design = int(np.argmax(mix_design_clusters))
+    mix_designs = [last_mix_design, (last_mix_design + 1) % len(MIX_DESIGNS)]
+    train_df = pd.concat([get_rows(mix_design, 100, seed=30 + mix_design) for mix_design in mix_designs],
+                         ignore_index=True)
+    _, second_trainer, second_evaluation, _ = pipeline.run("run_2", train_df)
+
+    assert len(second_trainer.clusters) < len(first_trainer.clusters)
+    assert mix_design_clusters[last_mix_design] >= len(second_trainer.clusters)
+    assert_run_accepted_as_a_whole(pipeline, second_trainer, second_evaluation, train_df)
+
+
+def test_drifted_cluster_is_refit(tmp_path, base_df):
+    pipeline = Pipeline(tmp_path)
+    pipeline.run("run_1", base_df)
+
+    # three rows each, below the rows change threshold. Only the strength of the first mix design moved
+    drifted_rows = get_rows(0, 3, seed=20, label_shift=100.0)
+    quiet_rows = get_rows(1, 3, seed=21)
+    train_df = pd.concat([base_df, drifted_rows, quiet_rows], ignore_index=True)
+    second_transformation = pipeline.transform("run_2", train_df)
+    assert second_transformation.is_incremental
+    transformed_df = load_data_frame(second_transformation.transformed_train_file_path)
+    drifted_clusters = set(transformed_df["cluster"].iloc[-6:-3])
+    quiet_clusters = set(transformed_df["cluster"].iloc[-3:])
+    assert drifted_clusters.isdisjoint(quiet_clusters)
+
+    second_trainer = pipeline.train("run_2", second_transformation)
+
+    for cluster in second_trainer.clusters:
+        assert second_trainer.is_models_refit[cluster] == (cluster in drifted_clusters)
+
+
+def test_clusters_to_refit_thresholds():
+    random_state = np.random.RandomState(0)
+    features, label = random_state.randn(100, 2), random_state.randn(100)
+    previous_statistics = {cluster: get_cluster_statistics(features, label) for cluster in range(4)}
+    new_features, new_label = random_state.randn(2, 2), random_state.randn(2)
+    cluster_data = {
+        0: (features, label),  # no new rows
+        1: (np.vstack([features, new_features]), np.append(label, new_label)),  # few rows, no drift
+        2: (np.vstack([features, new_features]), np.append(label, new_label + 50)),  # few rows, label drift
+        3: (np.vstack([features] + [new_features] * 10), np.append(label, [new_label] * 10)),  # 20% more rows
+        4: (features, label),  # no previous model
+    }
+
+    clusters_to_refit = get_clusters_to_refit(cluster_data=cluster_data, previous_statistics=previous_statistics,
+                                              rows_change_threshold=0.1, drift_threshold=0.25)
+
+    assert clusters_to_refit == [2, 3, 4]
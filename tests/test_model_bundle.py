@@ -0,0 +1,120 @@
+import hashlib
+import json
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import Ridge
+from sklearn.preprocessing import StandardScaler
+
+from concrete_src.constant import MODEL_BUNDLE_MANIFEST_NAME, MODEL_BUNDLE_PREPROCESSING_MEMBER_NAME
+from concrete_src.entity.model_bundle import ModelBundle
+from concrete_src.exception import ConcreteException
+
+
+X = pd.DataFrame(np.random.RandomState(0).randn(30, 2), columns=["cement", "water"])
+PREPROCESSING_OBJECT = StandardScaler().fit(X)
+CLUSTER_MODELS = {cluster: Ridge(alpha=cluster + 1.0).fit(X, X["cement"] * cluster - X["water"])
+                  for cluster in range(3)}
+
+
+@pytest.fixture
+def bundle_file_path(tmp_path):
+    file_path = str(tmp_path / "model_bundle.zip")
+    ModelBundle.save(bundle_file_path=file_path, preprocessing_object=PREPROCESSING_OBJECT,
+                     cluster_models=CLUSTER_MODELS, cluster_details={1: {"model_accuracy": 0.9}})
+    return file_path
+
+
+def rewrite_bundle(bundle_file_path, member_name, get_content):
+    """
+    Rewrites the bundle with the content of one member replaced.
+    """
+    with zipfile.ZipFile(bundle_file_path) as bundle_file:
+        members = {name: bundle_file.read(name) for name in bundle_file.namelist()}
+    members[member_name] = get_content(members[member_name])
+    with zipfile.ZipFile(bundle_file_path, "w", compression=zipfile.ZIP_STORED) as bundle_file:
+        for name, content in members.items():
+            bundle_file.writestr(name, content)
+
+
+def test_manifest_holds_sha256_of_every_member(bundle_file_path):
+    model_bundle = ModelBundle(bundle_file_path)
+
+    with zipfile.ZipFile(bundle_file_path) as bundle_file:
+        member_entries = [model_bundle.manifest["preprocessing"]] + list(model_bundle.manifest["clusters"].values())
+        for entry in member_entries:
+            assert entry["sha256"] == hashlib.sha256(bundle_file.read(entry["member"])).hexdigest()
+    assert model_bundle.clusters == [0, 1, 2]
+    assert model_bundle.manifest["clusters"][1]["model_accuracy"] == 0.9
+    assert model_bundle.manifest["clusters"][1]["model_name"] == "Ridge"
+
+
+def test_round_trip_predicts_like_the_saved_models(bundle_file_path):
+    model_bundle = ModelBundle(bundle_file_path)
+
+    np.testing.assert_array_equal(model_bundle.get_preprocessing_object().transform(X),
+                                  PREPROCESSING_OBJECT.transform(X))
+    for cluster, trained_model_object in CLUSTER_MODELS.items():
+        model = model_bundle.get_cluster_model(cluster)
+        assert model.cluster == cluster
+        np.testing.assert_array_equal(model.trained_model_object.predict(X), trained_model_object.predict(X))
+
+
+def test_same_models_give_the_same_version(bundle_file_path, tmp_path):
+    other_file_path = str(tmp_path / "other" / "model_bundle.zip")
+    ModelBundle.save(bundle_file_path=other_file_path, preprocessing_object=PREPROCESSING_OBJECT,
+                     cluster_models=CLUSTER_MODELS)
+
+    assert ModelBundle(other_file_path).version == ModelBundle(bundle_file_path).version
+
+
+def test_tampered_member_fails_its_checksum(bundle_file_path):
+    rewrite_bundle(bundle_file_path, "model_cluster1.pkl", lambda content: content[:-1] + bytes([content[-1] ^ 1]))
+    model_bundle = ModelBundle(bundle_file_path)
+
+    with pytest.raises(ConcreteException, match="does not match its checksum"):
+        model_bundle.get_cluster_model(1)
+    # the other members are intact and still load
+    assert model_bundle.get_cluster_model(0).trained_model_object.alpha == 1.0
+
+
+def test_tampered_manifest_checksum_fails(bundle_file_path):
+    def tamper_manifest(content):
+        manifest = json.loads(content)
+        manifest["preprocessing"]["sha256"] = "0" * 64
+        return json.dumps(manifest).encode()
+    rewrite_bundle(bundle_file_path, MODEL_BUNDLE_MANIFEST_NAME, tamper_manifest)
+    model_bundle = ModelBundle(bundle_file_path)
+
+    with pytest.raises(ConcreteException, match="does not match its checksum"):
+        model_bundle.get_cluster_model(0)
+
+
+def test_members_are_loaded_when_first_used(bundle_file_path, monkeypatch):
+    model_bundle = ModelBundle(bundle_file_path)
+    read_members = []
+    read_member = model_bundle.read_member
+
+    def recording_read_member(member_name, sha256):
+        read_members.append(member_name)
+        return read_member(member_name, sha256)
+    monkeypatch.setattr(model_bundle, "read_member", recording_read_member)
+
+    assert model_bundle.preprocessing_object is None and model_bundle.cluster_models == dict()
+    model_bundle.get_cluster_model(2)
+    model_bundle.get_cluster_model(2)
+    assert read_members == ["model_cluster2.pkl", MODEL_BUNDLE_PREPROCESSING_MEMBER_NAME]
+    assert list(model_bundle.cluster_models) == [2]
+
+
+def test_cluster_models_share_one_preprocessing_object(bundle_file_path):
+    model_bundle = ModelBundle(bundle_file_path)
+
+    preprocessing_objects = {id(model_bundle.get_cluster_model(cluster).preprocessing_object)
+                             for cluster in model_bundle.clusters}
+
+    assert preprocessing_objects == {id(model_bundle.get_preprocessing_object())}
+    routed_model = model_bundle.get_routed_model()
+    assert routed_model.preprocessing_object is model_bundle.get_preprocessing_object()
@@ -0,0 +1,38 @@
+import numpy as np
+
+from concrete_src.component.model_evaluation import ModelEvaluation
+
+
+def test_cluster_metrics_leave_out_clusters_the_run_does_not_have():
+    random_state = np.random.RandomState(0)
+    # the previous model was fitted with five clusters, this run has four
+    clusters = np.repeat(np.arange(5), 10)
+    y = random_state.randn(50)
+    prediction_matrix = np.column_stack([y + 0.1 * random_state.randn(50), y + 0.2 * random_state.randn(50)])
+
+    r2, rmse = ModelEvaluation.get_cluster_metrics(y=y, clusters=clusters, prediction_matrix=prediction_matrix,
+                                                   n_clusters=4)
+
+    assert r2.shape == rmse.shape == (4, 2)
+    for cluster in range(4):
+        rows = clusters == cluster
+        residual = prediction_matrix[rows] - y[rows, None]
+        np.testing.assert_allclose(rmse[cluster], np.sqrt((residual ** 2).mean(axis=0)))
+        total_sum_of_squares = ((y[rows] - y[rows].mean()) ** 2).sum()
+        np.testing.assert_allclose(r2[cluster], 1 - (residual ** 2).sum(axis=0) / total_sum_of_squares)
+
+
+def test_cluster_metrics_are_over_the_rows_each_column_predicts():
+    random_state = np.random.RandomState(1)
+    clusters = np.repeat(np.arange(2), 20)
+    y = random_state.randn(40)
+    prediction_matrix = np.column_stack([y + 0.1 * random_state.randn(40), y + 0.2 * random_state.randn(40)])
+    # a warm started model of cluster 1 predicts its held out rows only, so is the previous model scored
+    prediction_matrix[20:34] = np.nan
+
+    r2, rmse = ModelEvaluation.get_cluster_metrics(y=y, clusters=clusters, prediction_matrix=prediction_matrix,
+                                                   n_clusters=2)
+
+    residual = prediction_matrix[34:] - y[34:, None]
+    np.testing.assert_allclose(rmse[1], np.sqrt((residual ** 2).mean(axis=0)))
+    np.testing.assert_allclose(r2[1], 1 - (residual ** 2).sum(axis=0) / ((y[34:] - y[34:].mean()) ** 2).sum())
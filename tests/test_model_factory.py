@@ -0,0 +1,105 @@
+import copy
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import Ridge
+from sklearn.metrics import r2_score
+from sklearn.model_selection import cross_val_predict, cross_validate
+
+from concrete_src.util.model_factory import ModelFactory, evaluate_regression_model
+from concrete_src.util.util import write_yaml_file
+
+RANDOM_STATE = np.random.RandomState(0)
+X = pd.DataFrame(RANDOM_STATE.randn(60, 3), columns=["cement", "water", "age"])
+Y = pd.Series(X @ [3.0, -2.0, 1.0] + RANDOM_STATE.randn(60), name="concrete_compressive_strength")
+
+
+def get_model_factory(tmp_path, grid_search_class="GridSearchCV"):
+    model_config_file_path = str(tmp_path / "model.yaml")
+    write_yaml_file(model_config_file_path, {
+        "grid_search": {"class": grid_search_class, "module": "sklearn.model_selection",
+                        "params": {"cv": 3, "verbose": 0, "n_jobs": 1}},
+        "models": {"model_0": {"class": "Ridge", "module": "sklearn.linear_model",
+                               "search_param_grid": {"alpha": [0.1, 1000.0]}}}})
+    model_factory = ModelFactory(model_config_path=model_config_file_path)
+    model_factory.get_supplied_model_details()
+    return model_factory
+
+
+def test_train_and_test_rmse_are_the_fold_scores_of_the_best_candidate(tmp_path):
+    model_factory = get_model_factory(tmp_path)
+    _, grid_searched_best_model_list = model_factory.get_best_model(X=X, y=Y, base_accuracy=0.5)
+
+    metric_info = evaluate_regression_model(model_list=grid_searched_best_model_list, X_train=X, y_train=Y, flag=2,
+                                            base_accuracy=0.5)
+
+    scores = cross_validate(Ridge(alpha=0.1), X, Y, cv=3, return_train_score=True,
+                            scoring={"r2": "r2", "rmse": "neg_root_mean_squared_error"})
+    assert metric_info.model_object.alpha == 0.1
+    np.testing.assert_allclose(metric_info.train_rmse, -scores["train_rmse"].mean())
+    np.testing.assert_allclose(metric_info.model_rmse, -scores["test_rmse"].mean())
+    np.testing.assert_allclose(metric_info.train_accuracy, scores["train_r2"].mean())
+    np.testing.assert_allclose(metric_info.model_accuracy, scores["test_r2"].mean())
+    np.testing.assert_allclose(model_factory.get_fold_predictions(metric_info.model_object, X, Y),
+                               cross_val_predict(Ridge(alpha=0.1), X, Y, cv=3))
+
+
+def test_search_scored_on_r2_only_has_no_rmse(tmp_path):
+    model_factory = get_model_factory(tmp_path, grid_search_class="HalvingGridSearchCV")
+    _, grid_searched_best_model_list = model_factory.get_best_model(X=X, y=Y, base_accuracy=0.5)
+
+    metric_info = evaluate_regression_model(model_list=grid_searched_best_model_list, X_train=X, y_train=Y, flag=2,
+                                            base_accuracy=0.5)
+
+    assert np.isnan(metric_info.train_rmse) and np.isnan(metric_info.model_rmse)
+    assert 0.5 < metric_info.train_accuracy <= 1
+
+
+def test_search_jobs_stay_within_the_share_of_the_cores(tmp_path):
+    model_factory = get_model_factory(tmp_path)
+    # a cluster worker of a process pool with four cores, two models searched at once
+    model_factory.n_cores, model_factory.model_n_jobs = 4, 2
+
+    assert model_factory.get_search_n_jobs(-1) == 2
+    assert model_factory.get_search_n_jobs(-2) == 1
+    assert model_factory.get_search_n_jobs(8) == 2
+    assert model_factory.get_search_n_jobs(1) == 1
+    assert model_factory.get_search_n_jobs(None) == 1
+
+
+def test_cpu_time_of_a_parallel_search_is_left_out(tmp_path):
+    model_factory = get_model_factory(tmp_path)
+    model_factory.n_cores = 4
+    supplied_model = model_factory.supplied_models_details[0]
+
+    sequential_search = model_factory.execute_grid_search_operation(supplied_model._replace(search_n_jobs=1), X, Y)
+    parallel_search = model_factory.execute_grid_search_operation(supplied_model._replace(search_n_jobs=2), X, Y)
+
+    assert sequential_search.search_profile["cpu_seconds"] > 0
+    # the fits ran in joblib workers, the cpu time of this thread would be near 0
+    assert parallel_search.search_profile["cpu_seconds"] is None
+
+
+def test_warm_start_is_scored_on_held_out_new_rows(tmp_path):
+    model_factory = get_model_factory(tmp_path)
+    # fitted on the first 40 rows by the previous run, the last 20 rows are new
+    previous_model = RandomForestRegressor(n_estimators=10, random_state=0).fit(X[:40], Y[:40])
+
+    warm_started_model = model_factory.warm_start_model(previous_model, X, Y, new_rows_share=20 / 60,
+                                                        max_n_estimators=12)
+
+    # a fold worth of the new rows is held out: ceil(20 / 3) = 7 rows
+    is_holdout = np.arange(60) >= 53
+    holdout_model = copy.deepcopy(previous_model).set_params(warm_start=True, n_estimators=12)
+    holdout_model.fit(X[~is_holdout], Y[~is_holdout])
+    assert warm_started_model.best_model.n_estimators == 12
+    assert np.isnan(warm_started_model.fold_predictions[~is_holdout]).all()
+    np.testing.assert_allclose(warm_started_model.fold_predictions[is_holdout], holdout_model.predict(X[is_holdout]))
+    np.testing.assert_allclose(warm_started_model.best_score, r2_score(Y[is_holdout], holdout_model.predict(X[is_holdout])))
+    # the first trees are those of the previous model
+    assert warm_started_model.best_model.estimators_[0].tree_.node_count == previous_model.estimators_[0].tree_.node_count
+
+    assert model_factory.warm_start_model(warm_started_model.best_model, X, Y, new_rows_share=0.5,
+                                          max_n_estimators=12) is None
+    assert model_factory.warm_start_model(previous_model, X, Y, new_rows_share=2 / 60) is None